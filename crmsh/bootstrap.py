@@ -33,9 +33,11 @@ from . import corosync
 from . import tmpfiles
 from . import lock
 from . import userdir
-from .constants import SSH_OPTION, QDEVICE_HELP_INFO, STONITH_TIMEOUT_DEFAULT
+from . import ssh_pool
+from .constants import QDEVICE_HELP_INFO, STONITH_TIMEOUT_DEFAULT
 from . import ocfs2
 from . import qdevice
+from . import parallax
 from . import log
 
 
@@ -57,6 +59,8 @@ PCMK_REMOTE_AUTH = "/etc/pacemaker/authkey"
 COROSYNC_CONF_ORIG = tmpfiles.create()[1]
 SERVICES_STOP_LIST = ["corosync-qdevice.service", "corosync.service", "hawk.service"]
 USER_LIST = ["root", "hacluster"]
+MAX_PARALLEL_NODES = 32
+TIMEKEEPERS = ("chronyd.service", "ntp.service", "ntpd.service")
 QDEVICE_ADD = "add"
 QDEVICE_REMOVE = "remove"
 WATCHDOG_CFG = "/etc/modules-load.d/watchdog.conf"
@@ -375,7 +379,7 @@ def get_cluster_node_hostname():
     """
     peer_node = None
     if _context.cluster_node:
-        rc, out, err = utils.get_stdout_stderr("ssh {} {} crm_node --name".format(SSH_OPTION, _context.cluster_node))
+        rc, out, err = utils.get_stdout_stderr("ssh {} {} crm_node --name".format(ssh_pool.ssh_option(), _context.cluster_node))
         if rc != 0:
             utils.fatal(err)
         peer_node = out
@@ -486,19 +490,19 @@ def check_prereqs(stage):
             "Please add an entry to /etc/hosts or configure DNS."))
         warned = True
 
-    timekeepers = ('chronyd.service', 'ntp.service', 'ntpd.service')
     timekeeper = None
-    for tk in timekeepers:
-        if utils.service_is_available(tk):
-            timekeeper = tk
-            break
+    with utils.service_state_cache(TIMEKEEPERS):
+        for tk in TIMEKEEPERS:
+            if utils.service_is_available(tk):
+                timekeeper = tk
+                break
 
-    if timekeeper is None:
-        logger.warning("No NTP service found.")
-        warned = True
-    elif not utils.service_is_enabled(timekeeper):
-        logger.warning("{} is not configured to start at system boot.".format(timekeeper))
-        warned = True
+        if timekeeper is None:
+            logger.warning("No NTP service found.")
+            warned = True
+        elif not utils.service_is_enabled(timekeeper):
+            logger.warning("{} is not configured to start at system boot.".format(timekeeper))
+            warned = True
 
     if warned:
         if not confirm("Do you want to continue anyway?"):
@@ -831,7 +835,7 @@ def append_to_remote_file(fromfile, remote_node, tofile):
     As the hint, likely, `PasswordAuthentication` is 'no' in /etc/ssh/sshd_config. 
     Given in this case, users must setup passwordless ssh beforehand, or change it to 'yes' and manage passwords properly
     """
-    cmd = "cat {} | ssh {} root@{} 'cat >> {}'".format(fromfile, SSH_OPTION, remote_node, tofile)
+    cmd = "cat {} | ssh {} root@{} 'cat >> {}'".format(fromfile, ssh_pool.ssh_option(), remote_node, tofile)
     rc, _, err = invoke(cmd)
     if not rc:
         utils.fatal("Failed to append contents of {} to {}:\n\"{}\"\n{}".format(fromfile, remote_node, err, err_details_string))
@@ -1424,7 +1428,7 @@ def join_ssh(seed_host):
     # authorized_keys file (again, to help with the case where the
     # user has done manual initial setup without the assistance of
     # ha-cluster-init).
-    rc, _, err = invoke("ssh {} root@{} crm cluster init -i {} ssh_remote".format(SSH_OPTION, seed_host, _context.default_nic_list[0]))
+    rc, _, err = invoke("ssh {} root@{} crm cluster init -i {} ssh_remote".format(ssh_pool.ssh_option(), seed_host, _context.default_nic_list[0]))
     if not rc:
         utils.fatal("Can't invoke crm cluster init -i {} ssh_remote on {}: {}".format(_context.default_nic_list[0], seed_host, err))
 
@@ -1456,6 +1460,49 @@ def swap_public_ssh_key(remote_node, user="root"):
     append_unique(public_key_file_remote, authorized_file)
 
 
+def swap_public_ssh_key_with_nodes(node_list, user="root"):
+    """
+    Swap public ssh key between local and nodes in node_list in parallel,
+    with one ssh round trip per node
+    Return the list of nodes failed, like those needing a password for root
+    """
+    if user != "root" and not _context.with_other_user or not node_list:
+        return []
+
+    _, public_key, authorized_file = key_files(user).values()
+    with open(public_key) as f:
+        local_key = f.read().strip()
+    home_dir = userdir.gethomedir(user)
+    # Make sure the remote .ssh directory exists and is owned by user,
+    # append local public key to remote authorized_keys unless there already,
+    # then print the first public key found on remote
+    cmd = "mkdir -p {home}/.ssh && chown {user}: {home}/.ssh && chmod 700 {home}/.ssh && " \
+          "{{ grep -qsF '{key}' {auth} || echo '{key}' >> {auth}; }} && " \
+          "chown {user}: {auth} && chmod 600 {auth} && " \
+          "for k in id_rsa id_ecdsa id_ed25519 id_dsa; do " \
+          "if [ -f {home}/.ssh/$k.pub ]; then cat {home}/.ssh/$k.pub; break; fi; done".format(
+                  key=local_key, auth=authorized_file, home=home_dir, user=user)
+    ssh_options = ['StrictHostKeyChecking=no', 'ConnectTimeout=10', 'BatchMode=yes']
+    logger_utils.log_only_to_file("parallax.call {} : {}".format(node_list, cmd))
+    results = parallax.parallax_call(node_list, cmd, ssh_options=ssh_options,
+                                     limit=MAX_PARALLEL_NODES, strict=False)
+
+    failed_nodes = []
+    for node, result in results:
+        if parallax.is_error(result) or result[0] != 0:
+            logger_utils.log_only_to_file("Failed to swap ssh key with {}@{}: {}".format(user, node, result))
+            failed_nodes.append(node)
+            continue
+        remote_key = utils.to_ascii(result[1]).strip()
+        if not remote_key:
+            logger.warning("No ssh key exist on {}".format(node))
+            continue
+        _, temp_public_key_file = tmpfiles.create()
+        utils.str2file(remote_key + '\n', temp_public_key_file)
+        append_unique(temp_public_key_file, authorized_file)
+    return failed_nodes
+
+
 def fetch_public_key_from_remote_node(node, user="root"):
     """
     Fetch public key file from remote node
@@ -1468,11 +1515,11 @@ def fetch_public_key_from_remote_node(node, user="root"):
     home_dir = userdir.gethomedir(user)
     for key in ("id_rsa", "id_ecdsa", "id_ed25519", "id_dsa"):
         public_key_file = "{}/.ssh/{}.pub".format(home_dir, key)
-        cmd = "ssh {} root@{} 'test -f {}'".format(SSH_OPTION, node, public_key_file)
+        cmd = "ssh {} root@{} 'test -f {}'".format(ssh_pool.ssh_option(), node, public_key_file)
         if not invokerc(cmd):
             continue
         _, temp_public_key_file = tmpfiles.create()
-        cmd = "scp {} root@{}:{} {}".format(SSH_OPTION, node, public_key_file, temp_public_key_file)
+        cmd = "scp {} root@{}:{} {}".format(ssh_pool.ssh_option(), node, public_key_file, temp_public_key_file)
         rc, _, err = invoke(cmd)
         if not rc:
             utils.fatal("Failed to run \"{}\": {}".format(cmd, err))
@@ -1499,7 +1546,7 @@ def join_csync2(seed_host):
         # If we *were* updating /etc/hosts, the next line would have "\"$hosts_line\"" as
         # the last arg (but this requires re-enabling this functionality in ha-cluster-init)
         cmd = "crm cluster init -i {} csync2_remote {}".format(_context.default_nic_list[0], utils.this_node())
-        rc, _, err = invoke("ssh {} root@{} {}".format(SSH_OPTION, seed_host, cmd))
+        rc, _, err = invoke("ssh {} root@{} {}".format(ssh_pool.ssh_option(), seed_host, cmd))
         if not rc:
             utils.fatal("Can't invoke \"{}\" on {}: {}".format(cmd, seed_host, err))
 
@@ -1524,7 +1571,7 @@ def join_csync2(seed_host):
         # they haven't gone to all nodes in the cluster, which means a
         # subseqent join of another node can fail its sync of corosync.conf
         # when it updates expected_votes.  Grrr...
-        if not invokerc('ssh {} root@{} "csync2 -rm /; csync2 -rxv || csync2 -rf / && csync2 -rxv"'.format(SSH_OPTION, seed_host)):
+        if not invokerc('ssh {} root@{} "csync2 -rm /; csync2 -rxv || csync2 -rf / && csync2 -rxv"'.format(ssh_pool.ssh_option(), seed_host)):
             print("")
             logger.warning("csync2 run failed - some files may not be sync'd")
 
@@ -1655,7 +1702,7 @@ def setup_passwordless_with_other_nodes(init_node):
     Should fetch the node list from init node, then swap the key
     """
     # Fetch cluster nodes list
-    cmd = "ssh {} root@{} crm_node -l".format(SSH_OPTION, init_node)
+    cmd = "ssh {} root@{} crm_node -l".format(ssh_pool.ssh_option(), init_node)
     rc, out, err = utils.get_stdout_stderr(cmd)
     if rc != 0:
         utils.fatal("Can't fetch cluster nodes list from {}: {}".format(init_node, err))
@@ -1678,16 +1725,19 @@ def setup_passwordless_with_other_nodes(init_node):
             cluster_nodes_list.append(tokens[1])
 
     # Filter out init node from cluster_nodes_list
-    cmd = "ssh {} root@{} hostname".format(SSH_OPTION, init_node)
+    cmd = "ssh {} root@{} hostname".format(ssh_pool.ssh_option(), init_node)
     rc, out, err = utils.get_stdout_stderr(cmd)
     if rc != 0:
         utils.fatal("Can't fetch hostname of {}: {}".format(init_node, err))
     if out in cluster_nodes_list:
         cluster_nodes_list.remove(out)
 
-    # Swap ssh public key between join node and other cluster nodes
-    for node in cluster_nodes_list:
-        for user in USER_LIST:
+    # Swap ssh public key between join node and other cluster nodes,
+    # nodes that cannot be handled in parallel (like those needing
+    # a password) fall back to the interactive one-by-one way
+    for user in USER_LIST:
+        failed_nodes = swap_public_ssh_key_with_nodes(cluster_nodes_list, user)
+        for node in failed_nodes:
             swap_public_ssh_key(node, user)
 
 
@@ -1740,7 +1790,7 @@ def join_cluster(seed_host):
     # that yet, so the following crawling horror takes a punt on the seed
     # node being up, then asks it for a list of mountpoints...
     if _context.cluster_node:
-        _rc, outp, _ = utils.get_stdout_stderr("ssh {} root@{} 'cibadmin -Q --xpath \"//primitive\"'".format(SSH_OPTION, seed_host))
+        _rc, outp, _ = utils.get_stdout_stderr("ssh {} root@{} 'cibadmin -Q --xpath \"//primitive\"'".format(ssh_pool.ssh_option(), seed_host))
         if outp:
             xml = etree.fromstring(outp)
             mountpoints = xml.xpath(' and '.join(['//primitive[@class="ocf"',
@@ -1783,7 +1833,7 @@ def join_cluster(seed_host):
         except corosync.IPAlreadyConfiguredError as e:
             logger.warning(e)
         csync2_update(corosync.conf())
-        invoke("ssh {} root@{} corosync-cfgtool -R".format(SSH_OPTION, seed_host))
+        invoke("ssh {} root@{} corosync-cfgtool -R".format(ssh_pool.ssh_option(), seed_host))
 
     _context.sbd_manager.join_sbd(seed_host)
 
@@ -1927,7 +1977,7 @@ def remove_node_from_cluster():
     stop_services(SERVICES_STOP_LIST, remote_addr=node)
 
     # delete configuration files from the node to be removed
-    rc, _, err = invoke('ssh {} root@{} "bash -c \\\"rm -f {}\\\""'.format(SSH_OPTION, node, " ".join(_context.rm_list)))
+    rc, _, err = invoke('ssh {} root@{} "bash -c \\\"rm -f {}\\\""'.format(ssh_pool.ssh_option(), node, " ".join(_context.rm_list)))
     if not rc:
         utils.fatal("Deleting the configuration files failed: {}".format(err))
 
@@ -2006,33 +2056,35 @@ def bootstrap_init(context):
     # vgfs stage requires running cluster, everything else requires inactive cluster,
     # except ssh and csync2 (which don't care) and csync2_remote (which mustn't care,
     # just in case this breaks ha-cluster-join on another node).
-    corosync_active = utils.service_is_active("corosync.service")
-    if stage in ("vgfs", "admin", "qdevice", "ocfs2"):
-        if not corosync_active:
-            utils.fatal("Cluster is inactive - can't run %s stage" % (stage))
-    elif stage == "":
-        if corosync_active:
-            utils.fatal("Cluster is currently active - can't run")
-    elif stage not in ("ssh", "ssh_remote", "csync2", "csync2_remote", "sbd", "ocfs2"):
-        if corosync_active:
-            utils.fatal("Cluster is currently active - can't run %s stage" % (stage))
-
-    _context.initialize_qdevice()
-    _context.validate_option()
-    _context.load_profiles()
-    _context.init_sbd_manager()
-
-    # Need hostname resolution to work, want NTP (but don't block ssh_remote or csync2_remote)
-    if stage not in ('ssh_remote', 'csync2_remote'):
-        check_tty()
-        if not check_prereqs(stage):
-            return
-    elif stage == 'csync2_remote':
-        args = _context.args
-        logger_utils.log_only_to_file("args: {}".format(args))
-        if len(args) != 2:
-            utils.fatal("Expected NODE argument to csync2_remote")
-        _context.cluster_node = args[1]
+    # The service states of the preflight checks come from one systemctl call.
+    with utils.service_state_cache(("corosync.service",) + TIMEKEEPERS):
+        corosync_active = utils.service_is_active("corosync.service")
+        if stage in ("vgfs", "admin", "qdevice", "ocfs2"):
+            if not corosync_active:
+                utils.fatal("Cluster is inactive - can't run %s stage" % (stage))
+        elif stage == "":
+            if corosync_active:
+                utils.fatal("Cluster is currently active - can't run")
+        elif stage not in ("ssh", "ssh_remote", "csync2", "csync2_remote", "sbd", "ocfs2"):
+            if corosync_active:
+                utils.fatal("Cluster is currently active - can't run %s stage" % (stage))
+
+        _context.initialize_qdevice()
+        _context.validate_option()
+        _context.load_profiles()
+        _context.init_sbd_manager()
+
+        # Need hostname resolution to work, want NTP (but don't block ssh_remote or csync2_remote)
+        if stage not in ('ssh_remote', 'csync2_remote'):
+            check_tty()
+            if not check_prereqs(stage):
+                return
+        elif stage == 'csync2_remote':
+            args = _context.args
+            logger_utils.log_only_to_file("args: {}".format(args))
+            if len(args) != 2:
+                utils.fatal("Expected NODE argument to csync2_remote")
+            _context.cluster_node = args[1]
 
     if stage != "":
         globals()["init_" + stage]()
@@ -2069,12 +2121,13 @@ def bootstrap_join(context):
 
     check_tty()
 
-    corosync_active = utils.service_is_active("corosync.service")
-    if corosync_active and _context.stage != "ssh":
-        utils.fatal("Abort: Cluster is currently active. Run this command on a node joining the cluster.")
+    with utils.service_state_cache(("corosync.service",) + TIMEKEEPERS):
+        corosync_active = utils.service_is_active("corosync.service")
+        if corosync_active and _context.stage != "ssh":
+            utils.fatal("Abort: Cluster is currently active. Run this command on a node joining the cluster.")
 
-    if not check_prereqs("join"):
-        return
+        if not check_prereqs("join"):
+            return
 
     cluster_node = _context.cluster_node
     if _context.stage != "":
@@ -2223,7 +2276,7 @@ def remove_self():
     if othernode is not None:
         # remove from other node
         cmd = "crm cluster remove{} -c {}".format(" -y" if yes_to_all else "", me)
-        rc = utils.ext_cmd_nosudo("ssh{} {} {} '{}'".format("" if yes_to_all else " -t", SSH_OPTION, othernode, cmd))
+        rc = utils.ext_cmd_nosudo("ssh{} {} {} '{}'".format("" if yes_to_all else " -t", ssh_pool.ssh_option(), othernode, cmd))
         if rc != 0:
             utils.fatal("Failed to remove this node from {}".format(othernode))
     else:
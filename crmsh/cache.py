@@ -4,8 +4,17 @@
 #
 # Cache stuff. A naive implementation.
 # Used by ra.py to cache named lists of things.
+#
+# The snapshot is a per-user on-disk cache of completion
+# lists, shared across crm invocations: every list is stored
+# with a key (CIB version, RA directories mtimes) and served
+# again only while the key did not change.
 
+import os
 import time
+import atexit
+import marshal
+from . import constants
 
 
 _max_cache_age = 600.0  # seconds
@@ -44,4 +53,61 @@ def retrieve(name):
     return _lists.get(name)
 
 
+SNAPSHOT_FILE = os.path.join(constants.CRM_CACHE_DIR, "completions")
+_SNAPSHOT_VERSION = 1
+_snapshot = None
+_snapshot_dirty = False
+
+
+def _load_snapshot():
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = {}
+        try:
+            with open(SNAPSHOT_FILE, 'rb') as f:
+                version, lists = marshal.load(f)
+            if version == _SNAPSHOT_VERSION and isinstance(lists, dict):
+                _snapshot = lists
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            pass
+    return _snapshot
+
+
+def _save_snapshot():
+    global _snapshot_dirty
+    if not _snapshot_dirty:
+        return
+    _snapshot_dirty = False
+    try:
+        os.makedirs(constants.CRM_CACHE_DIR, exist_ok=True)
+        tmp = "{}.{}".format(SNAPSHOT_FILE, os.getpid())
+        with open(tmp, 'wb') as f:
+            marshal.dump((_SNAPSHOT_VERSION, _snapshot), f)
+        os.replace(tmp, SNAPSHOT_FILE)
+    except (IOError, OSError, ValueError):
+        pass
+
+
+def snapshot(name, key, fn):
+    """
+    Returns the list stored in the snapshot for name if
+    it was stored with the same key, otherwise calls fn
+    and stores its list for the next crm invocation.
+    A key of None (unknown) bypasses the snapshot.
+    """
+    global _snapshot_dirty
+    if key is None:
+        return fn()
+    lists = _load_snapshot()
+    entry = lists.get(name)
+    if entry is not None and entry[0] == key:
+        return list(entry[1])
+    lst = fn()
+    lists[name] = (key, list(lst))
+    if not _snapshot_dirty:
+        _snapshot_dirty = True
+        atexit.register(_save_snapshot)
+    return lst
+
+
 # vim:ts=4:sw=4:et:
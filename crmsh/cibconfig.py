@@ -8,7 +8,9 @@ import re
 import fnmatch
 import time
 import collections
+import functools
 from lxml import etree
+from . import cache
 from . import config
 from . import options
 from . import constants
@@ -27,7 +29,7 @@ from . import ui_utils
 from . import userdir
 from .ra import get_ra, get_properties_list, get_pe_meta, get_properties_meta
 from .utils import ext_cmd, safe_open_w, pipe_string, safe_close_w, crm_msec
-from .utils import ask, lines2cli, olist
+from .utils import ask, lines2cli, olist, to_ascii
 from .utils import page_string, cibadmin_can_patch, str2tmp, ensure_sudo_readable
 from .utils import run_ptest, is_id_valid, edit_file, get_boolean, filter_string
 from .xmlutil import is_child_rsc, rsc_constraint, sanitize_cib, rename_id, get_interesting_nodes
@@ -37,7 +39,7 @@ from .xmlutil import sanity_check_nvpairs, merge_nodes, op2list, mk_rsc_type, is
 from .xmlutil import stuff_comments, is_comment, is_constraint, read_cib, processing_sort_cli
 from .xmlutil import find_operation, get_rsc_children_ids, is_primitive, referenced_resources
 from .xmlutil import cibdump2elem, processing_sort, get_rsc_ref_ids, merge_tmpl_into_prim
-from .xmlutil import remove_id_used_attributes, get_top_cib_nodes
+from .xmlutil import remove_id_used_attributes, get_top_cib_nodes, cib_version
 from .xmlutil import merge_attributes, is_cib_element, sanity_check_meta
 from .xmlutil import is_simpleconstraint, is_template, rmnode, is_defaults, is_live_cib
 from .xmlutil import get_rsc_operations, delete_rscref, xml_equals, lookup_node, RscState
@@ -53,6 +55,9 @@ from . import log
 logger = log.setup_logger(__name__)
 logger_utils = log.LoggerUtils(logger)
 
+# fnmatch special characters
+_GLOB_RE = re.compile(r'[*?[]')
+
 
 def show_unrecognized_elems(cib_elem):
     try:
@@ -431,13 +436,18 @@ class CibObjectSet(object):
         f = self._open_url(fname)
         if not f:
             return False
-        s = f.read()
-        if f != sys.stdin:
-            f.close()
-        if method == 'push':
-            return self.save(s, remove=True, method='update')
-        else:
-            return self.save(s, remove=False, method=method)
+        try:
+            s = self._read_input(f)
+            if method == 'push':
+                return self.save(s, remove=True, method='update')
+            else:
+                return self.save(s, remove=False, method=method)
+        finally:
+            if f != sys.stdin:
+                f.close()
+
+    def _read_input(self, f):
+        return f.read()
 
     def repr(self, format_mode=0):
         '''
@@ -550,6 +560,13 @@ class CibObjectSetCli(CibObjectSet):
             return s.replace(self.vim_stx_str, "")
         return s
 
+    def _read_input(self, f):
+        '''
+        The CLI input is parsed line by line while reading,
+        instead of reading it all into memory first.
+        '''
+        return (to_ascii(line) for line in f)
+
     def _get_id(self, node):
         '''
         Get the id from a CLI representation. Normally, it should
@@ -562,6 +579,20 @@ class CibObjectSetCli(CibObjectSet):
             return node[0].get('id')
         return node.get('id')
 
+    def _rendered_objects(self):
+        '''
+        Objects of the set with the text they were last shown
+        (or edited) as, i.e. their CLI representation, if still
+        in the cache, split into lines as in save.
+        '''
+        d = {}
+        with clidisplay.nopretty():
+            for obj in self.obj_set:
+                s = obj.cached_repr_cli()
+                if s:
+                    d[tuple(lines2cli(s))] = obj
+        return d
+
     def save(self, s, remove=True, method='replace'):
         '''
         Save a user supplied cli format configuration.
@@ -575,9 +606,17 @@ class CibObjectSetCli(CibObjectSet):
         diff = CibDiff(self)
         rc = True
         comments = []
+        unchanged = self._rendered_objects()
         with logger_utils.line_number():
             for cli_text in lines2cli(s):
                 logger_utils.incr_lineno()
+                obj = unchanged.get(tuple(comments + [cli_text]))
+                if obj is not None:
+                    # same text as shown: no need to parse
+                    # and compare it
+                    del comments[:]
+                    rc = rc and diff.keep(obj)
+                    continue
                 node = parse.parse(cli_text, comments=comments)
                 if node not in (False, None):
                     rc = rc and diff.add(node)
@@ -859,6 +898,7 @@ class CibObject(object):
         self.nocli = False      # we don't support this one
         self.nocli_warn = True  # don't issue warnings all the time
         self.updated = False    # was the object updated
+        self._cli_cache = {}    # rendered CLI, see repr_cli
         self.parent = None      # object superior (group/clone/ms)
         self.children = []      # objects inferior
         self.obj_id = None
@@ -867,10 +907,39 @@ class CibObject(object):
     def __str__(self):
         return "%s:%s" % (self.obj_type, self.obj_id)
 
+    @property
+    def node(self):
+        return self._node
+
+    @node.setter
+    def node(self, node):
+        self._node = node
+        self._cli_cache = {}
+
+    @property
+    def updated(self):
+        return self._updated
+
+    @updated.setter
+    def updated(self, updated):
+        self._updated = updated
+        if updated:
+            self._cli_cache = {}
+
     def set_updated(self):
         self.updated = True
+        self.node_changed()
         self.propagate_updated()
 
+    def node_changed(self):
+        '''
+        The node was modified in place: drop the rendered CLI,
+        also of the children, whose nodes are within this one.
+        '''
+        self._cli_cache = {}
+        for child in self.children:
+            child.node_changed()
+
     def dump_state(self):
         'Print object status'
         print(self.state_fmt % (self.obj_id,
@@ -920,11 +989,40 @@ class CibObject(object):
         'implemented in subclasses'
         pass
 
+    def _repr_cli_deps(self):
+        '''
+        What the CLI representation depends on besides the
+        object itself (see repr_cli).
+        '''
+        return ()
+
+    def _cli_cache_key(self, format_mode):
+        return (format_mode, self.nocli, clidisplay.render_key(),
+                cib_factory.id_refs_gen) + self._repr_cli_deps()
+
+    def cached_repr_cli(self, format_mode=1):
+        '''
+        The CLI representation if it has been rendered since
+        the object was last updated, otherwise None.
+        '''
+        return self._cli_cache.get(self._cli_cache_key(format_mode))
+
     def repr_cli(self, format_mode=1):
         '''
         CLI representation for the node.
         _repr_cli_head and _repr_cli_child in subclasess.
+
+        The result is cached for each object (plain and colored),
+        until the object is updated (see set_updated and node_changed).
         '''
+        key = self._cli_cache_key(format_mode)
+        s = self._cli_cache.get(key)
+        if s is None:
+            s = self._render_cli(format_mode)
+            self._cli_cache[key] = s
+        return s
+
+    def _render_cli(self, format_mode):
         if self.nocli:
             return self._repr_cli_xml(format_mode)
         l = []
@@ -1063,6 +1161,8 @@ class CibObject(object):
             self.node.remove(comm_node)
             self.node.insert(firstelem, comm_node)
             firstelem += 1
+        if l:
+            self.node_changed()
 
     def mknode(self, obj_id):
         if self.xml_obj_type in constants.defaults_tags:
@@ -2025,6 +2125,9 @@ class CibFencingOrder(CibObject):
         ''' Cannot rename this one. '''
         return False
 
+    def _repr_cli_deps(self):
+        return tuple(cib_factory.node_id_list())
+
     def _repr_cli_head(self, format_mode):
         s = clidisplay.keyword(self.obj_type)
         d = ordereddict.odict()
@@ -2272,7 +2375,17 @@ class CibDiff(object):
         if obj_id is None:
             logger.error("element %s has no id!", xml_tostring(item, pretty_print=True))
             return False
-        elif is_node and obj_id in self._node_set:
+        return self._add(obj_id, is_node, item)
+
+    def keep(self, obj):
+        '''
+        The object is in the edit order as it is, it is
+        neither to be removed nor updated.
+        '''
+        return self._add(obj.obj_id, obj.obj_type == 'node', None)
+
+    def _add(self, obj_id, is_node, item):
+        if is_node and obj_id in self._node_set:
             logger.error("Duplicate node: %s", obj_id)
             return False
         elif not is_node and obj_id in self._rsc_set:
@@ -2292,25 +2405,27 @@ class CibDiff(object):
                 return obj.obj_type
         return None
 
-    def _is_node(self, nid):
-        for obj in self.objset.all_set:
-            if obj.obj_id == nid and obj.obj_type == 'node':
-                return True
-        return False
-
-    def _is_resource(self, nid):
+    def _obj_kinds(self):
+        'id -> (is node, is resource)'
+        d = {}
         for obj in self.objset.all_set:
-            if obj.obj_id == nid and obj.obj_type != 'node':
-                return True
-        return False
+            is_node, is_rsc = d.get(obj.obj_id, (False, False))
+            if obj.obj_type == 'node':
+                is_node = True
+            else:
+                is_rsc = True
+            d[obj.obj_id] = (is_node, is_rsc)
+        return d
 
-    def _obj_nodes(self):
+    def _obj_nodes(self, kinds=None):
+        kinds = kinds or self._obj_kinds()
         return orderedset.oset([n for n in self.objset.obj_ids
-                                if self._is_node(n)])
+                                if kinds.get(n, (False, False))[0]])
 
-    def _obj_resources(self):
+    def _obj_resources(self, kinds=None):
+        kinds = kinds or self._obj_kinds()
         return orderedset.oset([n for n in self.objset.obj_ids
-                                if self._is_resource(n)])
+                                if kinds.get(n, (False, False))[1]])
 
     def _is_edit_valid(self, id_set, existing):
         '''
@@ -2352,17 +2467,40 @@ class CibDiff(object):
         if not rc:
             return rc
 
-        for e, s, existing in ((edited_nodes, self._node_set, self._obj_nodes()),
-                               (edited_resources, self._rsc_set, self._obj_resources())):
+        kinds = self._obj_kinds()
+        for e, s, existing in ((edited_nodes, self._node_set, self._obj_nodes(kinds)),
+                               (edited_resources, self._rsc_set, self._obj_resources(kinds))):
             rc, mk, upd, rm = calc_sets(s, existing)
             if not rc:
                 return rc
+            upd = orderedset.oset([x for x in upd if e[x] is not None])
             rc = cib_factory.set_update(e, mk, upd, rm, upd_type=mode, method=method)
             if not rc:
                 return rc
         return rc
 
 
+def completion_list(fn):
+    '''
+    Tab completion lists of the factory. When completing for
+    the shell, the CIB is not loaded (see Configure.requires);
+    then the list comes from the per-user snapshot, unless
+    the CIB changed since, which saves loading and parsing
+    the whole CIB in every crm invocation.
+    '''
+    @functools.wraps(fn)
+    def wrapper(self):
+        if not options.shell_completion or self.cib_elem is not None:
+            return fn(self)
+
+        def load():
+            if not self.initialize():
+                return []
+            return fn(self)
+        return cache.snapshot("cib-factory-%s" % fn.__name__, cib_version(), load)
+    return wrapper
+
+
 class CibFactory(object):
     '''
     Juggle with CIB objects.
@@ -2715,6 +2853,7 @@ class CibFactory(object):
         obj.node = node
         obj.set_id()
         self.cib_objects.append(obj)
+        self._index_obj(obj)
         return obj
 
     def _populate(self):
@@ -2767,8 +2906,12 @@ class CibFactory(object):
         self.cib_objects = []    # a list of cib objects
         self.remove_queue = []   # a list of cib objects to be removed
         self.id_refs = {}        # dict of id-refs
+        self.id_refs_gen = 0     # bumped when id_refs change
         self.new_schema = False  # schema changed
         self._state = []
+        self._id_index = None    # id -> objects, see set_update
+        self._children_index = None  # child -> containers
+        self._constraints_index = None  # resource id -> constraints
 
     def _push_state(self):
         '''
@@ -2792,11 +2935,14 @@ class CibFactory(object):
                 self.remove_queue, self.id_refs = self._state.pop()
         except KeyError:
             return False
+        self.id_refs_gen += 1
         # need to get addresses of all new objects created by
         # deepcopy
         for obj in self.cib_objects:
             obj.node = self.find_xml_node(obj.xml_obj_type, obj.obj_id)
             self._update_links(obj)
+        if self._id_index is not None:
+            self._build_id_index()
         idmgmt.pop_state()
         return self.check_structure()
 
@@ -2820,12 +2966,85 @@ class CibFactory(object):
         self._clean_state()
         idmgmt.clear()
 
+    def _build_id_index(self):
+        self._id_index = collections.defaultdict(list)
+        self._children_index = None
+        self._constraints_index = None
+        for obj in self.cib_objects:
+            self._index_obj(obj)
+
+    def _drop_id_index(self):
+        self._id_index = None
+        self._children_index = None
+        self._constraints_index = None
+
+    @staticmethod
+    def _index_keys(obj):
+        keys = [obj.obj_id]
+        # nodes are found by uname too
+        if obj.obj_type == "node" and obj.node is not None:
+            keys.append(obj.node.get("uname"))
+        return [key for key in keys if key]
+
+    def _index_obj(self, obj):
+        "Add the object to the id index (if in use)."
+        if self._id_index is None:
+            return
+        self._children_index = None
+        if is_constraint(obj.node):
+            self._constraints_index = None
+        for key in self._index_keys(obj):
+            if obj not in self._id_index[key]:
+                self._id_index[key].append(obj)
+
+    def _unindex_obj(self, obj):
+        "Remove the object from the id index (if in use)."
+        if self._id_index is None:
+            return
+        self._children_index = None
+        if is_constraint(obj.node):
+            self._constraints_index = None
+        for key in self._index_keys(obj):
+            if obj in self._id_index.get(key, []):
+                self._id_index[key].remove(obj)
+
+    def _containers_of(self, obj):
+        "Containers which have obj as a child."
+        if self._id_index is None:
+            return [x for x in self.cib_objects
+                    if is_container(x.node) and obj in x.children]
+        if self._children_index is None:
+            self._children_index = collections.defaultdict(list)
+            for x in self.cib_objects:
+                if is_container(x.node):
+                    for child in x.children:
+                        self._children_index[child].append(x)
+        return self._children_index.get(obj, [])
+
+    def _constraints_on(self, rsc_id):
+        "Constraints which reference the resource (see rsc_constraint)."
+        if self._constraints_index is None:
+            self._constraints_index = collections.defaultdict(list)
+            for x in self.cib_objects:
+                if not is_constraint(x.node):
+                    continue
+                refs = [x.node.get(attr) for attr in x.node.keys()
+                        if attr in constants.constraint_rsc_refs]
+                refs += [rref.get("id") for rref in x.node.xpath("resource_set/resource_ref")]
+                for ref in orderedset.oset(refs):
+                    self._constraints_index[ref].append(x)
+        return self._constraints_index.get(rsc_id, [])
+
     def find_objects(self, obj_id):
         "Find objects for id (can be a wildcard-glob)."
         def matchfn(x):
             return x and fnmatch.fnmatch(x, obj_id)
         if not self.is_cib_sane() or obj_id is None:
             return None
+        if self._id_index is not None and not _GLOB_RE.search(obj_id):
+            return [obj for obj in self._id_index.get(obj_id, [])
+                    if obj.obj_id == obj_id or
+                    (obj.obj_type == "node" and obj.node.get("uname") == obj_id)]
         objs = []
         for obj in self.cib_objects:
             if matchfn(obj.obj_id):
@@ -2874,41 +3093,50 @@ class CibFactory(object):
     #
     # tab completion functions
     #
+    @completion_list
     def id_list(self):
         "List of ids (for completion)."
         return [x.obj_id for x in self.cib_objects]
 
+    @completion_list
     def type_list(self):
         "List of object types (for completion)"
         return list(set([x.obj_type for x in self.cib_objects]))
 
+    @completion_list
     def tag_list(self):
         "List of tags (for completion)"
         return list(set([x.obj_id for x in self.cib_objects if x.obj_type == "tag"]))
 
+    @completion_list
     def prim_id_list(self):
         "List of primitives ids (for group completion)."
         return [x.obj_id for x in self.cib_objects if x.obj_type == "primitive"]
 
+    @completion_list
     def children_id_list(self):
         "List of child ids (for clone/master completion)."
         return [x.obj_id for x in self.cib_objects if x.obj_type in constants.children_tags]
 
+    @completion_list
     def rsc_id_list(self):
         "List of all resource ids."
         return [x.obj_id for x in self.cib_objects
                 if x.obj_type in constants.resource_tags]
 
+    @completion_list
     def top_rsc_id_list(self):
         "List of top resource ids (for constraint completion)."
         return [x.obj_id for x in self.cib_objects
                 if x.obj_type in constants.resource_tags and not x.parent]
 
+    @completion_list
     def node_id_list(self):
         "List of node ids."
         return sorted([x.node.get("uname") for x in self.cib_objects
                        if x.obj_type == "node"])
 
+    @completion_list
     def f_prim_free_id_list(self):
         "List of possible primitives ids (for group completion)."
         return [x.obj_id for x in self.cib_objects
@@ -2920,16 +3148,19 @@ class CibFactory(object):
                 if x.obj_type == "primitive" and x.parent and \
                 x.parent.obj_id == gname]
 
+    @completion_list
     def f_group_id_list(self):
         "List of group ids."
         return [x.obj_id for x in self.cib_objects
                 if x.obj_type == "group"]
 
+    @completion_list
     def rsc_template_list(self):
         "List of templates."
         return [x.obj_id for x in self.cib_objects
                 if x.obj_type == "rsc_template"]
 
+    @completion_list
     def f_children_id_list(self):
         "List of possible child ids (for clone/master completion)."
         return [x.obj_id for x in self.cib_objects
@@ -2940,6 +3171,11 @@ class CibFactory(object):
     #
     def find_container_child(self, node):
         "Find an object which may be the child in a container."
+        if self._id_index is not None and node.tag != "fencing-topology":
+            for obj in reversed(self._id_index.get(node.get("id"), [])):
+                if node.tag == obj.node.tag and node.get("id") == obj.obj_id:
+                    return obj
+            return None
         for obj in reversed(self.cib_objects):
             if node.tag == "fencing-topology" and obj.xml_obj_type == "fencing-topology":
                 return obj
@@ -3061,6 +3297,7 @@ class CibFactory(object):
         id to reference.
         '''
         self.id_refs[id_ref] = attr_list_type
+        self.id_refs_gen += 1
         obj = self.find_resource(id_ref)
         if obj:
             nodes = obj.node.xpath(".//%s" % attr_list_type)
@@ -3260,12 +3497,15 @@ class CibFactory(object):
                 logger.error("in group %s child %s listed more than once", obj_id, child_id)
                 rc = False
             c_dict[child_id] = 1
-        for other in [x for x in self.cib_objects
-                      if x != obj and is_container(x.node)]:
-            shared_obj = set(obj.children) & set(other.children)
-            if shared_obj:
-                logger.error("%s contained in both %s and %s", ','.join([x.obj_id for x in shared_obj]), obj_id, other.obj_id)
-                rc = False
+        shared = {}
+        for child in obj.children:
+            for other in self._containers_of(child):
+                if other != obj:
+                    shared.setdefault(other, set()).add(child)
+        for other in sorted(shared, key=self.cib_objects.index):
+            shared_obj = shared[other]
+            logger.error("%s contained in both %s and %s", ','.join([x.obj_id for x in shared_obj]), obj_id, other.obj_id)
+            rc = False
         return rc
 
     def _verify_child(self, child_id, parent_tag, obj_id):
@@ -3329,6 +3569,7 @@ class CibFactory(object):
             obj.node.set('id', pset_id)
             topnode.append(obj.node)
             self.cib_objects.append(obj)
+            self._index_obj(obj)
         copy_nvpairs(obj.node, node)
         obj.normalize_parameters()
         obj.set_updated()
@@ -3409,7 +3650,9 @@ class CibFactory(object):
             if newnode.getparent() is not None:
                 newnode.getparent().remove(newnode)
             return True  # the new and the old versions are equal
+        self._unindex_obj(obj)
         obj.node = newnode
+        self._index_obj(obj)
         logger.debug("update CIB element: %s", str(obj))
         if oldnode.getparent() is not None:
             oldnode.getparent().replace(oldnode, newnode)
@@ -3549,11 +3792,20 @@ class CibFactory(object):
         Just a wrapper for _set_update() to allow for a
         rollback.
         '''
+        if not (mk_set or upd_set or del_set):
+            # nothing changed (see CibDiff.keep)
+            return self.check_structure()
         self._push_state()
-        if not self._set_update(edit_d, mk_set, upd_set, del_set, upd_type, method):
-            if not self._pop_state():
-                raise RuntimeError("this should never happen!")
-            return False
+        # the changes are applied in one batch: look up
+        # objects by id in an index instead of scanning
+        self._build_id_index()
+        try:
+            if not self._set_update(edit_d, mk_set, upd_set, del_set, upd_type, method):
+                if not self._pop_state():
+                    raise RuntimeError("this should never happen!")
+                return False
+        finally:
+            self._drop_id_index()
         self._drop_state()
         return True
 
@@ -3570,6 +3822,7 @@ class CibFactory(object):
         new_children = [self.find_resource(x) for x in new_children_ids]
         new_children = [c for c in new_children if c is not None]
         obj.children = new_children
+        self._children_index = None
         # relink orphans to top
         for child in set(old_children) - set(obj.children):
             logger.debug("relink child %s to top", str(child))
@@ -3632,6 +3885,7 @@ class CibFactory(object):
         obj.parent). Update also the XML, if necessary.
         '''
         obj.children = []
+        self._children_index = None
         if obj.obj_type not in constants.container_tags:
             return
         for c in obj.node.iterchildren():
@@ -3663,6 +3917,7 @@ class CibFactory(object):
         self._update_links(obj)
         obj.origin = "user"
         self.cib_objects.append(obj)
+        self._index_obj(obj)
         return obj
 
     def _add_children(self, obj_type, node):
@@ -3722,12 +3977,14 @@ class CibFactory(object):
         rmnode(obj.node)
         self._add_to_remove_queue(obj)
         self.cib_objects.remove(obj)
+        self._unindex_obj(obj)
         for tag in self.related_tags(obj):
             # remove self from tag
             # remove tag if self is last tagged object in tag
             selfies = [x for x in tag.node.iterchildren() if x.get('id') == obj.obj_id]
             for c in selfies:
                 rmnode(c)
+            tag.node_changed()
             if not tag.node.xpath('./obj_ref'):
                 self._remove_obj(tag)
                 if not self._no_constraint_rm_msg:
@@ -3762,6 +4019,8 @@ class CibFactory(object):
             return is_constraint(obj2.node) and rsc_constraint(obj.obj_id, obj2.node)
         if not is_resource(obj.node):
             return []
+        if self._id_index is not None:
+            return list(self._constraints_on(obj.obj_id))
         return [x for x in self.cib_objects if related_constraint(x)]
 
     def related_elements(self, obj):
@@ -3777,6 +4036,7 @@ class CibFactory(object):
         for child in obj.children:
             for c_obj in self.related_constraints(child):
                 rename_rscref(c_obj, child.obj_id, obj.obj_id)
+                self._constraints_index = None
         # drop useless constraints which may have been created above
         for c_obj in self.related_constraints(obj):
             if silly_constraint(c_obj.node, obj.obj_id):
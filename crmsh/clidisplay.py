@@ -35,6 +35,13 @@ def nopretty(cond=True):
             enable_pretty()
 
 
+def render_key():
+    '''
+    The state the output of the functions below depends on.
+    '''
+    return (_pretty, config.generation())
+
+
 def colors_enabled():
     return 'color' in config.color.style and _pretty
 
@@ -1,6 +1,7 @@
 # Copyright (C) 2008-2011 Dejan Muhamedagic <dmuhamedagic@suse.de>
 # See COPYING for license information.
 
+from lxml import etree
 from . import constants
 from . import clidisplay
 from . import utils
@@ -67,6 +68,9 @@ def cli_nvpairs(nvplist):
     return ' '.join([cli_nvpair(nvp) for nvp in nvplist])
 
 
+_nvpairs_xpath = etree.XPath('./nvpair | ./attributes/nvpair')
+
+
 def nvpairs2list(node, add_id=False):
     '''
     Convert an attribute node to a list of nvpairs.
@@ -78,7 +82,7 @@ def nvpairs2list(node, add_id=False):
     ret = []
     if 'id-ref' in node:
         ret.append(xmlutil.nvpair('$id-ref', node.get('id-ref')))
-    nvpairs = node.xpath('./nvpair | ./attributes/nvpair')
+    nvpairs = _nvpairs_xpath(node)
     if 'id' in node and (add_id or len(nvpairs) == 0):
         ret.append(xmlutil.nvpair('$id', node.get('id')))
     ret.extend(nvpairs)
@@ -0,0 +1,123 @@
+'''
+Shell completion of level and command names from a
+static table of the command tree, without loading
+the UI levels (which imports nearly all of crmsh).
+
+The table is generated from the UI (see UI.command_tree)
+by the first completion which needs the full UI, and
+cached per user, keyed on the crmsh version and the
+modification time of the UI modules.
+'''
+
+import os
+import shlex
+import marshal
+from . import config
+from . import constants
+
+
+CMDTREE_FILE = os.path.join(constants.CRM_CACHE_DIR, 'cmdtree')
+ROOT_ID = 'crmsh.ui_root.Root'
+_VERSION = 1
+
+
+def _key():
+    pkgdir = os.path.dirname(os.path.abspath(__file__))
+    mtime = max(e.stat().st_mtime for e in os.scandir(pkgdir)
+                if e.name.endswith('.py') and (e.name.startswith('ui_') or e.name == 'command.py'))
+    return [_VERSION, config.CRM_VERSION, pkgdir, mtime]
+
+
+def load():
+    '''
+    Returns the cached command tree, or None if missing or outdated
+    '''
+    try:
+        with open(CMDTREE_FILE, 'rb') as f:
+            key, tree = marshal.load(f)
+        if key == _key():
+            return tree
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        pass
+    return None
+
+
+def save(tree):
+    try:
+        os.makedirs(constants.CRM_CACHE_DIR, exist_ok=True)
+        tmp = "{}.{}".format(CMDTREE_FILE, os.getpid())
+        with open(tmp, 'wb') as f:
+            marshal.dump((_key(), tree), f)
+        os.replace(tmp, CMDTREE_FILE)
+    except (IOError, OSError):
+        pass
+
+
+def complete(tree, line):
+    '''
+    Same as ui_context.Context.complete() for level and command names,
+    returns None when a command is reached, since its arguments
+    need the dynamic completers
+    '''
+    complete_next = line.endswith(' ')
+    line = line.strip()
+    stack = [ROOT_ID]
+    if not line or line.startswith('#'):
+        return tree[ROOT_ID][0]
+    try:
+        tokens = shlex.split(line)
+    except ValueError:
+        return []
+    if complete_next:
+        tokens += ['']
+    for token in tokens:
+        completions, children = tree[stack[-1]]
+        if token not in children:
+            return completions
+        if children[token] is None:
+            return None
+        stack.append(children[token])
+    # reached the end on a valid level.
+    # return the completions for the previous level.
+    if len(stack) > 1:
+        return tree[stack[-2]][0]
+    return tree[ROOT_ID][0]
+
+
+def print_completions(line, words):
+    last_word = line.rsplit(' ', 1)
+    if len(last_word) > 1 and ':' in last_word[1]:
+        idx = last_word[1].rfind(':')
+        for w in words:
+            print(w[idx+1:])
+    else:
+        for w in words:
+            print(w)
+
+
+def strip_crm(line):
+    '''
+    remove [*]crm from commandline
+    '''
+    idx = line.find('crm')
+    if idx >= 0:
+        line = line[idx+3:].lstrip()
+    return line
+
+
+def compgen(args):
+    '''
+    Fast path of main.compgen
+    Returns False if the full UI is needed
+    '''
+    if len(args) < 2:
+        return True
+    tree = load()
+    if tree is None:
+        return False
+    line = strip_crm(args[1])
+    words = complete(tree, line)
+    if words is None:
+        return False
+    print_completions(line, words)
+    return True
@@ -505,6 +505,31 @@ Examples:
         setattr(cls, '_aliases', aliases)
         return children
 
+    @classmethod
+    def tree_id(cls):
+        return cls.__module__ + '.' + cls.__name__
+
+    @classmethod
+    def command_tree(cls, tree=None):
+        '''
+        Returns the static tree of level and command names,
+        from this level down, as used by the shell completion:
+        {level id: (completions, {child name: level id or None})}
+        '''
+        if tree is None:
+            tree = {}
+        if cls.tree_id() in tree:
+            return tree
+        children = {}
+        tree[cls.tree_id()] = ([x for x in cls._children.keys() if x not in cls._aliases], children)
+        for name, info in cls._children.items():
+            if info.type == 'level' and info.level:
+                children[name] = info.level.tree_id()
+                info.level.command_tree(tree)
+            else:
+                children[name] = None
+        return tree
+
 
 def make_name(new_name):
     '''
@@ -4,6 +4,7 @@
 # Helper completers
 
 from . import xmlutil
+from . import cache
 
 
 def choice(lst):
@@ -44,7 +45,22 @@ def join(*fns):
 booleans = choice(['yes', 'no', 'true', 'false', 'on', 'off'])
 
 
+def cib_snapshot(name, fn, with_status=False):
+    '''
+    Serve the list returned by fn from the per-user snapshot
+    for as long as the CIB version does not change.
+    '''
+    return cache.snapshot("cib-%s" % name, xmlutil.cib_version(with_status), fn)
+
+
 def resources(args=None):
+    which = args[0] if args and args[0] in ('promote', 'demote', 'started', 'stopped') else ''
+    # the running state is in the status section
+    return cib_snapshot("resources-%s" % which, lambda: _resources(args),
+                        with_status=which in ('started', 'stopped'))
+
+
+def _resources(args):
     cib_el = xmlutil.resources_xml()
     if cib_el is None:
         return []
@@ -68,6 +84,10 @@ def resources_stopped(args=None):
 
 
 def primitives(args):
+    return cib_snapshot("primitives", _primitives)
+
+
+def _primitives():
     cib_el = xmlutil.resources_xml()
     if cib_el is None:
         return []
@@ -75,7 +95,9 @@ def primitives(args):
     return [x.get("id") for x in nodes if xmlutil.is_primitive(x)]
 
 
-nodes = call(xmlutil.listnodes)
+def nodes(args):
+    # remote nodes are found in the status section
+    return cib_snapshot("nodes", xmlutil.listnodes, with_status=True)
 
 shadows = call(xmlutil.listshadows)
 
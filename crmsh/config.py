@@ -320,6 +320,7 @@ class _Configuration(object):
         self._defaults = None
         self._systemwide = None
         self._user = None
+        self.generation = 0  # bumped on every change
 
     def _safe_read(self, config_parser_inst, file_list):
         """
@@ -332,6 +333,7 @@ class _Configuration(object):
                 raise
 
     def load(self):
+        self.generation += 1
         self._defaults = configparser.ConfigParser()
         for section, keys in DEFAULTS.items():
             self._defaults.add_section(section)
@@ -378,6 +380,7 @@ class _Configuration(object):
         if not self._defaults.has_option(section, name):
             raise ValueError("Setting invalid option %s.%s" % (section, name))
         DEFAULTS[section][name].validate(value)
+        self.generation += 1
         if self._user is None:
             self._user = configparser.ConfigParser()
         if not self._user.has_section(section):
@@ -397,6 +400,7 @@ class _Configuration(object):
 
     def reset(self):
         '''reset to what is on disk'''
+        self.generation += 1
         self._user = configparser.ConfigParser()
         self._user.read([_PERUSER])
 
@@ -418,6 +422,14 @@ class _Section(object):
         return _configuration.items(self.section)
 
 
+def generation():
+    '''
+    Changes whenever the configuration changes, for those
+    caching something which depends on it.
+    '''
+    return _configuration.generation
+
+
 def load():
     _configuration.load()
 
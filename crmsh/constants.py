@@ -1,6 +1,7 @@
 # Copyright (C) 2008-2011 Dejan Muhamedagic <dmuhamedagic@suse.de>
 # See COPYING for license information.
 
+import os
 from .ordereddict import odict
 
 
@@ -489,6 +490,13 @@ QDEVICE_HELP_INFO = """  QDevice participates in quorum decisions. With the assi
   and highly recommended for 2 node clusters."""
 
 
+# Per-user cache directory
+CRM_CACHE_DIR = os.path.join(os.path.expanduser("~/.cache"), "crm")
+
+# Persistent ssh connections shared by all remote calls, see ssh_pool.py
+SSH_CONTROL_DIR = os.path.join(CRM_CACHE_DIR, "ssh")
+SSH_CONTROL_PERSIST = "60s"
+# Without the pool options, use ssh_pool.ssh_option() for ssh command lines
 SSH_OPTION = "-o StrictHostKeyChecking=no"
 
 
@@ -504,7 +512,7 @@ END = '\033[0m'
 
 
 CIB_QUERY = "cibadmin -Q"
-CIB_REPLACE = "cibadmin -R -X '{xmlstr}'"
+CIB_PATCH = "cibadmin --patch --xml-pipe"
 CIB_UPGRADE = "crm configure upgrade force"
 CIB_RAW_FILE = "/var/lib/pacemaker/cib/cib.xml"
 XML_NODE_PATH = "/cib/configuration/nodes/node"
@@ -121,8 +121,8 @@ def check_time_service():
     Check time service
     """
     task_inst = task.TaskCheck("Checking time service")
-    with task_inst.run():
-        timekeepers = ('chronyd.service', 'ntp.service', 'ntpd.service')
+    timekeepers = ('chronyd.service', 'ntp.service', 'ntpd.service')
+    with task_inst.run(), crmshutils.service_state_cache(timekeepers):
         timekeeper = None
         for tk in timekeepers:
             if crmshutils.service_is_available(tk):
@@ -203,7 +203,7 @@ def check_cluster_service(quiet=False):
     Check service status of pacemaker/corosync
     """
     task_inst = task.TaskCheck("Checking cluster service", quiet=quiet)
-    with task_inst.run():
+    with task_inst.run(), crmshutils.service_state_cache(("corosync", "pacemaker")):
         if crmshutils.service_is_enabled("pacemaker"):
             task_inst.info("pacemaker.service is enabled")
         else:
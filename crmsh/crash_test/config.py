@@ -7,3 +7,6 @@ ADD_PORT = "firewall-cmd --zone=public --add-port={port}/udp"
 FENCE_HISTORY = "stonith_admin -h {node}"
 SBD_CONF = "/etc/sysconfig/sbd"
 SBD_CHECK_CMD = "sbd -d {dev} dump"
+# Messages of running testcases are appended to a JSON Lines journal,
+# which is compacted into the json results every JOURNAL_COMPACT_INTERVAL messages
+JOURNAL_COMPACT_INTERVAL = 20
@@ -41,6 +41,7 @@ class Context(object):
 
         # set by argument(additional options)
         self.force = None
+        self.fsync = None
         self.help = None
 
     def __setattr__(self, name, value):
@@ -162,6 +163,8 @@ For each --kill-* testcase, report directory: {}'''.format(context.logfile,
     other_options = parser.add_argument_group('other options')
     other_options.add_argument('-f', '--force', dest='force', action='store_true',
                                help='Force to skip all prompts (Use with caution, the intended fault will be injected to verify the cluster resilence)')
+    other_options.add_argument('--fsync', dest='fsync', action='store_true',
+                               help='Sync every message of the journal to disk, so that messages are kept when this node is fenced (slower)')
     other_options.add_argument('-h', '--help', dest='help', action='store_true',
                                help='Show this help message and exit')
 
@@ -196,6 +199,8 @@ def run(context):
         raise crmshutils.TerminateSubCommand
     if not os.path.exists(context.var_dir):
         os.makedirs(context.var_dir, exist_ok=True)
+    # journal left over when the previous run was interrupted, like this node was fenced
+    utils.journal_compact()
 
     try:
         check.fix(context)
@@ -205,5 +210,8 @@ def run(context):
         split_brain(context)
 
     except KeyboardInterrupt:
-        utils.json_dumps()
+        # messages since the last full dump are only in the journal
+        utils.journal_compact(context.task_list)
         raise
+    finally:
+        utils.journal_compact()
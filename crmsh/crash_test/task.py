@@ -1,7 +1,7 @@
 import os
 import sys
-import re
 import time
+import queue
 import threading
 import shutil
 import tempfile
@@ -10,6 +10,7 @@ from crmsh import utils as crmshutils
 from crmsh import log
 from . import utils
 from . import config
+from . import watcher
 
 
 logger = log.setup_logger(__name__)
@@ -64,9 +65,25 @@ TYPE Yes TO CONTINUE, OTHER INPUTS WILL CANCEL THIS CASE [Yes/No](No): """
             self.passed = False
         self.messages.append((msg_type, msg, utils.now()))
         if self.flush:
-            self.to_json()
+            self.to_journal()
             self.to_report()
 
+    def to_journal(self):
+        """
+        Append the latest message to the journal instead of rewriting
+        the whole json results; do a full rewrite for the first message
+        and then every config.JOURNAL_COMPACT_INTERVAL messages
+        """
+        if len(self.messages) % config.JOURNAL_COMPACT_INTERVAL == 1:
+            self.to_json()
+            return
+        m = self.messages[-1]
+        utils.journal_append({
+            "Timestamp": self.timestamp,
+            "Description": self.description,
+            "Message": "{} {}:{}".format(m[2], m[0].upper(), m[1])
+        })
+
     def header(self):
         pass
 
@@ -126,37 +143,34 @@ TYPE Yes TO CONTINUE, OTHER INPUTS WILL CANCEL THIS CASE [Yes/No](No): """
         """
         target_node = None
         from_node = None
-        fence_timestamp = None
+        task_timestamp = crmshutils.parse_to_timestamp(self.timestamp, quiet=True)
 
-        # Try to find out which node fire the fence action
-        while not self.thread_stop_event.is_set():
-            rc, out, _ = crmshutils.get_stdout_stderr("crm_mon -1|grep -A1 \"Fencing Actions:\"")
-            if rc == 0 and out:
-                match = re.search(r"of (.*) pending: .*origin=(.*)$", out)
-                if match:
-                    target_node, from_node = match.groups()
+        events = watcher.watcher.subscribe()
+        try:
+            while not self.thread_stop_event.is_set():
+                try:
+                    event = events.get(timeout=1)
+                except queue.Empty:
+                    continue
+                # Try to find out which node fire the fence action
+                if event.type == watcher.EVENT_FENCE_PENDING and target_node is None:
+                    target_node, from_node = event.node, event.origin
                     self.info("Node \"{}\" will be fenced by \"{}\"!".format(target_node, from_node))
                     self.fence_start_event.set()
+                # If the fence action done later than this task started, that is the proof
+                elif event.type == watcher.EVENT_FENCE_SUCCESS and event.timestamp > task_timestamp and \
+                        event.node == (target_node or event.node):
+                    if target_node is None:
+                        # The whole fence action finished between two snapshots
+                        target_node, from_node = event.node, event.origin
+                        self.info("Node \"{}\" will be fenced by \"{}\"!".format(target_node, from_node))
+                        self.fence_start_event.set()
+                    self.info("Node \"{}\" was successfully fenced by \"{}\"".format(target_node, from_node))
+                    # Tell main thread fence happened
+                    self.fence_finish_event.set()
                     break
-            time.sleep(1)
-
-        # Try to find out proof that fence happened
-        while not self.thread_stop_event.is_set():
-            rc, out, _ = crmshutils.get_stdout_stderr(config.FENCE_HISTORY.format(node=target_node))
-            if rc == 0 and out:
-                match = re.search(r"Node {} last fenced at: (.*)".format(target_node), out)
-                if match:
-                    fence_timestamp = match.group(1)
-                    task_timestamp_dt = utils.str_to_datetime(self.timestamp, '%Y/%m/%d %H:%M:%S')
-                    fence_timestamp_dt = utils.str_to_datetime(fence_timestamp, '%a %b %d %H:%M:%S %Y')
-                    # If the fence action timestamp larger than this task's timestamp
-                    # That is the proof
-                    if task_timestamp_dt < fence_timestamp_dt:
-                        self.info("Node \"{}\" was successfully fenced by \"{}\"".format(target_node, from_node))
-                        # Tell main thread fence happened
-                        self.fence_finish_event.set()
-                        break
-            time.sleep(1)
+        finally:
+            watcher.watcher.unsubscribe(events)
 
 
 class TaskFence(Task):
@@ -3,10 +3,12 @@ import re
 import glob
 import json
 import logging
+import functools
 from datetime import datetime
 from contextlib import contextmanager
 from crmsh import utils as crmshutils
 from . import config
+from . import watcher
 from crmsh import log
 
 
@@ -90,12 +92,88 @@ def msg_error(msg, to_stdout=True):
 def json_dumps():
     """
     Dump the json results to file
+    The results in memory supersede the journal, so drop it
+    """
+    from . import main
+    _write_json(main.ctx.task_list)
+
+
+def _write_json(task_list):
+    """
+    Write task_list to the json results file and drop the journal
     """
     from . import main
     with open(main.ctx.jsonfile, 'w') as f:
-        f.write(json.dumps(main.ctx.task_list, indent=2))
+        f.write(json.dumps(task_list, indent=2))
         f.flush()
         os.fsync(f)
+    journal = journal_file()
+    if os.path.exists(journal):
+        os.remove(journal)
+
+
+def journal_file():
+    """
+    JSON Lines journal file next to the json results
+    """
+    from . import main
+    return "{}l".format(main.ctx.jsonfile)
+
+
+def journal_append(record):
+    """
+    Append one record to the journal
+    Synced to disk only with the --fsync option; the full rewrites
+    of the json results are always synced
+    """
+    from . import main
+    with open(journal_file(), 'a') as f:
+        f.write(json.dumps(record) + '\n')
+        if main.ctx.fsync:
+            f.flush()
+            os.fsync(f)
+
+
+def journal_compact(task_list=None):
+    """
+    Fold the journal into the json results file
+    Each journal record holds one message of the task identified by
+    its Timestamp and Description; the journal is folded into task_list
+    when given, else into the json results file.
+    The tasks in memory are not touched, so a journal left over
+    by the previous run does not leak into the results of this run
+    """
+    from . import main
+    journal = journal_file()
+    if task_list is not None:
+        task_list = [dict(t, Messages=list(t.get("Messages", []))) for t in task_list]
+    elif not os.path.exists(journal):
+        return
+    else:
+        task_list = []
+        if os.path.exists(main.ctx.jsonfile):
+            with open(main.ctx.jsonfile) as f:
+                try:
+                    task_list = json.load(f)
+                except ValueError:
+                    task_list = []
+    index = {(t.get("Timestamp"), t.get("Description")): t for t in task_list}
+    if not os.path.exists(journal):
+        _write_json(task_list)
+        return
+    with open(journal) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # a partial line written right before crash
+                continue
+            key = (record["Timestamp"], record["Description"])
+            if key not in index:
+                index[key] = {"Timestamp": key[0], "Description": key[1], "Messages": []}
+                task_list.append(index[key])
+            index[key]["Messages"].append(record["Message"])
+    _write_json(task_list)
 
 
 class FenceInfo(object):
@@ -142,7 +220,10 @@ def check_node_status(node, state):
 def online_nodes():
     """
     Get online node list
+    Use the latest snapshot of the cluster watcher when it is running
     """
+    if watcher.watcher.running:
+        return list(watcher.watcher.online_nodes)
     rc, stdout, stderr = crmshutils.get_stdout_stderr('crm_mon -1')
     if rc == 0 and stdout:
         res = re.search(r'Online:\s+\[\s(.*)\s\]', stdout)
@@ -162,6 +243,7 @@ def peer_node_list():
     return []
 
 
+@functools.lru_cache(maxsize=None)
 def this_node():
     """
     Try to get the node name from crm_node command
@@ -0,0 +1,143 @@
+import time
+import queue
+import threading
+from collections import namedtuple
+from crmsh import utils as crmshutils
+from crmsh import xmlutil
+from crmsh import log
+
+
+logger = log.setup_logger(__name__)
+
+
+# type:       one of the EVENT_* below
+# timestamp:  UNIX timestamp of the event; completion time for fence actions
+# node:       target node of fence action
+# origin:     node which requested the fence action
+# action:     fence action
+Event = namedtuple("Event", ["type", "timestamp", "node", "origin", "action"])
+
+EVENT_FENCE_PENDING = "fence-pending"
+EVENT_FENCE_SUCCESS = "fence-success"
+
+FENCE_EVENT_TYPES = {
+    "pending": EVENT_FENCE_PENDING,
+    "success": EVENT_FENCE_SUCCESS
+}
+
+
+class ClusterWatcher(object):
+    """
+    Watch the cluster and publish fencing events
+
+    One watcher thread takes a crm_mon xml snapshot (with fence history)
+    every INTERVAL seconds and diffs it against the previous one;
+    every subscriber gets the events through its own queue, instead of
+    each monitoring thread forking crm_mon, stonith_admin and crm_node itself.
+    This polls rather than following a stream: crm_mon prints xml only
+    in one-shot mode, and pacemaker has no command line tool streaming
+    the fencing notifications. The online nodes of the latest snapshot
+    are kept too (see utils.online_nodes()).
+    """
+    CMD = "crm_mon -1 --output-as=xml --fence-history=3"
+    INTERVAL = 1
+    # seconds to wait for the watcher thread to exit
+    STOP_TIMEOUT = 5
+
+    def __init__(self):
+        """
+        Init function
+        """
+        self.subscribers = []
+        self.online_nodes = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self._seen_fence_events = set()
+
+    def subscribe(self):
+        """
+        Return a queue receiving the events, start watching if not yet
+        """
+        q = queue.Queue()
+        with self.lock:
+            self.subscribers.append(q)
+            if self.thread is None:
+                # a new event for each thread, so a previous thread
+                # still finishing its poll is never revived
+                self.stop_event = threading.Event()
+                self.thread = threading.Thread(target=self._run, args=(self.stop_event,), daemon=True)
+                self.thread.start()
+        return q
+
+    def unsubscribe(self, q):
+        """
+        Remove the subscriber, stop watching when no more subscribers
+        """
+        thread = None
+        with self.lock:
+            if q in self.subscribers:
+                self.subscribers.remove(q)
+            if not self.subscribers and self.thread is not None:
+                self.stop_event.set()
+                thread, self.thread = self.thread, None
+        if thread is not None:
+            thread.join(self.STOP_TIMEOUT)
+
+    @property
+    def running(self):
+        return self.thread is not None and self.online_nodes is not None
+
+    def _run(self, stop_event):
+        while not stop_event.is_set():
+            self.poll(stop_event)
+            stop_event.wait(self.INTERVAL)
+
+    def _publish(self, event, stop_event=None):
+        with self.lock:
+            if stop_event is not None and stop_event.is_set():
+                return
+            for q in self.subscribers:
+                q.put(event)
+
+    def poll(self, stop_event=None):
+        """
+        Take one snapshot and publish the changes,
+        unless stop_event was set meanwhile
+        """
+        rc, out, _ = crmshutils.get_stdout_stderr(self.CMD, no_reg=True)
+        if rc != 0 or not out:
+            return
+        elem = xmlutil.text2elem(out)
+        if elem is None:
+            return
+        for event in self.diff(elem):
+            self._publish(event, stop_event)
+
+    def diff(self, elem):
+        """
+        Return the events found in crm_mon xml elem since the previous one
+        """
+        events = []
+        now = time.time()
+
+        for fence in elem.xpath("//fence_history/fence_event"):
+            status = fence.get("status")
+            if status not in FENCE_EVENT_TYPES:
+                continue
+            key = (fence.get("target"), fence.get("action"), fence.get("origin"),
+                   status, fence.get("completed"))
+            if key in self._seen_fence_events:
+                continue
+            self._seen_fence_events.add(key)
+            timestamp = now
+            if fence.get("completed"):
+                timestamp = crmshutils.parse_to_timestamp(fence.get("completed"), quiet=True) or now
+            events.append(Event(FENCE_EVENT_TYPES[status], timestamp,
+                                fence.get("target"), fence.get("origin"), fence.get("action")))
+
+        self.online_nodes = sorted(n.get("name") for n in elem.xpath("//nodes/node[@online='true']"))
+        return events
+
+
+watcher = ClusterWatcher()
@@ -2,6 +2,7 @@
 # See COPYING for license information.
 
 import re
+import functools
 
 
 headmatcher = re.compile(r'\{\{(\#|\^)?([A-Za-z0-9\#\$:_-]+)\}\}')
@@ -71,45 +72,99 @@ def _textify(obj):
     return str(obj)
 
 
-def _parse(template, context, strict):
-    ret = ""
-    while template:
-        head = headmatcher.search(template)
+# instructions of a compiled template
+_LITERAL, _LOOKUP, _SECTION, _INVERTED, _NEWLINE = range(5)
+
+
+def _ends_with_newline(out):
+    for s in reversed(out):
+        if s:
+            return s.endswith('\n')
+    return False
+
+
+def _drop_last_char(out):
+    for i in range(len(out) - 1, -1, -1):
+        if out[i]:
+            out[i] = out[i][:-1]
+            return
+
+
+@functools.lru_cache(maxsize=512)
+def _compile(template):
+    """
+    Compile the template into a tuple of instructions:
+    (_LITERAL, text)
+    (_LOOKUP, path)
+    (_SECTION or _INVERTED, path, body, strip), with strip set if
+    the body starts with a newline; the body is compiled only when
+    rendered, as is the case with errors in it
+    (_NEWLINE,) a newline unless the output ends with one
+    """
+    code = []
+    pos = 0
+    while pos < len(template):
+        head = headmatcher.search(template, pos)
         if head is None:
-            ret += template
+            code.append((_LITERAL, template[pos:]))
             break
         istart, iend, prefix, key = head.start(0), head.end(0), head.group(1), head.group(2)
-        if istart > 0:
-            ret += template[:istart]
-        path, block, invert = key.split(':'), prefix == '#', prefix == '^'
+        if istart > pos:
+            code.append((_LITERAL, template[pos:istart]))
+        path = tuple(key.split(':'))
         if not path:
             raise ValueError("empty {{}} block found")
-        obj = _resolve(path, context, strict)
-        if block or invert:
+        if prefix in ('#', '^'):
             tailtag = '{{/%s}}' % (key)
-            tailidx = iend + template[head.end(0):].find(tailtag)
-            if tailidx < iend:
+            tailidx = template.find(tailtag, iend)
+            if tailidx < 0:
                 raise ValueError("Unclosed conditional: %s" % head.group(0))
+            body = template[iend:tailidx]
+            code.append((_SECTION if prefix == '#' else _INVERTED, path,
+                         body, body.startswith('\n')))
             iend = tailidx + len(tailtag)
-            body = template[head.end(0):tailidx]
-            if body.startswith('\n') and (not ret or ret.endswith('\n')):
-                ret = ret[:-1]
-            if block:
+            if template.startswith('\n', iend):
+                code.append((_NEWLINE,))
+                iend += 1
+        else:
+            code.append((_LOOKUP, path))
+        pos = iend
+    return tuple(code)
+
+
+def _render(code, context, strict, out):
+    for op in code:
+        kind = op[0]
+        if kind == _LITERAL:
+            out.append(op[1])
+        elif kind == _LOOKUP:
+            obj = _resolve(op[1], context, strict)
+            if obj is not None:
+                out.append(_textify(obj))
+        elif kind == _NEWLINE:
+            if not _ends_with_newline(out):
+                out.append('\n')
+        else:
+            _, path, body, strip = op
+            obj = _resolve(path, context, strict)
+            if strip and (not any(out) or _ends_with_newline(out)):
+                _drop_last_char(out)
+            if kind == _SECTION:
                 if obj in (None, False):
                     pass
                 elif isinstance(obj, (tuple, list)):
                     for it in obj:
-                        ret += _parse(body, _push(path, it, context), strict)
+                        out.append(_parse(_compile(body), _push(path, it, context), strict))
                 else:
-                    ret += _parse(body, context, strict)
+                    out.append(_parse(_compile(body), context, strict))
             elif not obj:
-                ret += _parse(body, _push(path, "", context), strict)
-            if ret.endswith('\n') and template[iend:].startswith('\n'):
-                iend += 1
-        elif obj is not None:
-            ret += _textify(obj)
-        template = template[iend:]
-    return ret
+                out.append(_parse(_compile(body), _push(path, "", context), strict))
+
+
+def _parse(code, context, strict):
+    out = []
+    _render(code, context, strict, out)
+    return ''.join(out)
 
 
 def parse(template, values, strict=False):
@@ -124,4 +179,4 @@ def parse(template, values, strict=False):
     {{^object}} ... {{/object}} = if object is falsy, process text.
     If a path evaluates to a callable, the callable will be invoked to get the value.
     """
-    return _parse(template, [values], strict)
+    return _parse(_compile(template), [values], strict)
@@ -11,7 +11,10 @@ file. In that file, there are help for
  - commands in levels
 
 The help file is lazily loaded when the first
-request for help is made.
+request for help is made. The index of the entries
+is cached (keyed on the help file mtime), and the
+long help texts are read from the help file only
+when displayed.
 
 All help is in the following form in the manual:
 [[cmdhelp_<level>_<cmd>,<short help text>]]
@@ -27,8 +30,10 @@ Help for the level itself is like this:
 
 import os
 import re
+import marshal
 from .utils import page_string, get_stdout_stderr
 from . import config
+from . import constants
 from . import clidisplay
 from .ordereddict import odict
 from . import log
@@ -71,15 +76,33 @@ class HelpFilter(object):
 
 
 class HelpEntry(object):
-    def __init__(self, short_help, long_help='', alias_for=None, generated=False):
+    def __init__(self, short_help, long_help='', alias_for=None, generated=False, long_loader=None):
         if short_help:
             self.short = short_help[0].upper() + short_help[1:]
         else:
             self.short = 'Help'
-        self.long = long_help
+        # the long help is loader() + _long, loaded on first access
+        self._long = long_help
+        self._long_loader = long_loader
         self.alias_for = alias_for
         self.generated = generated
 
+    @property
+    def long(self):
+        if self._long_loader is not None:
+            loader, self._long_loader = self._long_loader, None
+            self._long = loader() + self._long
+        return self._long
+
+    @long.setter
+    def long(self, value):
+        self._long_loader = None
+        self._long = value
+
+    def append_long_help(self, s):
+        'append to the long help, without loading it'
+        self._long += s
+
     def is_alias(self):
         return self.alias_for is not None
 
@@ -117,6 +140,8 @@ class HelpEntry(object):
 
 
 HELP_FILE = os.path.join(config.path.sharedir, 'crm.8.adoc')
+HELP_INDEX = os.path.join(constants.CRM_CACHE_DIR, 'help.index')
+_INDEX_VERSION = 1
 
 _DEFAULT = HelpEntry('No help available', long_help='', alias_for=None, generated=True)
 _REFERENCE_RE = re.compile(r'<<[^,]+,(.+)>>')
@@ -295,6 +320,102 @@ def add_help(entry, topic=None, level=None, command=None):
             _LEVELS[level] = entry
 
 
+def _parse_header(line):
+    'returns a new entry'
+    entry = {'type': '', 'name': '', 'level': '', 'short': '', "from_cli": False}
+    line = line[2:-3]  # strip [[ and ]]\n
+    info, short_help = line.split(',', 1)
+    # TODO see https://github.com/ClusterLabs/crmsh/pull/644
+    # This solution has shortcome to delete the content of adoc,
+    # which lose the static man page archive
+    if "From Code" in short_help:
+        short_help, _ = short_help.split(',')
+        entry['from_cli'] = True
+    entry['short'] = short_help.strip()
+    info = info.split('_')
+    if info[0] == 'topics':
+        entry['type'] = 'topic'
+        entry['name'] = info[-1]
+    elif info[0] == 'cmdhelp':
+        if len(info) == 2:
+            entry['type'] = 'level'
+            entry['name'] = info[1]
+        elif len(info) >= 3:
+            entry['type'] = 'command'
+            entry['level'] = info[1]
+            entry['name'] = '_'.join(info[2:])
+
+    return entry
+
+
+def _parse_help_file(name):
+    """
+    Parse the help file into a list of entries,
+    the long help of an entry is located by its offset and length in the file
+    """
+    index = []
+    entry = None
+    offset = 0
+    with open(name, 'rb') as helpfile:
+        for raw_line in helpfile:
+            line = raw_line.decode('utf-8')
+            if line.startswith('[['):
+                if entry is not None:
+                    index.append(entry)
+                entry = _parse_header(line)
+                entry['offset'], entry['length'] = offset + len(raw_line), 0
+            elif entry is not None and line.startswith('===') and entry['length']:
+                index.append(entry)
+                entry = None
+            elif entry is not None:
+                entry['length'] += len(raw_line)
+            offset += len(raw_line)
+    if entry is not None:
+        index.append(entry)
+    return index
+
+
+def _load_help_index(name):
+    """
+    Return the entries of the help file from the index cache,
+    parse the help file and update the cache if it is outdated
+    """
+    stat = os.stat(name)
+    key = [_INDEX_VERSION, config.CRM_VERSION, os.path.abspath(name), stat.st_mtime, stat.st_size]
+    try:
+        with open(HELP_INDEX, 'rb') as f:
+            cached_key, index = marshal.load(f)
+        if cached_key == key:
+            return index
+    except (IOError, EOFError, ValueError, TypeError):
+        pass
+
+    index = _parse_help_file(name)
+    try:
+        os.makedirs(constants.CRM_CACHE_DIR, exist_ok=True)
+        tmp = "{}.{}".format(HELP_INDEX, os.getpid())
+        with open(tmp, 'wb') as f:
+            marshal.dump((key, index), f)
+        os.replace(tmp, HELP_INDEX)
+    except (IOError, OSError) as msg:
+        logger.debug("Could not update help index cache: %s", msg)
+    return index
+
+
+def _read_long_help(name, offset, length):
+    """
+    Read the long help of an entry from the help file
+    """
+    with open(name, 'rb') as helpfile:
+        helpfile.seek(offset)
+        long_help = helpfile.read(length).decode('utf-8')
+    # <<...>> references -> short description
+    long_help = _REFERENCE_RE.sub(r'\1', long_help)
+    if long_help.startswith('=='):
+        long_help = long_help.split('\n', 1)[1]
+    return long_help.rstrip()
+
+
 def _load_help():
     '''
     Lazily load and parse crm.8.adoc.
@@ -304,75 +425,47 @@ def _load_help():
         return
     _LOADED = True
 
-    def parse_header(line):
-        'returns a new entry'
-        entry = {'type': '', 'name': '', 'short': '', 'long': '', "from_cli": False}
-        line = line[2:-3]  # strip [[ and ]]\n
-        info, short_help = line.split(',', 1)
-        # TODO see https://github.com/ClusterLabs/crmsh/pull/644
-        # This solution has shortcome to delete the content of adoc,
-        # which lose the static man page archive
-        if "From Code" in short_help:
-            short_help, _ = short_help.split(',')
-            entry['from_cli'] = True
-        entry['short'] = short_help.strip()
-        info = info.split('_')
-        if info[0] == 'topics':
-            entry['type'] = 'topic'
-            entry['name'] = info[-1]
-        elif info[0] == 'cmdhelp':
-            if len(info) == 2:
-                entry['type'] = 'level'
-                entry['name'] = info[1]
-            elif len(info) >= 3:
-                entry['type'] = 'command'
-                entry['level'] = info[1]
-                entry['name'] = '_'.join(info[2:])
-
-        return entry
-
-    def process(entry):
+    def long_loader(name, entry):
+        def load():
+            return _read_long_help(name, entry['offset'], entry['length'])
+        if not entry['from_cli']:
+            return load
+
+        def load_from_cli():
+            _, help_output, _ = get_stdout_stderr("crm {} {} --help".format(entry['level'], entry['name']))
+            if help_output:
+                return help_output.rstrip()
+            return load()
+        return load_from_cli
+
+    def process(name, entry):
         'writes the entry into topics/levels/commands'
-        short_help = entry['short']
-        long_help = entry['long']
-        if long_help.startswith('=='):
-            long_help = long_help.split('\n', 1)[1]
-        helpobj = HelpEntry(short_help, long_help.rstrip())
-        name = entry['name']
+        helpobj = HelpEntry(entry['short'], long_loader=long_loader(name, entry))
         if entry['type'] == 'topic':
-            _TOPICS[name] = helpobj
+            _TOPICS[entry['name']] = helpobj
         elif entry['type'] == 'level':
-            _LEVELS[name] = helpobj
+            _LEVELS[entry['name']] = helpobj
         elif entry['type'] == 'command':
             lvl = entry['level']
             if lvl not in _COMMANDS:
                 _COMMANDS[lvl] = odict()
-            if entry['from_cli']:
-                _, help_output, _ = get_stdout_stderr("crm {} {} --help".format(lvl, name))
-                if help_output:
-                    helpobj.set_long_help(help_output.rstrip())
-            _COMMANDS[lvl][name] = helpobj
-
-    def filter_line(line):
-        '''clean up an input line
-         - <<...>> references -> short description
-        '''
-        return _REFERENCE_RE.sub(r'\1', line)
+            _COMMANDS[lvl][entry['name']] = helpobj
 
     def append_cmdinfos():
         "append command information to level descriptions"
         for lvlname, level in _LEVELS.items():
             if lvlname in _COMMANDS:
-                level.long += "\n\nCommands:\n"
+                s = "\n\nCommands:\n"
                 max_width = get_max_width(_COMMANDS[lvlname])
                 for cmdname, cmd in sorted(iter(_COMMANDS[lvlname].items()), key=lambda x: x[0]):
                     if cmdname in _hidden_commands or cmdname.startswith('_'):
                         continue
-                    level.long += "\t" + _titleline(cmdname, cmd.short, width=max_width)
-                level.long += "\n"
+                    s += "\t" + _titleline(cmdname, cmd.short, width=max_width)
+                s += "\n"
                 for cmdname, cmd in sorted(iter(_COMMANDS[lvlname].items()), key=lambda x: x[0]):
                     if cmdname in _hidden_commands:
-                        level.long += "\t" + _titleline(cmdname, cmd.short, width=max_width)
+                        s += "\t" + _titleline(cmdname, cmd.short, width=max_width)
+                level.append_long_help(s)
 
     def fixup_root_commands():
         "root commands appear as levels"
@@ -395,7 +488,8 @@ def _load_help():
             if alias in _COMMANDS[lvlname]:
                 return
             info = _COMMANDS[lvlname][command]
-            _COMMANDS[lvlname][alias] = HelpEntry(info.short, info.long, (alias, command))
+            _COMMANDS[lvlname][alias] = HelpEntry(info.short, alias_for=(alias, command),
+                                                  long_loader=lambda: info.long)
 
         def add_aliases_for_level(lvl):
             for name, info in lvl.children().items():
@@ -413,21 +507,8 @@ def _load_help():
 
     try:
         name = os.getenv("CRM_HELP_FILE") or HELP_FILE
-        helpfile = open(name, 'r')
-        entry = None
-        for line in helpfile:
-            if line.startswith('[['):
-                if entry is not None:
-                    process(entry)
-                entry = parse_header(line)
-            elif entry is not None and line.startswith('===') and entry['long']:
-                process(entry)
-                entry = None
-            elif entry is not None:
-                entry['long'] += filter_line(line)
-        if entry is not None:
-            process(entry)
-        helpfile.close()
+        for entry in _load_help_index(name):
+            process(name, entry)
         append_cmdinfos()
         fixup_root_commands()
         fixup_help_aliases()
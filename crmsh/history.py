@@ -5,11 +5,18 @@
 import os
 import time
 import re
+import bz2
 import glob
+import queue
+import hashlib
+import marshal
+import tarfile
+import threading
 import configparser
 
 from . import config
 from . import constants
+from . import options
 from . import userdir
 from . import logtime
 from . import logparser
@@ -100,6 +107,31 @@ def rpt_pe2t_str(rpt_pe_file):
     return logparser.trans_str(node, rpt_pe_file)
 
 
+def is_pe_input(path):
+    return os.path.basename(os.path.dirname(path)) == "pengine" and path.endswith(".bz2")
+
+
+def _check_member_path(name):
+    path = os.path.normpath(name)
+    if os.path.isabs(path) or path == ".." or path.startswith("../"):
+        raise tarfile.TarError("%s: member outside of the report directory" % (name))
+
+
+def _extract(tar, member, path):
+    if getattr(tarfile, "tar_filter", None) is not None:
+        tar.extract(member, path, filter="tar")
+        return
+    # no extraction filters in this python, do the checks of the "tar" filter
+    _check_member_path(member.name)
+    if member.isdev():
+        raise tarfile.TarError("%s: device files are not allowed" % (member.name))
+    if member.issym():
+        _check_member_path(os.path.join(os.path.dirname(member.name), member.linkname))
+    elif member.islnk():
+        _check_member_path(member.linkname)
+    tar.extract(member, path)
+
+
 def mkarchive(idir):
     "Create an archive from a directory"
     home = userdir.gethomedir()
@@ -135,6 +167,8 @@ class Report(object):
                   "BLUE",
                   "RED")
     session_sub = "session"
+    simulate_sub = ".simulate"
+    prerender_workers = 2
     report_cache_dir = os.path.join(config.path.cache, 'history-%s' % (utils.getuser()))
     outdir = os.path.join(report_cache_dir, "psshout")
     errdir = os.path.join(report_cache_dir, "pssherr")
@@ -163,6 +197,10 @@ class Report(object):
         # change_origin may be 0, CH_SRC, CH_TIME, CH_UPD
         # depending on the change_origin, we update our attributes
         self.change_origin = CH_SRC
+        self._sim_locks = {}
+        self._sim_guard = threading.Lock()
+        self._prerender_q = None
+        self._prerendered = set()
         logtime.set_year()
 
     def error(self, s):
@@ -195,17 +233,13 @@ class Report(object):
         Don't unpack if the directory already exists!
         '''
         bfname = os.path.basename(tarball)
-        parentdir = os.path.dirname(tarball)
-        logger.debug("tarball: %s, in dir: %s", bfname, parentdir)
+        logger.debug("tarball: %s, in dir: %s", bfname, os.path.dirname(tarball))
         if bfname.endswith(".tar.bz2"):
             loc = tarball.replace(".tar.bz2", "")
-            tar_unpack_option = "j"
         elif bfname.endswith(".tar.gz"):  # hmm, must be ancient
             loc = tarball.replace(".tar.gz", "")
-            tar_unpack_option = "z"
         elif bfname.endswith(".tar.xz"):
             loc = tarball.replace(".tar.xz", "")
-            tar_unpack_option = "J"
         else:
             self.error("this doesn't look like a report tarball")
             return None
@@ -214,30 +248,56 @@ class Report(object):
             if (os.stat(tarball).st_mtime - os.stat(loc).st_mtime) < 60:
                 return loc
             utils.rmdir_r(loc)
-        cwd = os.getcwd()
-        if parentdir:
-            try:
-                os.chdir(parentdir)
-            except OSError as msg:
-                self.error(msg)
-                return None
         try:
-            rc, tf_loc = utils.get_stdout("tar -t%s < %s 2> /dev/null | head -1" % (tar_unpack_option, utils.quote(bfname)))
-            if os.path.abspath(tf_loc) != os.path.abspath(loc):
-                logger.debug("top directory in tarball: %s, doesn't match the tarball name: %s", tf_loc, loc)
-                loc = os.path.join(os.path.dirname(loc), tf_loc)
-        except Exception as msg:
+            loc = self._unpack_tarball(tarball, loc)
+        except (tarfile.TarError, IOError, OSError, EOFError) as msg:
             logger.error("%s: %s", tarball, msg)
-            return None
-        logger.debug("tar -x%s < %s", tar_unpack_option, utils.quote(bfname))
-        rc = utils.pipe_cmd_nosudo("tar -x%s < %s" % (tar_unpack_option, utils.quote(bfname)))
+            loc = None
         if self.source == "live":
-            os.remove(bfname)
-        os.chdir(cwd)
-        if rc != 0:
-            return None
+            os.remove(tarball)
+        return loc
+
+    def _unpack_tarball(self, tarball, loc):
+        '''
+        Extract the report in one streaming pass over the
+        tarball. The PE inputs are kept compressed in the PE
+        index pack (see logparser.PEIndex), and extracted only
+        on access. The index and pack of a report which was
+        packed again are merged into the new ones.
+        '''
+        parentdir = os.path.dirname(tarball)
+        logger.debug("extracting %s in %s", tarball, parentdir or ".")
+        peindex = None
+        try:
+            with tarfile.open(tarball, "r|*") as tar:
+                for member in tar:
+                    if peindex is None:
+                        top = os.path.normpath(member.name).split(os.sep)[0]
+                        if os.path.abspath(os.path.join(parentdir, top)) != os.path.abspath(loc):
+                            logger.debug("top directory in tarball: %s, doesn't match the tarball name: %s", top, loc)
+                            loc = os.path.join(os.path.dirname(loc), top)
+                        peindex = logparser.PEIndex(loc)
+                    path = os.path.normpath(os.path.join(parentdir, member.name))
+                    if member.isfile() and is_pe_input(member.name):
+                        peindex.add_member(path, tar.extractfile(member), member.mtime)
+                    elif member.isfile() and path == os.path.normpath(peindex.indexfile()):
+                        peindex.add_packed_index(tar.extractfile(member))
+                    elif member.isfile() and path == os.path.normpath(peindex.packfile()):
+                        peindex.add_pack(tar.extractfile(member))
+                    else:
+                        _extract(tar, member, parentdir)
+        finally:
+            if peindex is not None:
+                peindex.close()
         return loc
 
+    def extract_pe_input(self, pe_file):
+        '''
+        Make sure that the PE input is extracted.
+        '''
+        if self.logparser is not None:
+            self.logparser.peindex.extract(pe_file)
+
     def short_pe_path(self, pe_file):
         return pe_file.replace("%s/" % self.loc, "")
 
@@ -779,10 +839,7 @@ class Report(object):
         self.display_logs(self.logparser.get_events())
 
     def find_transition(self, t_str):
-        for t_obj in self.logparser.get_transitions():
-            if str(t_obj) == t_str:
-                return t_obj
-        return None
+        return self.logparser.find_transition(t_str)
 
     def show_transition_log(self, rpt_pe_file, full_log=False):
         '''
@@ -846,9 +903,9 @@ class Report(object):
             # the format string occurs also below
             self._str_nodecolor(t_obj.dc, '%-13s' % t_obj.shortname())
         ]
-        l += utils.get_cib_attributes(t_obj.path(), "cib",
-                                      ("update-client", "update-user", "update-origin"),
-                                      ("no-client", "no-user", "no-origin"))
+        l += self.logparser.peindex.get_attributes(t_obj.path(),
+                                                   ("update-client", "update-user", "update-origin"),
+                                                   ("no-client", "no-user", "no-origin"))
         l += [" ".join(sorted(t_obj.tags))]
         return '%s %s %s  %-13s %-10s %-10s %s   %s' % tuple(l)
 
@@ -865,6 +922,7 @@ class Report(object):
         l = [verbose and self.pe_detail_format(t_obj) or t_obj.path()
              for t_obj in self.logparser.get_transitions() if pe_file_in_range(t_obj.pe_file, a)]
         if verbose:
+            self.logparser.peindex.save()
             l = [pe_details_hdr, pe_details_sep] + l
         return l
 
@@ -888,6 +946,85 @@ class Report(object):
             return f
         return None
 
+    def _sim_lock(self, key):
+        with self._sim_guard:
+            return self._sim_locks.setdefault(key, threading.Lock())
+
+    def _simulate(self, simdir, pe_file, opts):
+        self.extract_pe_input(pe_file)
+        try:
+            with open(pe_file, "rb") as f:
+                data = f.read()
+        except IOError as msg:
+            logger.error("open: %s", msg)
+            return None
+        if simdir is None:
+            return utils.simulate(bz2.decompress(data), *opts)
+        h = hashlib.sha1(data)
+        h.update(utils.ptest_version().encode("utf-8"))
+        dotfile = config.core.dotty and not opts[0] and "{dotfile}" or None
+        h.update(utils.ptest_cmd(*opts, dotfile=dotfile).encode("utf-8"))
+        cached = os.path.join(simdir, h.hexdigest())
+        with self._sim_lock(cached):
+            try:
+                with open(cached, "rb") as f:
+                    return marshal.load(f)
+            except (IOError, OSError, EOFError, ValueError, TypeError):
+                pass
+            r = utils.simulate(bz2.decompress(data), *opts)
+            try:
+                os.makedirs(simdir, exist_ok=True)
+                tmp = "%s.%s" % (cached, threading.get_ident())
+                with open(tmp, "wb") as f:
+                    marshal.dump(r, f)
+                os.replace(tmp, cached)
+            except (IOError, OSError) as msg:
+                logger.debug("failed to save simulation of %s: %s", pe_file, msg)
+            return r
+
+    def simulate(self, pe_file, nograph, scores, utilization, actions, verbosity):
+        '''
+        Run the PE input thru ptest(8), see utils.simulate().
+        The results are kept next to the report, keyed on the
+        PE input contents, the ptest version and options.
+        '''
+        opts = (nograph, scores, utilization, actions, verbosity)
+        if options.regression_tests:
+            return self._simulate(None, pe_file, opts)
+        return self._simulate(os.path.join(self.loc, self.simulate_sub), pe_file, opts)
+
+    def _prerender_worker(self):
+        while True:
+            simdir, pe_file, opts = self._prerender_q.get()
+            try:
+                self._simulate(simdir, pe_file, opts)
+            except Exception as msg:
+                logger.debug("failed to prerender %s: %s", pe_file, msg)
+            finally:
+                self._prerender_q.task_done()
+
+    def prerender_transitions(self, verbosity):
+        '''
+        Render the transitions of the current time frame in the
+        background, as the transition command shows them by
+        default.
+        '''
+        if options.regression_tests:
+            return
+        pe_l = self.pelist()
+        if not pe_l:
+            return
+        if self._prerender_q is None:
+            self._prerender_q = queue.Queue()
+            for _ in range(self.prerender_workers):
+                threading.Thread(target=self._prerender_worker, daemon=True).start()
+        simdir = os.path.join(self.loc, self.simulate_sub)
+        opts = (False, False, False, False, verbosity)
+        for pe_file in reversed(pe_l):
+            if pe_file not in self._prerendered:
+                self._prerendered.add(pe_file)
+                self._prerender_q.put((simdir, pe_file, opts))
+
     def find_file(self, f):
         return utils.file_find_by_name(self.loc, f)
 
@@ -2,12 +2,15 @@
 # See COPYING for license information.
 
 
-import re
+import os
 import time
+import random
+import threading
 from contextlib import contextmanager
 
 from . import utils
 from . import config
+from . import ssh_pool
 from . import log
 
 
@@ -91,26 +94,39 @@ class RemoteLock(Lock):
     """
     A class inherited from Lock class
     Define the behavior how to claim lock on remote node and how to wait the lock released
+
+    The lock directory on remote node contains a lease file, with the owner,
+    the pid and the expiry time; the owner renews the lease while holding the lock,
+    so that the lock of a dead owner can be taken over once the lease expired
     """
 
     SSH_TIMEOUT = 10
-    SSH_OPTION = "-o ConnectTimeout={} -o StrictHostKeyChecking=no".format(SSH_TIMEOUT)
+    SSH_OPTION = "-o ConnectTimeout={}".format(SSH_TIMEOUT)
     SSH_EXIT_ERR = 255
     MIN_LOCK_TIMEOUT = 120
-    WAIT_INTERVAL = 10
+    LEASE_FILE = "{}/lease".format(Lock.LOCK_DIR)
+    LEASE_TIME = 60
+    BACKOFF_MIN = 0.5
+    BACKOFF_MAX = 8
 
     def __init__(self, remote_node):
         """
         Init function
         """
         self.remote_node = remote_node
+        self.lease_owner = "{} {}".format(utils.this_node(), os.getpid())
+        self.current_lease = None
+        self.remote_time = 0
+        self.renew_stop_event = threading.Event()
+        self.renew_thread = None
         super(__class__, self).__init__()
 
     def _run(self, cmd):
         """
         Run command on remote node
+        ssh connection is shared while waiting, see ssh_pool.py
         """
-        cmd = "ssh {} root@{} \"{}\"".format(self.SSH_OPTION, self.remote_node, cmd)
+        cmd = "ssh {} {} root@{} \"{}\"".format(self.SSH_OPTION, ssh_pool.ssh_option(), self.remote_node, cmd)
         rc, out, err = utils.get_stdout_stderr(cmd)
         if rc == self.SSH_EXIT_ERR:
             raise SSHError(err)
@@ -129,14 +145,80 @@ class RemoteLock(Lock):
             raise ValueError("Minimum value of core.lock_timeout should be {}".format(self.MIN_LOCK_TIMEOUT))
         return value
 
-    def _get_online_nodelist(self):
+    def _new_lease(self):
+        """
+        Return the shell words of the lease: owner, pid and expiry time,
+        the expiry time is computed by the clock of the remote node
+        """
+        return "{} \\$((\\$(date +%s) + {}))".format(self.lease_owner, self.LEASE_TIME)
+
+    @staticmethod
+    def _parse_lease(s):
+        """
+        Return (owner, pid, expiry) from the lease string, None if invalid
+        """
+        items = s.split() if s else []
+        if len(items) != 3 or not items[2].isdigit():
+            return None
+        return items[0], items[1], int(items[2])
+
+    def _create_lock_dir(self):
+        """
+        Create lock directory with the lease in it, mkdir command was atomic
+        If failed, save the current lease of the lock owner and the time
+        of the remote node, to which the lease expiry time compares
+        """
+        cmd = "if {mkdir} 2>/dev/null; then echo {lease} > {file}; else cat {file}; date +%s; exit 1; fi".format(
+                mkdir=self.MKDIR_CMD, lease=self._new_lease(), file=self.LEASE_FILE)
+        rc, out, _ = self._run(cmd)
+        if rc == 0:
+            self.lock_owner = True
+            self.current_lease = None
+            return True
+        lines = out.splitlines() if out else []
+        self.remote_time = int(lines[-1]) if lines and lines[-1].isdigit() else 0
+        self.current_lease = self._parse_lease(lines[0]) if len(lines) > 1 else None
+        return False
+
+    def _takeover_stale_lease(self, lease):
         """
-        Get the online node list from remote node
+        Remove the lock directory if it still contains the expired lease
+        The directory is renamed away first and the lease is checked in the
+        renamed one, so that no other waiter can claim the lock in between;
+        if the lease is not the expired one any more, put the directory back
         """
-        rc, out, err = self._run("crm_node -l")
-        if rc != 0 and err:
-            raise ValueError(err)
-        return re.findall('[0-9]+ (.*) member', out)
+        stale_dir = "{}.stale.{}".format(self.LOCK_DIR, self.lease_owner.replace(" ", "."))
+        cmd = ("mv -T {lock} {stale} 2>/dev/null || exit 1; "
+               "if grep -qxF '{lease}' {stale}/lease; then rm -rf {stale}; "
+               "else mv -T {stale} {lock} 2>/dev/null || rm -rf {stale}; exit 1; fi").format(
+                       lock=self.LOCK_DIR, stale=stale_dir, lease="{} {} {}".format(*lease))
+        rc, _, _ = self._run(cmd)
+        if rc == 0:
+            logger.warning("Took over the expired lock of %s(pid %s) on %s", lease[0], lease[1], self.remote_node)
+            return True
+        return False
+
+    def _renew_lease(self):
+        """
+        Renew the lease every LEASE_TIME/3 seconds, until unlocked
+        """
+        while not self.renew_stop_event.wait(self.LEASE_TIME / 3):
+            cmd = "grep -q '^{} ' {} && echo {} > {}".format(self.lease_owner, self.LEASE_FILE, self._new_lease(), self.LEASE_FILE)
+            try:
+                self._run(cmd)
+            except SSHError as err:
+                logger.debug("Failed to renew the lease on %s: %s", self.remote_node, err)
+
+    def _start_renew_lease(self):
+        self.renew_stop_event.clear()
+        self.renew_thread = threading.Thread(target=self._renew_lease, daemon=True)
+        self.renew_thread.start()
+
+    def _stop_renew_lease(self):
+        if self.renew_thread is not None:
+            self.renew_stop_event.set()
+            self.renew_thread.join()
+            self.renew_thread = None
 
     def _lock_or_wait(self):
         """
@@ -144,8 +226,8 @@ class RemoteLock(Lock):
         raise ClaimLockError if reached the lock_timeout
         """
         warned_once = False
-        online_list = []
-        pre_online_list = []
+        pre_owner = None
+        delay = self.BACKOFF_MIN
         expired_error_str = "Cannot continue since the lock directory exists at the node ({}:{})".format(self.remote_node, self.LOCK_DIR)
 
         current_time = int(time.time())
@@ -155,24 +237,40 @@ class RemoteLock(Lock):
             # Try to claim the lock
             if self._create_lock_dir():
                 # Success
+                self._start_renew_lease()
                 break
 
-            # Might lose claiming lock again, start to wait again
-            online_list = self._get_online_nodelist()
-            if pre_online_list and pre_online_list != online_list:
-                timeout = current_time + self.lock_timeout
-            pre_online_list = online_list
+            lease = self.current_lease
+            if lease:
+                # The owner died without releasing the lock
+                if lease[2] < self.remote_time and self._takeover_stale_lease(lease):
+                    delay = self.BACKOFF_MIN
+                    continue
+                # Lock owner changed, start to wait again
+                if pre_owner and pre_owner != lease[:2]:
+                    timeout = current_time + self.lock_timeout
+                pre_owner = lease[:2]
 
             if not warned_once:
                 warned_once = True
                 logger.warning("Might have unfinished process on other nodes, wait %ss...", self.lock_timeout)
 
-            time.sleep(self.WAIT_INTERVAL)
+            # Exponential backoff with jitter
+            time.sleep(random.uniform(delay / 2, delay))
+            delay = min(delay * 2, self.BACKOFF_MAX)
             current_time = int(time.time())
 
         else:
             raise ClaimLockError("Timed out after {} seconds. {}".format(self.lock_timeout, expired_error_str))
 
+    def _unlock(self):
+        """
+        Stop renewing the lease, remove the lock directory if still owned
+        """
+        if self.lock_owner:
+            self._stop_renew_lease()
+            self._run("grep -q '^{} ' {} && {}".format(self.lease_owner, self.LEASE_FILE, self.RM_CMD))
+
     @contextmanager
     def lock(self):
         """
@@ -3,12 +3,18 @@
 
 import bz2
 import gzip
+import io
+import lzma
 import re
 import os
 import sys
+import shutil
+import threading
+import bisect
 import collections
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from . import xmlutil
 from . import logtime
@@ -24,11 +30,15 @@ _METADATA_FILENAME = "__meta.json"
 _METADATA_CACHE_AGE = (60.0 * 60.0)
 # Update this when changing the metadata format
 _METADATA_VERSION = 1
+_PEINDEX_FILENAME = "__peindex.json"
+_PEPACK_FILENAME = "__peinputs.pack"
+_PEINDEX_VERSION = 1
+_PEINDEX_WORKERS = 8
 
 
 def _open_logfile(logfile):
     """
-    Open a file which may be gz|bz2 compressed.
+    Open a file which may be gz|bz2|xz compressed.
     Uncompress based on extension.
     """
     try:
@@ -36,6 +46,8 @@ def _open_logfile(logfile):
             return bz2.BZ2File(logfile)
         if logfile.endswith(".gz"):
             return gzip.open(logfile)
+        if logfile.endswith(".xz"):
+            return lzma.open(logfile)
         return open(logfile, "rb")
     except IOError as msg:
         logger.error("open %s: %s", logfile, msg)
@@ -163,24 +175,32 @@ class Transition(object):
         )
         return s
 
-    def empty(self, prev):
+    def empty(self, prev, peindex=None):
         """
         True if this transition resulted in no actions and no CIB changes
         prev: previous transition
+        peindex: PEIndex to read the epochs from
         """
         old_pe_l_file = prev.path()
         new_pe_l_file = self.path()
         no_actions = self.actions_count() == 0
-        if not os.path.isfile(old_pe_l_file) or not os.path.isfile(new_pe_l_file):
+        exists = peindex.exists if peindex is not None else os.path.isfile
+        if not exists(old_pe_l_file) or not exists(new_pe_l_file):
             return no_actions
-        old_cib = xmlutil.compressed_file_to_cib(old_pe_l_file)
-        new_cib = xmlutil.compressed_file_to_cib(new_pe_l_file)
+        if peindex is not None:
+            old_cib = peindex.get(old_pe_l_file)
+            new_cib = peindex.get(new_pe_l_file)
+        else:
+            old_cib = xmlutil.compressed_file_to_cib(old_pe_l_file)
+            new_cib = xmlutil.compressed_file_to_cib(new_pe_l_file)
+            old_cib = old_cib is not None and old_cib.attrib or None
+            new_cib = new_cib is not None and new_cib.attrib or None
         if old_cib is None or new_cib is None:
             return no_actions
-        prev_epoch = old_cib.attrib.get("epoch", "0")
-        epoch = new_cib.attrib.get("epoch", "0")
-        prev_admin_epoch = old_cib.attrib.get("admin_epoch", "0")
-        admin_epoch = new_cib.attrib.get("admin_epoch", "0")
+        prev_epoch = old_cib.get("epoch", "0")
+        epoch = new_cib.get("epoch", "0")
+        prev_admin_epoch = old_cib.get("admin_epoch", "0")
+        admin_epoch = new_cib.get("admin_epoch", "0")
         return no_actions and epoch == prev_epoch and admin_epoch == prev_admin_epoch
 
     def transition_info(self):
@@ -213,6 +233,281 @@ class Transition(object):
         return t
 
 
+_ROOT_ATTR_RE = re.compile(r'([^\s=]+)="([^"]*)"')
+
+
+def root_attributes(f, compressed):
+    """
+    Attributes of the cib element read from the file object,
+    decompressing only as much as needed to read the start tag.
+    Returns None if there is no cib element.
+    """
+    dec = bz2.BZ2Decompressor() if compressed else None
+    head = b""
+    while True:
+        start = head.find(b"<cib ")
+        end = head.find(b">", start) if start >= 0 else -1
+        if end >= 0:
+            break
+        chunk = f.read(4096)
+        if not chunk or (dec is not None and dec.eof):
+            return None
+        head += dec.decompress(chunk) if dec is not None else chunk
+    tag = utils.to_ascii(head[start:end])
+    return dict(_ROOT_ATTR_RE.findall(tag))
+
+
+def pe_root_attributes(pe_file):
+    """
+    Attributes of the cib element of the PE input, or None if
+    the file can't be read.
+    """
+    try:
+        with open(pe_file, "rb") as f:
+            return root_attributes(f, pe_file.endswith(".bz2"))
+    except (IOError, OSError, EOFError) as e:
+        logger.debug("%s: %s", pe_file, e)
+        return None
+
+
+class PEIndex(object):
+    """
+    Index of the PE inputs in a report: the root attributes
+    (epoch, admin_epoch, num_updates, dc-uuid, update-*, ...)
+    of every PE input, so that they are not decompressed and
+    parsed every time. Saved next to the report in
+    %(_PEINDEX_FILENAME), entries are kept as long as the file
+    size and mtime don't change.
+
+    PE inputs read from a report tarball are not extracted
+    right away: they are appended, still compressed, to
+    %(_PEPACK_FILENAME) and the index keeps their offsets, so
+    that they are written out only on access (see extract()).
+    A report packed again carries its own index and pack, which
+    are merged in (see add_packed_index() and add_pack()).
+    """
+
+    def __init__(self, loc):
+        self.loc = loc
+        self.entries = None
+        self.members = None
+        self.dirty = False
+        self._pack = None
+        self._packed_index = None
+        self._pack_base = None
+        self._lock = threading.Lock()
+
+    def indexfile(self):
+        return os.path.join(self.loc, _PEINDEX_FILENAME)
+
+    def packfile(self):
+        return os.path.join(self.loc, _PEPACK_FILENAME)
+
+    def _load(self):
+        if self.entries is not None:
+            return
+        self.entries, self.members = {}, {}
+        try:
+            with open(self.indexfile(), 'r') as f:
+                obj = json.load(f)
+            if obj.get("version") == _PEINDEX_VERSION:
+                self.entries, self.members = obj["entries"], obj["members"]
+        except (IOError, ValueError, KeyError, AttributeError) as e:
+            logger.debug("Could not load PE index: %s", e)
+
+    def save(self):
+        if not self.dirty:
+            return
+        fn = self.indexfile()
+        try:
+            tmp = "%s.%s" % (fn, os.getpid())
+            with open(tmp, 'wt') as f:
+                json.dump({"version": _PEINDEX_VERSION, "entries": self.entries, "members": self.members}, f)
+            os.replace(tmp, fn)
+            self.dirty = False
+            logger.debug("PE index saved to %s", fn)
+        except (IOError, OSError) as e:
+            logger.debug("Could not update PE index: %s", e)
+
+    def _key(self, pe_file):
+        return os.path.relpath(pe_file, self.loc)
+
+    @staticmethod
+    def _stamp(pe_file):
+        try:
+            st = os.stat(pe_file)
+        except OSError:
+            return None
+        return [st.st_size, st.st_mtime_ns]
+
+    def _lookup(self, pe_file):
+        """
+        (stamp, attributes) if the entry is up to date, else (stamp, False)
+        """
+        stamp = self._stamp(pe_file)
+        entry = self.entries.get(self._key(pe_file))
+        if entry is not None and entry[0] == stamp:
+            return stamp, entry[1]
+        return stamp, False
+
+    def _open_pack(self):
+        self._load()
+        if self._pack is None:
+            os.makedirs(self.loc, exist_ok=True)
+            self._pack = open(self.packfile(), 'ab')
+
+    def add_member(self, pe_file, f, mtime):
+        """
+        Append the PE input read from the file object to the pack
+        """
+        self._open_pack()
+        offset = self._pack.tell()
+        shutil.copyfileobj(f, self._pack)
+        self.members[self._key(pe_file)] = [offset, self._pack.tell() - offset, mtime]
+        self.dirty = True
+
+    def add_pack(self, f):
+        """
+        Append the pack of a packed report, read from the file object
+        """
+        self._open_pack()
+        self._pack_base = self._pack.tell()
+        shutil.copyfileobj(f, self._pack)
+        self._merge_packed()
+
+    def add_packed_index(self, f):
+        """
+        Merge the index of a packed report, read from the file object
+        """
+        self._load()
+        try:
+            obj = json.loads(f.read().decode('utf-8'))
+            if obj.get("version") == _PEINDEX_VERSION:
+                self._packed_index = (obj["entries"], obj["members"])
+        except (ValueError, KeyError, AttributeError) as e:
+            logger.debug("Could not load PE index: %s", e)
+        self._merge_packed()
+
+    def _merge_packed(self, entries_only=False):
+        """
+        Merge the packed index once its pack was appended too;
+        members already in the index are kept
+        """
+        if self._packed_index is None or (self._pack_base is None and not entries_only):
+            return
+        entries, members = self._packed_index
+        self._packed_index = None
+        for key, entry in entries.items():
+            self.entries.setdefault(key, entry)
+        if not entries_only:
+            for key, (offset, size, mtime) in members.items():
+                self.members.setdefault(key, [self._pack_base + offset, size, mtime])
+        self.dirty = True
+
+    def close(self):
+        # an index without its pack: only the attributes are usable
+        self._merge_packed(entries_only=True)
+        if self._pack is not None:
+            self._pack.close()
+            self._pack = None
+        self.save()
+
+    def _read_member(self, key):
+        offset, size, _ = self.members[key]
+        with open(self.packfile(), 'rb') as f:
+            f.seek(offset)
+            return f.read(size)
+
+    def exists(self, pe_file):
+        """
+        True if the PE input is in the report, extracted or not
+        """
+        if os.path.isfile(pe_file):
+            return True
+        self._load()
+        return self._key(pe_file) in self.members
+
+    def extract(self, pe_file):
+        """
+        Write the PE input out of the pack, if not there yet
+        """
+        if os.path.isfile(pe_file):
+            return
+        self._load()
+        key = self._key(pe_file)
+        if key not in self.members:
+            return
+        with self._lock:
+            if os.path.isfile(pe_file):
+                return
+            logger.debug("extracting %s", pe_file)
+            try:
+                data = self._read_member(key)
+                os.makedirs(os.path.dirname(pe_file), exist_ok=True)
+                tmp = "%s.%s" % (pe_file, os.getpid())
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                mtime = self.members[key][2]
+                os.utime(tmp, (mtime, mtime))
+                os.replace(tmp, pe_file)
+            except (IOError, OSError) as e:
+                logger.error("%s: %s", pe_file, e)
+
+    def _attributes(self, pe_file):
+        key = self._key(pe_file)
+        if key in self.members and not os.path.isfile(pe_file):
+            try:
+                return root_attributes(io.BytesIO(self._read_member(key)), True)
+            except (IOError, OSError, EOFError) as e:
+                logger.debug("%s: %s", pe_file, e)
+                return None
+        return pe_root_attributes(pe_file)
+
+    def _indexable(self, pe_file, stamp):
+        return stamp is not None or self._key(pe_file) in self.members
+
+    def update(self, pe_files):
+        """
+        Index the PE inputs not indexed yet, decompressing
+        them in parallel.
+        """
+        self._load()
+        todo = []
+        for pe_file in pe_files:
+            stamp, attrs = self._lookup(pe_file)
+            if attrs is False and self._indexable(pe_file, stamp):
+                todo.append((pe_file, stamp))
+        if not todo:
+            return
+        with ThreadPoolExecutor(max_workers=min(_PEINDEX_WORKERS, len(todo))) as pool:
+            for (pe_file, stamp), attrs in zip(todo, pool.map(self._attributes, [t[0] for t in todo])):
+                self.entries[self._key(pe_file)] = [stamp, attrs]
+        self.dirty = True
+        self.save()
+
+    def get(self, pe_file):
+        """
+        The root attributes of the PE input, or None
+        """
+        self._load()
+        stamp, attrs = self._lookup(pe_file)
+        if attrs is False:
+            attrs = self._attributes(pe_file)
+            if self._indexable(pe_file, stamp):
+                self.entries[self._key(pe_file)] = [stamp, attrs]
+                self.dirty = True
+        return attrs
+
+    def get_attributes(self, pe_file, attr_l, dflt_l):
+        """
+        Like utils.get_cib_attributes, from the index
+        """
+        attrs = self.get(pe_file)
+        if attrs is None:
+            return list(dflt_l)
+        return [attrs.get(a) or d for a, d in zip(attr_l, dflt_l)]
+
+
 class CibInfo(object):
     def __init__(self, report_path):
         self.filename = utils.file_find_by_name(report_path, "cib.xml")
@@ -282,6 +577,8 @@ class LogParser(object):
 
         self.events = {}
         self.transitions = []
+        self.peindex = PEIndex(loc)
+        self._index_transitions()
 
         self.from_ts = None
         self.to_ts = None
@@ -376,7 +673,7 @@ class LogParser(object):
                         transitions_map[id_] = transition
                         logger.debug("{Transition: %s", transition)
 
-                        if not os.path.isfile(transition.path()):
+                        if not self.peindex.exists(transition.path()):
                             missing_pefiles.append((dc, pe_orig))
                     else:
                         logger.debug("~Transition: %s old(%s, %s) new(%s, %s)", transition, transition.trans_num, transition.pe_file, trans_num, pe_file)
@@ -423,13 +720,15 @@ class LogParser(object):
         self.transitions.sort(key=lambda t: t.start_ts)
         for etype, logs in self.events.items():
             logs.sort(key=lambda e: e[0])
-        empties = []
+        self.peindex.update([t.path() for t in self.transitions])
+        empties = set()
         for i, t in enumerate(self.transitions):
             if i == 0:
                 continue
-            if t.empty(self.transitions[i - 1]):
-                empties.append(t)
+            if t.empty(self.transitions[i - 1], self.peindex):
+                empties.add(t)
         self.transitions = [t for t in self.transitions if t not in empties]
+        self._index_transitions()
         self._save_cache()
         if missing_pefiles:
             rdict = collections.defaultdict(list)
@@ -536,14 +835,40 @@ class LogParser(object):
                     if not (self.from_ts and ts < self.from_ts) and not (self.to_ts and ts > self.to_ts):
                         yield msg
 
+    def _index_transitions(self):
+        """
+        Transitions by name, and their start times (sorted) to
+        find the ones within the timeframe. A name can belong to
+        several transitions once the PE input numbers wrap around.
+        """
+        self._transitions_map = {}
+        for t in self.transitions:
+            self._transitions_map.setdefault(str(t), []).append(t)
+        self._start_tss = [t.start_ts or 0 for t in self.transitions]
+
+    def _in_timeframe(self, t):
+        return not (self.from_ts and t.end_ts and t.end_ts < self.from_ts) and not (self.to_ts and t.start_ts and t.start_ts > self.to_ts)
+
     def get_transitions(self):
         """
         Yields transitions within the current timeframe
         """
-        for t in self.transitions:
-            if not (self.from_ts and t.end_ts and t.end_ts < self.from_ts) and not (self.to_ts and t.start_ts and t.start_ts > self.to_ts):
+        end = len(self.transitions)
+        if self.to_ts:
+            end = bisect.bisect_right(self._start_tss, self.to_ts)
+        for t in self.transitions[:end]:
+            if self._in_timeframe(t):
                 yield t
 
+    def find_transition(self, t_str):
+        """
+        The first transition named t_str within the current timeframe
+        """
+        for t in self._transitions_map.get(t_str, []):
+            if self._in_timeframe(t):
+                return t
+        return None
+
     def _get_patt_l(self, etype):
         '''
         get the list of patterns for this type, up to and
@@ -594,6 +919,7 @@ class LogParser(object):
             return False
         self.events = obj["events"]
         self.transitions = [Transition.from_dict(self.loc, t) for t in obj["transitions"]]
+        self._index_transitions()
         return True
 
     def _metafile(self):
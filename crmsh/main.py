@@ -13,6 +13,7 @@ from . import clidisplay
 from . import term
 from . import utils
 from . import userdir
+from . import cmdtree
 
 from . import ui_root
 from . import ui_context
@@ -285,24 +286,16 @@ def compgen():
     options.shell_completion = True
 
     # point = int(args[0])
-    line = args[1]
-
-    # remove [*]crm from commandline
-    idx = line.find('crm')
-    if idx >= 0:
-        line = line[idx+3:].lstrip()
+    line = cmdtree.strip_crm(args[1])
 
     options.interactive = False
     ui = ui_root.Root()
     context = ui_context.Context(ui)
-    last_word = line.rsplit(' ', 1)
-    if len(last_word) > 1 and ':' in last_word[1]:
-        idx = last_word[1].rfind(':')
-        for w in context.complete(line):
-            print(w[idx+1:])
-    else:
-        for w in context.complete(line):
-            print(w)
+    cmdtree.print_completions(line, context.complete(line))
+
+    # generate the table for the fast path, see bin/crm
+    if cmdtree.load() is None:
+        cmdtree.save(ui_root.Root.command_tree())
 
 
 def parse_options():
@@ -90,6 +90,7 @@ well:
 
 import ast
 import sys
+import functools
 import operator as op
 
 ########################################
@@ -162,204 +163,260 @@ DEFAULT_NAMES = {"True": True, "False": False}
 # And the actual evaluator:
 
 
-class SimpleEval(object):  # pylint: disable=too-few-public-methods
-    """ A very simple expression parser.
-        >>> s = SimpleEval()
-        >>> s.eval("20 + 30 - ( 10 * 5)")
-        0
-        """
-    expr = ""
+def _unavailable(node):
+    name = type(node).__name__
 
-    def __init__(self, names):
-        """
-            Create the evaluator instance.  Set up valid operators (+,-, etc)
-            functions (add, random, get_val, whatever) and names. """
+    def unavailable(ev):
+        raise FeatureNotAvailable("Sorry, {0} is not available in this "
+                                  "evaluator".format(name))
+    return unavailable
 
-        operators = DEFAULT_OPERATORS
-        names = names.copy()
-        names.update(DEFAULT_NAMES)
 
-        self.operators = operators
-        self.names = names
+def _compile_node(node):
+    """
+    Translate the node into a closure taking the evaluator
+    (for the names and operators) and returning the value.
+    Errors are raised when the closure is called, as they
+    would be when evaluating the node.
+    """
+    try:
+        compiler = _COMPILERS[type(node)]
+    except KeyError:
+        return _unavailable(node)
+    return compiler(node)
 
-        self.nodes = {
-            ast.Num: self._eval_num,
-            ast.Str: self._eval_str,
-            ast.Name: self._eval_name,
-            ast.UnaryOp: self._eval_unaryop,
-            ast.BinOp: self._eval_binop,
-            ast.BoolOp: self._eval_boolop,
-            ast.Compare: self._eval_compare,
-            ast.IfExp: self._eval_ifexp,
-            ast.keyword: self._eval_keyword,
-            ast.Subscript: self._eval_subscript,
-            ast.Attribute: self._eval_attribute,
-            ast.Index: self._eval_index,
-            ast.Slice: self._eval_slice,
-        }
 
-        # py3k stuff:
-        if hasattr(ast, 'NameConstant'):
-            self.nodes[ast.NameConstant] = self._eval_constant
-        elif isinstance(self.names, dict) and "None" not in self.names:
-            self.names["None"] = None
+def _too_long(msg):
+    def too_long(ev):
+        raise IterableTooLong(msg)
+    return too_long
 
-        # py3.8 uses ast.Constant instead of ast.Num, ast.Str, ast.NameConstant
-        if hasattr(ast, 'Constant'):
-            self.nodes[ast.Constant] = self._eval_constant
 
-    def evaluate(self, expr):
-        """ evaluate an expresssion, using the operators, functions and
-            names previously set up. """
+def _compile_num(node):
+    value = node.n
+    return lambda ev: value
 
-        # set a copy of the expression aside, so we can give nice errors...
 
-        self.expr = expr
+def _compile_str(node):
+    value = node.s
+    if len(value) > MAX_STRING_LENGTH:
+        return _too_long("String Literal in statement is too long!"
+                         " ({0}, when {1} is max)".format(
+                             len(value), MAX_STRING_LENGTH))
+    return lambda ev: value
 
-        # and evaluate:
-        return self._eval(ast.parse(expr.strip()).body[0].value)
 
-    def _eval(self, node):
-        """ The internal evaluator used on each node in the parsed tree. """
+def _compile_constant(node):
+    value = node.value
+    if hasattr(value, '__len__') and len(value) > MAX_STRING_LENGTH:
+        return _too_long("Literal in statement is too long!"
+                         " ({0}, when {1} is max)"
+                         "".format(len(value), MAX_STRING_LENGTH))
+    return lambda ev: value
 
-        try:
-            handler = self.nodes[type(node)]
-        except KeyError:
-            raise FeatureNotAvailable("Sorry, {0} is not available in this "
-                                      "evaluator".format(type(node).__name__))
-
-        return handler(node)
-
-    @staticmethod
-    def _eval_num(node):
-        return node.n
-
-    @staticmethod
-    def _eval_str(node):
-        if len(node.s) > MAX_STRING_LENGTH:
-            raise IterableTooLong("String Literal in statement is too long!"
-                                  " ({0}, when {1} is max)".format(
-                                      len(node.s), MAX_STRING_LENGTH))
-        return node.s
-
-    @staticmethod
-    def _eval_constant(node):
-        if (hasattr(node.value, '__len__') and
-                len(node.value) > MAX_STRING_LENGTH):
-            raise IterableTooLong("Literal in statement is too long!"
-                                  " ({0}, when {1} is max)"
-                                  "".format(len(node.value),
-                                            MAX_STRING_LENGTH))
-        return node.value
-
-    def _eval_unaryop(self, node):
-        return self.operators[type(node.op)](self._eval(node.operand))
-
-    def _eval_binop(self, node):
-        return self.operators[type(node.op)](self._eval(node.left),
-                                             self._eval(node.right))
-
-    def _eval_boolop(self, node):
-        if isinstance(node.op, ast.And):
+
+def _compile_name(node):
+    name = node.id
+    return lambda ev: ev.lookup(name)
+
+
+def _compile_unaryop(node):
+    optype, operand = type(node.op), _compile_node(node.operand)
+    return lambda ev: ev.operators[optype](operand(ev))
+
+
+def _compile_binop(node):
+    optype = type(node.op)
+    left, right = _compile_node(node.left), _compile_node(node.right)
+    return lambda ev: ev.operators[optype](left(ev), right(ev))
+
+
+def _compile_boolop(node):
+    values = [_compile_node(value) for value in node.values]
+    if isinstance(node.op, ast.And):
+        def boolop_and(ev):
             vout = False
-            for value in node.values:
-                vout = self._eval(value)
+            for value in values:
+                vout = value(ev)
                 if not vout:
                     return False
             return vout
-        elif isinstance(node.op, ast.Or):
-            for value in node.values:
-                vout = self._eval(value)
+        return boolop_and
+    elif isinstance(node.op, ast.Or):
+        def boolop_or(ev):
+            for value in values:
+                vout = value(ev)
                 if vout:
                     return vout
             return False
+        return boolop_or
+    return lambda ev: None
 
-    def _eval_compare(self, node):
-        left = self._eval(node.left)
-        for operation, comp in zip(node.ops, node.comparators):
-            right = self._eval(comp)
-            if self.operators[type(operation)](left, right):
-                left = right  # Hi Dr. Seuss...
+
+def _compile_compare(node):
+    left = _compile_node(node.left)
+    comparisons = [(type(operation), _compile_node(comp))
+                   for operation, comp in zip(node.ops, node.comparators)]
+
+    def compare(ev):
+        lvalue = left(ev)
+        for optype, comp in comparisons:
+            right = comp(ev)
+            if ev.operators[optype](lvalue, right):
+                lvalue = right  # Hi Dr. Seuss...
             else:
                 return False
         return True
+    return compare
 
-    def _eval_ifexp(self, node):
-        return self._eval(node.body) if self._eval(node.test) \
-                                         else self._eval(node.orelse)
 
-    def _eval_keyword(self, node):
-        return node.arg, self._eval(node.value)
+def _compile_ifexp(node):
+    test, body, orelse = (_compile_node(node.test), _compile_node(node.body),
+                          _compile_node(node.orelse))
+    return lambda ev: body(ev) if test(ev) else orelse(ev)
 
-    def _eval_name(self, node):
-        try:
-            # This happens at least for slicing
-            # This is a safe thing to do because it is impossible
-            # that there is a true exression assigning to none
-            # (the compiler rejects it, so you can't even
-            # pass that to ast.parse)
-            if isinstance(self.names, dict):
-                return self.names[node.id]
-            elif callable(self.names):
-                return self.names(node)
-            else:
-                raise InvalidExpression('Trying to use name (variable) "{0}"'
-                                        ' when no "names" defined for'
-                                        ' evaluator'.format(node.id))
 
-        except KeyError:
-            if node.id in self.functions:
-                return self.functions[node.id]
+def _compile_keyword(node):
+    arg, value = node.arg, _compile_node(node.value)
+    return lambda ev: (arg, value(ev))
 
-            raise NameNotDefined(node.id, self.expr)
 
-    def _eval_subscript(self, node):
+def _compile_subscript(node):
+    container, key = _compile_node(node.value), _compile_node(node.slice)
+    return lambda ev: container(ev)[key(ev)]
 
-        container = self._eval(node.value)
-        key = self._eval(node.slice)
-        try:
-            return container[key]
-        except KeyError:
-            raise
 
-    def _eval_attribute(self, node):
+def _compile_attribute(node):
+    attr, value = node.attr, _compile_node(node.value)
+
+    def attribute(ev):
         for prefix in DISALLOW_PREFIXES:
-            if node.attr.startswith(prefix):
+            if attr.startswith(prefix):
                 raise FeatureNotAvailable(
                     "Sorry, access to __attributes "
                     " or func_ attributes is not available. "
-                    "({0})".format(node.attr))
-        if node.attr in DISALLOW_METHODS:
+                    "({0})".format(attr))
+        if attr in DISALLOW_METHODS:
             raise FeatureNotAvailable(
                     "Sorry, this method is not available. "
-                    "({0})".format(node.attr))
+                    "({0})".format(attr))
 
         try:
-            return self._eval(node.value)[node.attr]
+            return value(ev)[attr]
         except (KeyError, TypeError):
             pass
 
         # Maybe the base object is an actual object, not just a dict
         try:
-            return getattr(self._eval(node.value), node.attr)
+            return getattr(value(ev), attr)
         except (AttributeError, TypeError):
             pass
 
         # If it is neither, raise an exception
-        raise AttributeDoesNotExist(node.attr, self.expr)
-
-    def _eval_index(self, node):
-        return self._eval(node.value)
-
-    def _eval_slice(self, node):
-        lower = upper = step = None
-        if node.lower is not None:
-            lower = self._eval(node.lower)
-        if node.upper is not None:
-            upper = self._eval(node.upper)
-        if node.step is not None:
-            step = self._eval(node.step)
-        return slice(lower, upper, step)
+        raise AttributeDoesNotExist(attr, ev.expr)
+    return attribute
+
+
+def _compile_index(node):
+    return _compile_node(node.value)
+
+
+def _compile_slice(node):
+    parts = [None if part is None else _compile_node(part)
+             for part in (node.lower, node.upper, node.step)]
+    return lambda ev: slice(*[None if part is None else part(ev) for part in parts])
+
+
+_COMPILERS = {
+    ast.Name: _compile_name,
+    ast.UnaryOp: _compile_unaryop,
+    ast.BinOp: _compile_binop,
+    ast.BoolOp: _compile_boolop,
+    ast.Compare: _compile_compare,
+    ast.IfExp: _compile_ifexp,
+    ast.keyword: _compile_keyword,
+    ast.Subscript: _compile_subscript,
+    ast.Attribute: _compile_attribute,
+    ast.Slice: _compile_slice,
+}
+
+# gone in later python versions
+for _name, _compiler in (('Num', _compile_num), ('Str', _compile_str),
+                         ('Index', _compile_index), ('NameConstant', _compile_constant),
+                         ('Constant', _compile_constant)):
+    if hasattr(ast, _name):
+        _COMPILERS[getattr(ast, _name)] = _compiler
+
+
+@functools.lru_cache(maxsize=256)
+def compile_expr(expr):
+    """
+    Parse the expression once, and translate it into a
+    closure (see _compile_node). Compiled expressions are
+    cached by text, so that the same conditions evaluated
+    for every step and host are parsed only once.
+    """
+    return _compile_node(ast.parse(expr).body[0].value)
+
+
+class SimpleEval(object):  # pylint: disable=too-few-public-methods
+    """ A very simple expression parser.
+        >>> s = SimpleEval()
+        >>> s.eval("20 + 30 - ( 10 * 5)")
+        0
+        """
+    expr = ""
+
+    def __init__(self, names):
+        """
+            Create the evaluator instance.  Set up valid operators (+,-, etc)
+            functions (add, random, get_val, whatever) and names. """
+
+        operators = DEFAULT_OPERATORS
+        names = names.copy()
+        names.update(DEFAULT_NAMES)
+
+        self.operators = operators
+        self.names = names
+
+        # py3k stuff:
+        if not hasattr(ast, 'NameConstant') and \
+                isinstance(self.names, dict) and "None" not in self.names:
+            self.names["None"] = None
+
+    def evaluate(self, expr):
+        """ evaluate an expresssion, using the operators, functions and
+            names previously set up. """
+
+        # set a copy of the expression aside, so we can give nice errors...
+
+        self.expr = expr
+
+        # and evaluate:
+        return compile_expr(expr.strip())(self)
+
+    def lookup(self, name):
+        """ The value of a name in the expression. """
+        try:
+            # This happens at least for slicing
+            # This is a safe thing to do because it is impossible
+            # that there is a true exression assigning to none
+            # (the compiler rejects it, so you can't even
+            # pass that to ast.parse)
+            if isinstance(self.names, dict):
+                return self.names[name]
+            elif callable(self.names):
+                return self.names(ast.Name(id=name))
+            else:
+                raise InvalidExpression('Trying to use name (variable) "{0}"'
+                                        ' when no "names" defined for'
+                                        ' evaluator'.format(name))
+
+        except KeyError:
+            if name in self.functions:
+                return self.functions[name]
+
+            raise NameNotDefined(name, self.expr)
 
 
 def minieval(expr, env):
@@ -14,10 +14,13 @@ class Parallax(object):
     # slurp: Copies files from a set of remote hosts to local folders
     """
     def __init__(self, nodes, cmd=None, localdir=None, filename=None,
-                 src=None, dst=None, askpass=False, ssh_options=None):
+                 src=None, dst=None, askpass=False, ssh_options=None,
+                 limit=None, strict=True):
         self.nodes = nodes
         self.askpass = askpass
         self.ssh_options = ssh_options
+        self.limit = limit
+        self.strict = strict
 
         # used for call
         self.cmd = cmd
@@ -36,6 +39,8 @@ class Parallax(object):
             self.ssh_options = ['StrictHostKeyChecking=no', 'ConnectTimeout=10']
         opts.ssh_options = self.ssh_options
         opts.askpass = self.askpass
+        if self.limit:
+            opts.limit = self.limit
         # warn_message will available from parallax-1.0.5
         if hasattr(opts, 'warn_message'):
             opts.warn_message = False
@@ -43,6 +48,8 @@ class Parallax(object):
         return opts
 
     def handle(self, results):
+        if not self.strict:
+            return results
         for host, result in results:
             if isinstance(result, parallax.Error):
                 raise ValueError("Failed on {}: {}".format(host, result))
@@ -62,19 +69,30 @@ class Parallax(object):
         return self.handle(list(results.items()))
 
 
-def parallax_call(nodes, cmd, askpass=False, ssh_options=None):
+def parallax_call(nodes, cmd, askpass=False, ssh_options=None, limit=None, strict=True):
     """
     Executes the given command on a set of hosts, collecting the output
     nodes:       a set of hosts
     cmd:         command
     askpass:     Ask for a password if passwordless not configured
     ssh_options: Extra options to pass to SSH
+    limit:       Max number of hosts to run on at the same time
+    strict:      When False, failed hosts are returned with a parallax.Error
+                 result instead of raising ValueError
     Returns [(host, (rc, stdout, stdin)), ...] or ValueError exception
     """
-    p = Parallax(nodes, cmd=cmd, askpass=askpass, ssh_options=ssh_options)
+    p = Parallax(nodes, cmd=cmd, askpass=askpass, ssh_options=ssh_options,
+                 limit=limit, strict=strict)
     return p.call()
 
 
+def is_error(result):
+    """
+    Check whether a result returned in non-strict mode is a failure
+    """
+    return isinstance(result, parallax.Error)
+
+
 def parallax_slurp(nodes, localdir, filename, askpass=False, ssh_options=None):
     """
     Copies from the remote node to the local node
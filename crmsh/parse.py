@@ -2,7 +2,6 @@
 # Copyright (C) 2013-2016 Kristoffer Gronlund <kgronlund@suse.com>
 # See COPYING for license information.
 
-import shlex
 import re
 import inspect
 from lxml import etree
@@ -48,9 +47,84 @@ _ROLE2_RE = re.compile(r"role=(.+)$", re.IGNORECASE)
 _TARGET_RE = re.compile(r'([^:]+):$')
 _TARGET_ATTR_RE = re.compile(r'attr:([\w-]+)=([\w-]+)$', re.IGNORECASE)
 _TARGET_PATTERN_RE = re.compile(r'pattern:(.+)$', re.IGNORECASE)
+_RULE_RE = re.compile(r'rule$', re.IGNORECASE)
+_DATE_RE = re.compile(r'date$', re.IGNORECASE)
+_OP_RE = re.compile(r'op$', re.IGNORECASE)
+_OPERATIONS_RE = re.compile(r'operations$', re.IGNORECASE)
+_NODE_RE = re.compile(r'node$', re.IGNORECASE)
+_RSC_PATTERN_RE = re.compile(r'^/(.+)/$', re.IGNORECASE)
+_LBRACE_RE = re.compile(r'{$')
+_RBRACE_RE = re.compile(r'}$')
+_NODE_ATTRIBUTE_RE = re.compile(r'node-attribute=(.+)$', re.IGNORECASE)
+_SYMMETRICAL_RE = re.compile(r'symmetrical=(true|false|yes|no|on|off)$', re.IGNORECASE)
+_LOSS_POLICY_RE = re.compile(r'loss-policy=(stop|demote|fence|freeze)$', re.IGNORECASE)
+_SCORE_VALUE_RE = re.compile(r'^[+-]?(inf(inity)?|INF(INITY)?|[0-9]+)$')
+_INFINITY_RE = re.compile(r'inf(inity)?|INF(INITY)?')
+_VALUE_SOURCE_RE = re.compile(r"^(?P<val_src>[^\s{}]+)({(?P<val>\S+)})?$")
+
+# A token is a sequence of unquoted characters, 'single quoted'
+# or "double quoted" strings and backslash escaped characters,
+# same as for shlex.split() in POSIX mode
+_TOKEN_PART_RE = re.compile(r'''([ \t\r\n]+)|([^ \t\r\n'"\\]+)|'([^']*)'|"((?:[^"\\]|\\.)*)"|\\(.)|(.)''', re.DOTALL)
+_DQUOTE_ESCAPE_RE = re.compile(r'\\(.)', re.DOTALL)
+_TRAILING_ESCAPE_RE = re.compile(r'(?:[^\\]|\\.)*\\\Z', re.DOTALL)
+
+# string patterns passed to try_match() and match(), compiled once
+_compiled_patterns = {}
+
 TERMINATORS = ('params', 'meta', 'utilization', 'operations', 'op', 'op_params', 'op_meta', 'rule', 'attributes')
 
 
+def _compile_pattern(rx, flags=re.IGNORECASE):
+    """
+    String patterns match the whole token, ignoring case
+    unless other flags are given
+    """
+    compiled = _compiled_patterns.get((rx, flags))
+    if compiled is None:
+        compiled = re.compile(rx if rx.endswith('$') else rx + '$', flags)
+        _compiled_patterns[(rx, flags)] = compiled
+    return compiled
+
+
+def _dquote_unescape(m):
+    c = m.group(1)
+    return c if c in '"\\' else m.group(0)
+
+
+def split_tokens(s):
+    """
+    Split a CLI line into tokens, handling quotes and
+    escapes as shlex.split() does, with a single regex.
+    Raises ValueError for unbalanced quotes.
+    """
+    tokens = []
+    tok = None
+    for m in _TOKEN_PART_RE.finditer(s):
+        space, word, squoted, dquoted, escaped, bad = m.groups()
+        if space is not None:
+            if tok is not None:
+                tokens.append(tok)
+                tok = None
+            continue
+        if word is not None:
+            part = word
+        elif squoted is not None:
+            part = squoted
+        elif dquoted is not None:
+            part = _DQUOTE_ESCAPE_RE.sub(_dquote_unescape, dquoted) if '\\' in dquoted else dquoted
+        elif escaped is not None:
+            part = escaped
+        elif bad == '\\' or (bad == '"' and _TRAILING_ESCAPE_RE.match(s, m.end())):
+            raise ValueError("No escaped character")
+        else:
+            raise ValueError("No closing quotation")
+        tok = part if tok is None else tok + part
+    if tok is not None:
+        tokens.append(tok)
+    return tokens
+
+
 class ParseError(Exception):
     '''
     Raised by parsers when parsing fails.
@@ -139,7 +213,6 @@ validator = Validation()
 
 class BaseParser(object):
     _BINOP_RE = None
-    _VALUE_SOURCE_RE = None
 
     def parse(self, cmd):
         "Called by do_parse(). Raises ParseError if parsing fails."
@@ -190,11 +263,8 @@ class BaseParser(object):
         if not tok:
             return None
         if isinstance(rx, str):
-            if not rx.endswith('$'):
-                rx = rx + '$'
-            self._lastmatch = re.match(rx, tok, re.IGNORECASE)
-        else:
-            self._lastmatch = rx.match(tok)
+            rx = _compile_pattern(rx)
+        self._lastmatch = rx.match(tok)
         if self._lastmatch is not None:
             if not self.has_tokens():
                 self.err("Unexpected end of line")
@@ -265,8 +335,8 @@ class BaseParser(object):
         matches string of p=v | p tokens, but only if p is in valid_keys
         Returns list of <nvpair> tags
         """
-        _KEY_RE = re.compile(r'(%s)=(.+)$' % '|'.join(valid_keys))
-        _NOVAL_RE = re.compile(r'(%s)$' % '|'.join(valid_keys))
+        _KEY_RE = _compile_pattern(r'(%s)=(.+)$' % '|'.join(valid_keys), 0)
+        _NOVAL_RE = _compile_pattern(r'(%s)$' % '|'.join(valid_keys), 0)
         ret = []
         while True:
             if self.try_match(_KEY_RE):
@@ -457,7 +527,7 @@ class BaseParser(object):
         from .cibconfig import cib_factory
 
         rules = []
-        while self.try_match('rule'):
+        while self.try_match(_RULE_RE):
             rule = xmlutil.new('rule')
             rules.append(rule)
             idref = False
@@ -520,7 +590,7 @@ class BaseParser(object):
         return boolop, exprs
 
     def _match_simple_exp(self):
-        if self.try_match('date'):
+        if self.try_match(_DATE_RE):
             return self.match_date()
         elif self.try_match(_UNARYOP_RE):
             unary_op = self.matched(1)
@@ -538,9 +608,7 @@ class BaseParser(object):
             node = xmlutil.new('expression', operation=binop, attribute=attr)
             xmlutil.maybe_set(node, 'type', optype)
             val = self.match_any()
-            if not self._VALUE_SOURCE_RE:
-                self._VALUE_SOURCE_RE = re.compile(r"^(?P<val_src>[^\s{}]+)({(?P<val>\S+)})?$")
-            val_src_match = re.match(self._VALUE_SOURCE_RE, val)
+            val_src_match = _VALUE_SOURCE_RE.match(val)
             if val_src_match.group('val') is None:
                 node.set('value', val)
             else:
@@ -592,8 +660,8 @@ class BaseParser(object):
     def validate_score(self, score, noattr=False, to_kind=False):
         if not noattr and score in olist(constants.score_types):
             return ["score", constants.score_types[score.lower()]]
-        elif re.match("^[+-]?(inf(inity)?|INF(INITY)?|[0-9]+)$", score):
-            score = re.sub("inf(inity)?|INF(INITY)?", "INFINITY", score)
+        elif _SCORE_VALUE_RE.match(score):
+            score = _INFINITY_RE.sub("INFINITY", score)
             if to_kind:
                 return ["kind", score_to_kind(score)]
             else:
@@ -693,7 +761,7 @@ class BaseParser(object):
             </instance_attributes>
           </op>
         """
-        self.match('op')
+        self.match(_OP_RE)
         op_type = self.match_identifier()
         all_attrs = self.match_nvpairs(minpairs=0)
         node = xmlutil.new('op', name=op_type)
@@ -724,7 +792,7 @@ class BaseParser(object):
         def is_op():
             return self.has_tokens() and self.current_token().lower() == 'op'
         if match_id:
-            self.match('operations')
+            self.match(_OPERATIONS_RE)
         node = xmlutil.child(out, 'operations')
         if match_id:
             self.match_idspec()
@@ -773,7 +841,7 @@ def parse_node(self, cmd):
     type :: normal | member | ping | remote
     """
     self.begin(cmd, min_args=1)
-    self.match('node')
+    self.match(_NODE_RE)
     out = xmlutil.new('node')
     xmlutil.maybe_set(out, "id", self.try_match_initial_id() and self.matched(1))
     self.match(_UNAME_RE, errmsg="Expected uname[:type]")
@@ -911,11 +979,11 @@ class ConstraintParser(BaseParser):
         attribute :: role | resource-discovery
         """
         out = xmlutil.new('rsc_location', id=self.match_identifier())
-        if self.try_match('^/(.+)/$'):
+        if self.try_match(_RSC_PATTERN_RE):
             out.set('rsc-pattern', self.matched(1))
-        elif self.try_match('{'):
+        elif self.try_match(_LBRACE_RE):
             tokens = self.match_until('}')
-            self.match('}')
+            self.match(_RBRACE_RE)
             if not tokens:
                 self.err("Empty resource set")
             parser = ResourceSet('role', tokens, self)
@@ -957,7 +1025,7 @@ class ConstraintParser(BaseParser):
         out = xmlutil.new('rsc_colocation', id=self.match_identifier())
         self.match(_SCORE_RE, errmsg="Expected <score>:")
         out.set(*self.validate_score(self.matched(1)))
-        if self.try_match_tail('node-attribute=(.+)$'):
+        if self.try_match_tail(_NODE_ATTRIBUTE_RE):
             out.set('node-attribute', self.matched(1).lower())
         self.try_match_rscset(out, 'role')
         return out
@@ -977,7 +1045,7 @@ class ConstraintParser(BaseParser):
                 self.matched(1), validator.rsc_order_kinds()))
         elif self.try_match(_SCORE_RE):
             out.set(*self.validate_score(self.matched(1), noattr=True, to_kind=True))
-        if self.try_match_tail('symmetrical=(true|false|yes|no|on|off)$'):
+        if self.try_match_tail(_SYMMETRICAL_RE):
             out.set('symmetrical', canonical_boolean(self.matched(1)))
         self.try_match_rscset(out, 'action')
         return out
@@ -992,7 +1060,7 @@ class ConstraintParser(BaseParser):
         out = xmlutil.new('rsc_ticket', id=self.match_identifier())
         self.match(_SCORE_RE, errmsg="Expected <ticket-id>:")
         out.set('ticket', self.matched(1))
-        if self.try_match_tail('loss-policy=(stop|demote|fence|freeze)$'):
+        if self.try_match_tail(_LOSS_POLICY_RE):
             out.set('loss-policy', self.matched(1))
         self.try_match_rscset(out, 'role', simple_count=1)
         return out
@@ -1734,7 +1802,7 @@ def parse(s, comments=None, ignore_empty=True):
                 logger.error(e)
                 return False
         else:
-            s = shlex.split(s)
+            s = split_tokens(s)
     # but there shouldn't be any newlines (?)
     while '\n' in s:
         s.remove('\n')
@@ -73,20 +73,43 @@ def can_use_crm_resource():
     return s != ""
 
 
+def ra_dirs_key():
+    '''
+    The lists of RA classes, providers and types change only
+    when agents get installed or removed: key them on the
+    modification times of the directories holding the agents.
+    '''
+    ocf = os.path.join(os.environ["OCF_ROOT"], "resource.d")
+    dirs = [ocf] + sorted(glob.glob("%s/*" % ocf)) + \
+        ["/etc/init.d", "/usr/sbin", config.path.nagios_plugins,
+         "/usr/lib/systemd/system", "/etc/systemd/system"] + \
+        sorted(glob.glob("/usr/lib*/stonith/plugins/*"))
+    key = []
+    for d in dirs:
+        try:
+            key.append((d, os.stat(d).st_mtime))
+        except OSError:
+            pass
+    return tuple(key)
+
+
 def ra_classes():
     '''
     List of RA classes.
     '''
     if cache.is_cached("ra_classes"):
         return cache.retrieve("ra_classes")
-    if can_use_crm_resource():
-        l = crm_resource("--list-standards")
-    elif can_use_lrmadmin():
-        l = lrmadmin("-C")
-    else:
-        l = ["heartbeat", "lsb", "nagios", "ocf", "stonith", "systemd"]
-    l.sort()
-    return cache.store("ra_classes", l)
+
+    def find_classes():
+        if can_use_crm_resource():
+            l = crm_resource("--list-standards")
+        elif can_use_lrmadmin():
+            l = lrmadmin("-C")
+        else:
+            l = ["heartbeat", "lsb", "nagios", "ocf", "stonith", "systemd"]
+        l.sort()
+        return l
+    return cache.store("ra_classes", cache.snapshot("ra_classes", ra_dirs_key(), find_classes))
 
 
 def ra_providers(ra_type, ra_class="ocf"):
@@ -199,7 +222,10 @@ def ra_types(ra_class="ocf", ra_provider=""):
     else:
         def include(ra):
             return ra_provider in ra_providers(ra, ra_class)
-    return cache.store(ident, sorted(list(set(ra for ra in find_types() if include(ra)))))
+
+    def find_included_types():
+        return sorted(list(set(ra for ra in find_types() if include(ra))))
+    return cache.store(ident, cache.snapshot(ident, ra_dirs_key(), find_included_types))
 
 
 @utils.memoize
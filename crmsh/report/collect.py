@@ -5,7 +5,6 @@ Function starts with "collect_" will be called in parallel
 import sys
 import os
 import shutil
-import re
 import stat
 import pwd
 import datetime
@@ -62,11 +61,8 @@ def collect_ratraces():
 
 
 def collect_corosync_blackbox():
-    fdata_list = []
-    for f in utillib.find_files("/var/lib/corosync", constants.FROM_TIME, constants.TO_TIME):
-        if re.search("fdata", f):
-            fdata_list.append(f)
-    if fdata_list:
+    fdata_list = utillib.find_files("/var/lib/corosync", constants.FROM_TIME, constants.TO_TIME, "*fdata*")
+    if next(fdata_list, None):
         blackbox_f = os.path.join(constants.WORKDIR, constants.COROSYNC_RECORDER_F)
         crmutils.str2file(utillib.get_command_info("corosync-blackbox")[1], blackbox_f)
 
@@ -137,8 +133,7 @@ def collect_backtraces():
     Check CORES_DIRS for core dumps within the report timeframe and
     use gdb to get the backtraces
     """
-    cores = utillib.find_files(constants.CORES_DIRS, constants.FROM_TIME, constants.TO_TIME)
-    flist = [f for f in cores if "core" in os.path.basename(f)]
+    flist = list(utillib.find_files(constants.CORES_DIRS, constants.FROM_TIME, constants.TO_TIME, "*core*"))
     if flist:
         utillib.print_core_backtraces(flist)
         logger.debug("found backtraces: %s", ' '.join(flist))
@@ -182,16 +177,16 @@ def collect_pe_inputs():
     logger.debug("looking for PE files in %s in %s", pe_dir, constants.WE)
 
     flist = []
+    flist_dir = os.path.join(work_dir, os.path.basename(pe_dir))
     for f in utillib.find_files(pe_dir, from_time, to_time):
-        if re.search("[.]last$", f):
+        if f.endswith(".last"):
             continue
+        if not flist:
+            utillib._mkdir(flist_dir)
+        os.symlink(f, os.path.join(flist_dir, os.path.basename(f)))
         flist.append(f)
 
     if flist:
-        flist_dir = os.path.join(work_dir, os.path.basename(pe_dir))
-        utillib._mkdir(flist_dir)
-        for f in flist:
-            os.symlink(f, os.path.join(flist_dir, os.path.basename(f)))
         logger.debug("found %d pengine input files in %s", len(flist), pe_dir)
 
         if len(flist) <= 20:
@@ -27,6 +27,8 @@ EXTRA_LOGS = config.report.collect_extra_logs
 FORCE_REMOVE_DEST = config.report.remove_exist_dest
 FROM_TIME = ""
 GET_STAMP_FUNC = None
+# logs are read in chunks of this size, to stop past the end of the period
+LOG_CHUNK_SIZE = 1 << 20
 HA_DEBUGFILE = None
 HA_LOG = ""
 HA_LOGFACILITY = "daemon"
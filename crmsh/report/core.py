@@ -11,7 +11,7 @@ import datetime
 import shutil
 
 from crmsh import utils as crmutils
-from crmsh import config, log
+from crmsh import config, log, ssh_pool
 from crmsh.report import constants, utillib
 
 
@@ -227,6 +227,7 @@ def parse_argument(argv):
 def run():
 
     utillib.check_env()
+    constants.SSH_OPTS += ''.join(" -o " + opt for opt in ssh_pool.options())
     tmpdir = utillib.make_temp_dir()
     utillib.add_tempfiles(tmpdir)
 
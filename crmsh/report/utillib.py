@@ -3,7 +3,9 @@
 
 import bz2
 import lzma
+import concurrent.futures
 import datetime
+import fnmatch
 import glob
 import gzip
 import multiprocessing
@@ -69,35 +71,72 @@ def _mkdir(directory):
             log_fatal("Failed to create directory: %s" % (err))
 
 
-def arch_logs(logf, from_time, to_time):
+def _read_our_log(args):
     """
-    go through archived logs (timewise backwards) and see if there
-    are lines belonging to us
-    (we rely on untouched log files, i.e. that modify time
-    hasn't been changed)
+    Read the log and check whether it contains a piece of our
+    segment (see is_our_log), in a worker process
+    """
+    logf, from_time, to_time = args
+    # reset this var to check every file's format
+    constants.GET_STAMP_FUNC = None
+    data = read_log(logf, to_time)
+    return _our_log(logf, data, from_time, to_time), data
+
+
+def _arch_logs_data(logf, from_time, to_time):
+    """
+    Like arch_logs, but returns [(logfile, data), ...] with the
+    data read while checking the log. The logs which may be
+    ours (down to the first one last modified before
+    from_time) are read in parallel worker processes.
     """
     ret = []
     files = [logf]
     files += glob.glob(logf+"*[0-9z]")
     # like ls -t, newest first
-    for f in sorted(files, key=os.path.getmtime, reverse=True):
-        # reset this var to check every file's format
-        constants.GET_STAMP_FUNC = None
-        res = is_our_log(f, from_time, to_time)
+    files = sorted(files, key=os.path.getmtime, reverse=True)
+    nparallel = len(files)
+    for i, f in enumerate(files):
+        if os.path.getmtime(f) < from_time:
+            nparallel = i + 1
+            break
+    nproc = min(nparallel, max(1, round(0.8 * multiprocessing.cpu_count())))
+    args = [(f, from_time, to_time) for f in files]
+    if nproc > 1 and not multiprocessing.current_process().daemon:
+        with multiprocessing.Pool(nproc) as pool:
+            results = pool.map(_read_our_log, args[:nparallel])
+    else:
+        results = []
+    constants.GET_STAMP_FUNC = None
+    for i, f in enumerate(files):
+        if i < len(results):
+            res, data = results[i]
+        else:
+            res, data = _read_our_log(args[i])
         if res == 0: # noop, continue
             continue
         elif res == 1: # include log and continue
-            ret.append(f)
+            ret.append((f, data))
             logger.debug("found log %s", f)
         elif res == 2: # don't go through older logs!
             break
         elif res == 3: # include log and continue
-            ret.append(f)
+            ret.append((f, data))
             logger.debug("found log %s", f)
             break
     return ret
 
 
+def arch_logs(logf, from_time, to_time):
+    """
+    go through archived logs (timewise backwards) and see if there
+    are lines belonging to us
+    (we rely on untouched log files, i.e. that modify time
+    hasn't been changed)
+    """
+    return [f for f, _ in _arch_logs_data(logf, from_time, to_time)]
+
+
 def analyze():
     workdir = constants.WORKDIR
     out_string = ""
@@ -428,7 +467,7 @@ def dump_logset(logf, from_time, to_time, outf):
     """
     if os.stat(logf).st_size == 0:
         return False
-    logf_set = arch_logs(logf, from_time, to_time)
+    logf_set = _arch_logs_data(logf, from_time, to_time)
     if not logf_set:
         return False
     num_logs = len(logf_set)
@@ -441,13 +480,13 @@ def dump_logset(logf, from_time, to_time, outf):
     # logfiles in the middle: all
     # the last logfile: from beginning to $to_time (or end)
     if num_logs == 1:
-        out_string += print_logseg(newest, from_time, to_time)
+        out_string += _logseg(*newest, from_time, to_time)
     else:
-        out_string += print_logseg(oldest, from_time, 0)
-        for f in mid_logfiles:
-            out_string += print_logseg(f, 0, 0)
+        out_string += _logseg(*oldest, from_time, 0)
+        for f, data in mid_logfiles:
+            out_string += _logseg(f, data, 0, 0)
             logger.debug("including complete %s logfile", f)
-        out_string += print_logseg(newest, 0, to_time)
+        out_string += _logseg(*newest, 0, to_time)
 
     crmutils.str2file(out_string, outf)
     return True
@@ -495,27 +534,55 @@ def find_decompressor(log_file):
     return decompressor
 
 
-def find_files(dirs, from_time, to_time):
-    res = []
+def _scan_files(path, from_time, to_time, pattern=None):
+    """
+    Yield the regular files under path, modified after from_time
+    and not after to_time, whose name matches the pattern
+    """
+    try:
+        it = os.scandir(path)
+    except OSError:
+        return
+    with it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from _scan_files(entry.path, from_time, to_time, pattern)
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                if pattern and not fnmatch.fnmatch(entry.name, pattern):
+                    continue
+                mtime = entry.stat(follow_symlinks=False).st_mtime
+            except OSError:
+                continue
+            if mtime > from_time and (not to_time or mtime <= to_time):
+                yield entry.path
 
+
+def find_files(dirs, from_time, to_time, pattern=None):
+    """
+    Yield the files under dirs (a list or a space separated string)
+    modified within the time span; several directories are scanned
+    concurrently, the files of each are yielded as soon as it is done
+    """
     if (not crmutils.is_int(from_time)) or (from_time <= 0):
         logger.warning("sorry, can't find files based on time if you don't supply time")
         return
-
-    file_with_stamp = create_tempfile(from_time)
-    findexp = "-newer %s" % file_with_stamp
-
-    if crmutils.is_int(to_time) and to_time > 0:
-        file_with_stamp = create_tempfile(to_time)
-        findexp += " ! -newer %s" % file_with_stamp
-
-    cmd = r"find %s -type f %s" % (dirs, findexp)
-    cmd_res = get_command_info(cmd)[1].strip()
-    if cmd_res:
-        res = cmd_res.split('\n')
-
-    os.remove(file_with_stamp)
-    return res
+    if not (crmutils.is_int(to_time) and to_time > 0):
+        to_time = 0
+    if isinstance(dirs, str):
+        dirs = dirs.split()
+
+    if len(dirs) <= 1:
+        for d in dirs:
+            yield from _scan_files(d, from_time, to_time, pattern)
+        return
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(dirs), 4)) as executor:
+        futures = [executor.submit(lambda d: list(_scan_files(d, from_time, to_time, pattern)), d)
+                   for d in dirs]
+        for future in concurrent.futures.as_completed(futures):
+            yield from future.result()
 
 
 def find_files_all(name, path):
@@ -1040,7 +1107,10 @@ def is_our_log(logf, from_time, to_time):
     """
     check if the log contains a piece of our segment
     """
-    data = read_from_file(logf)
+    return _our_log(logf, read_from_file(logf), from_time, to_time)
+
+
+def _our_log(logf, data, from_time, to_time):
     if not data:
         logger.debug("Found empty file \"%s\"; exclude", logf)
         return 0
@@ -1206,15 +1276,14 @@ def print_log(logf):
     """
     print part of the log
     """
-    cat = find_decompressor(logf)
-    cmd = "%s %s" % (cat, logf)
-    out = crmutils.get_stdout(cmd)
-    return out
+    return read_from_file(logf)
 
 
 def print_logseg(logf, from_time, to_time):
-    data = read_from_file(logf)
+    return _logseg(logf, read_from_file(logf), from_time, to_time)
+
 
+def _logseg(logf, data, from_time, to_time):
     if from_time == 0:
         from_line = 1
     else:
@@ -1519,6 +1588,29 @@ def read_from_file(infile):
     return crmutils.to_ascii(data)
 
 
+def read_log(logf, to_time=0):
+    """
+    Read the log (decompressed by get_open_method), stopping
+    at the first chunk which ends past to_time (0 to read it all)
+    """
+    chunks = []
+    _open = get_open_method(logf)
+    with _open(logf, 'rt', encoding='utf-8', errors='replace') as f:
+        while True:
+            chunk = f.read(constants.LOG_CHUNK_SIZE)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            # check the last complete lines started in this chunk
+            first, last = chunk.find('\n'), chunk.rfind('\n')
+            if to_time and first < last:
+                last_time = find_first_ts(tail(10, chunk[first + 1:last]))
+                if last_time and last_time > to_time:
+                    chunks[-1] = chunk[:last + 1]
+                    break
+    return crmutils.to_ascii(''.join(chunks))
+
+
 def write_to_file(tofile, data):
     _open = get_open_method(tofile)
     with _open(tofile, 'w') as f:
@@ -3,13 +3,17 @@
 
 import os
 import re
+import hashlib
 import subprocess
 import getpass
 import time
 import shutil
 import socket
 import random
-from copy import deepcopy
+import pickle
+import threading
+from copy import copy, deepcopy
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from glob import glob
 from lxml import etree
 
@@ -27,6 +31,7 @@ except ImportError:
 
 
 from . import config
+from . import constants
 from . import handles
 from . import options
 from . import userdir
@@ -38,6 +43,7 @@ logger = log.setup_logger(__name__)
 
 
 _script_cache = None
+_script_deps = {}       # script name -> what its compiled form depends on
 _script_version = 2.2
 _strict_handles = False
 
@@ -499,6 +505,7 @@ def _parse_hawk_template(workflow, name, kind, step, actions):
     Convert a hawk template into steps + a cib action
     """
     path = os.path.join(os.path.dirname(workflow), '../templates', kind + '.xml')
+    _depends_on('file', path)
     if path in _hawk_template_cache:
         xml = _hawk_template_cache[path]
     elif os.path.isfile(path):
@@ -650,6 +657,117 @@ def build_script_cache():
                     _script_cache[name] = os.path.join(d, s)
 
 
+# Compiled (parsed and postprocessed) scripts are kept on disk,
+# together with the stamps of what they were compiled from: the
+# script file, the included scripts and the agent meta-data.
+COMPILED_DIR = os.path.join(constants.CRM_CACHE_DIR, "scripts")
+_COMPILED_VERSION = 1
+_compiling = []  # dependencies of the scripts being compiled
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+def _agent_stamp(agent):
+    from . import ra
+    parts = agent.split(':')
+    if len(parts) == 3 and parts[0] == 'ocf':
+        path = os.path.join(os.environ.get("OCF_ROOT", ""), "resource.d", parts[1], parts[2])
+        return (_file_stamp(path), ra.ra_dirs_key())
+    return ra.ra_dirs_key()
+
+
+def _stamp(dep):
+    kind, name = dep
+    if kind == 'file':
+        return _file_stamp(name)
+    return _agent_stamp(name)
+
+
+def _compiler_stamp():
+    return (_COMPILED_VERSION, _script_version, _file_stamp(__file__))
+
+
+def _depends_on(kind, name):
+    "Record a dependency of the script being compiled"
+    if _compiling:
+        deps = _compiling[-1]
+        if deps is not None:
+            deps[(kind, name)] = _stamp((kind, name))
+
+
+def _depends_on_script(name):
+    "The script being compiled includes the named script"
+    if _compiling and _compiling[-1] is not None:
+        deps = _script_deps.get(name)
+        if deps is None:
+            _compiling[-1] = None  # not from a file: don't save
+        else:
+            _compiling[-1].update(deps)
+
+
+def _compiled_file(script):
+    return os.path.join(COMPILED_DIR, "%s.pickle" % (script))
+
+
+def _open_compiled(script):
+    """
+    Open the compiled script for reading, only if both the file and
+    its directory belong to the current user and are not writable by
+    others: unpickling it may run code, and the cache directory is
+    under $HOME, which may be another user's one (e.g. sudo).
+    """
+    dirfd = os.open(COMPILED_DIR, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW)
+    try:
+        fd = os.open(os.path.basename(_compiled_file(script)), os.O_RDONLY | os.O_NOFOLLOW, dir_fd=dirfd)
+        try:
+            for st in (os.fstat(dirfd), os.fstat(fd)):
+                if st.st_uid != os.geteuid() or st.st_mode & 0o022:
+                    raise OSError("insecure owner or mode of %s" % (_compiled_file(script)))
+            return os.fdopen(fd, 'rb')
+        except:
+            os.close(fd)
+            raise
+    finally:
+        os.close(dirfd)
+
+
+def _load_compiled(script, filename):
+    """
+    Return the compiled script if none of what it
+    was compiled from changed since, or None.
+    """
+    try:
+        with _open_compiled(script) as f:
+            stamp, path, deps, obj = pickle.load(f)
+    except Exception as e:
+        logger.debug("Failed to load compiled script %s: %s", script, e)
+        return None
+    if stamp != _compiler_stamp() or path != filename:
+        return None
+    for dep, depstamp in deps.items():
+        if _stamp(dep) != depstamp:
+            return None
+    _script_deps[script] = deps
+    return obj
+
+
+def _save_compiled(script, filename, deps, obj):
+    try:
+        os.makedirs(COMPILED_DIR, mode=0o700, exist_ok=True)
+        tmp = "%s.%s" % (_compiled_file(script), os.getpid())
+        with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_NOFOLLOW, 0o600), 'wb') as f:
+            pickle.dump((_compiler_stamp(), filename, deps, obj), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, _compiled_file(script))
+    except (IOError, OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+        logger.debug("Failed to save compiled script %s: %s", script, e)
+
+
 def list_scripts():
     '''
     List the available cluster installation scripts.
@@ -716,6 +834,7 @@ def _lookup_step(name, steps, stepname):
 def _process_agent_include(script, include):
     from . import ra
     agent = include['agent']
+    _depends_on('agent', agent)
     info = ra.get_ra(agent)
     meta = info.meta()
     if meta is None:
@@ -821,6 +940,7 @@ def _process_script_include(script, include):
     if 'name' not in include:
         include['name'] = script_name
     subscript = load_script(script_name)
+    _depends_on_script(script_name)
     name = include['name']
 
     scriptstep = {
@@ -1019,14 +1139,27 @@ def _join_script_lines(txt):
     return s
 
 
-def load_script_file(script, filename):
+def _compile_script_file(script, filename):
     if filename.endswith('.yml'):
         parsed = _parse_yaml(script, filename)
     elif filename.endswith('.xml'):
         parsed = _parse_hawk_workflow(script, filename)
     if parsed is None:
         raise ValueError("Failed to parse script: %s (%s)" % (script, filename))
-    obj = _postprocess_script(parsed)
+    return _postprocess_script(parsed)
+
+
+def load_script_file(script, filename):
+    obj = _load_compiled(script, filename)
+    if obj is None:
+        _compiling.append({('file', filename): _file_stamp(filename)})
+        try:
+            obj = _compile_script_file(script, filename)
+        finally:
+            deps = _compiling.pop()
+        _script_deps[script] = deps
+        if deps is not None:
+            _save_compiled(script, filename, deps, obj)
     if 'name' in obj:
         script = obj['name']
     if script not in _script_cache or isinstance(_script_cache[script], str):
@@ -1049,7 +1182,12 @@ def load_script_string(script, yml):
     data['name'] = script
     data['dir'] = None
 
-    obj = _postprocess_script(data)
+    _compiling.append(None)
+    try:
+        obj = _postprocess_script(data)
+    finally:
+        _compiling.pop()
+    _script_deps[script] = None
     if 'name' in obj:
         script = obj['name']
     _script_cache[script] = obj
@@ -1209,7 +1347,9 @@ def common_params():
             ('sudo', 'no',
              'If set, crm will prompt for a sudo password and use sudo when appropriate'),
             ('port', None, 'Port to connect on'),
-            ('timeout', '600', 'Execution timeout in seconds')]
+            ('timeout', '600', 'Execution timeout in seconds'),
+            ('failure_policy', 'fail-fast',
+             'On failure, stop (fail-fast) or run the actions not depending on the failed one (collect)')]
 
 
 def _common_param_default(name):
@@ -1738,6 +1878,73 @@ def clean_run_params(params):
     return params
 
 
+_failure_policies = ('fail-fast', 'collect')
+
+
+def _check_failure_policy(value):
+    if value not in _failure_policies:
+        raise ValueError("failure_policy must be one of: %s" % (', '.join(_failure_policies)))
+    return value
+
+
+# actions running a command with the script state as input
+_state_actions = ('collect', 'validate', 'apply', 'apply_local', 'report')
+# actions running on the local node only
+_local_actions = ('validate', 'apply_local', 'report')
+# actions with effects on the whole cluster
+_cluster_actions = ('cib', 'crm')
+
+
+# prepended to a remote command to apply the changes
+# to the state, [index, entries], before running it
+_STATE_UPDATE = '''cd "%s" && python3 -c 'import json, sys; s = json.load(open("script.input")); \
+i, d = json.load(sys.stdin); s[i:] = d; json.dump(s, open("script.input", "w"))' <<'END_OF_STATE' || exit 1
+%s
+END_OF_STATE
+'''
+
+
+def _state_digests(data):
+    return [hashlib.sha1(json.dumps(entry, sort_keys=True).encode('utf-8')).hexdigest()
+            for entry in data]
+
+
+def _state_delta(sent, digests):
+    """
+    Compare the digests of the state with those of the state
+    last sent, return the index of the first entry which changed,
+    or None if nothing changed.
+    Results are appended to the state, but the parameters
+    (the first entry) may be updated as well.
+    """
+    if digests == sent:
+        return None
+    i = 0
+    while i < min(len(sent), len(digests)) and sent[i] == digests[i]:
+        i += 1
+    return i
+
+
+class _SyncPrinter(object):
+    """
+    Serializes the calls to the printer, since
+    actions may run concurrently
+    """
+    def __init__(self, printer):
+        self._printer = printer
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name):
+        fn = getattr(self._printer, name)
+        if not callable(fn):
+            return fn
+
+        def locked(*args, **kwargs):
+            with self._lock:
+                return fn(*args, **kwargs)
+        return locked
+
+
 def _chmodx(path):
     "chmod +x <path>"
     mode = os.stat(path).st_mode
@@ -1747,7 +1954,7 @@ def _chmodx(path):
 
 class RunActions(object):
     def __init__(self, printer, script, params, actions, local_node, hosts, opts, workdir):
-        self.printer = printer
+        self.printer = _SyncPrinter(printer)
         self.script = script
         self.data = [clean_run_params(params)]
         self.actions = actions
@@ -1756,6 +1963,7 @@ class RunActions(object):
         self.opts = opts
         self.dry_run = params.get('dry_run', False)
         self.sudo = params.get('sudo', False)
+        self.failure_policy = params.get('failure_policy', 'fail-fast')
         self.workdir = workdir
         self.statefile = os.path.join(self.workdir, 'script.input')
         self.dstfile = os.path.join(self.workdir, 'script.input')
@@ -1763,15 +1971,20 @@ class RunActions(object):
         self.result = None
         self.output = None
         self.rc = False
+        # content hashes of the state entries as written locally,
+        # and as acknowledged by each of the remote nodes
+        self.state_sent = {'local': [], 'remote': {}}
 
     def prepare(self, has_remote_actions):
         if not self.dry_run:
             _create_script_workdir(self.script, self.workdir)
             json.dump(self.data, open(self.statefile, 'w'))
+            self.state_sent['local'][:] = _state_digests(self.data)
             _copy_utils(self.workdir)
             if has_remote_actions:
                 _create_remote_workdirs(self.printer, self.hosts, self.workdir, self.opts)
                 _copy_to_remote_dirs(self.printer, self.hosts, self.workdir, self.opts)
+                self.state_sent['remote'] = dict((h[0], self.state_sent['local']) for h in self.hosts)
             # make sure all path references are relative to the script directory
             os.chdir(self.workdir)
 
@@ -1797,36 +2010,115 @@ class RunActions(object):
         json.dump(self.data, open(self.statefile, 'w'))
         return result
 
+    def _action_hosts(self, action):
+        """
+        The nodes an action has effects on
+        """
+        local = set([self.local_node_name()])
+        if action['name'] in _local_actions or action.get('nodes') == 'local':
+            return local
+        hosts = set(h[0] for h in self.hosts)
+        if self.local_node or action['name'] in _cluster_actions:
+            hosts |= local
+        return hosts
+
+    def _dependencies(self):
+        """
+        For each action, the set of (indices of) earlier actions
+        it has to wait for: those using the script state run in
+        order, and so do those with effects on the same nodes
+        """
+        hosts = [self._action_hosts(action) for action in self.actions]
+        deps = []
+        for i, action in enumerate(self.actions):
+            uses_state = action['name'] in _state_actions
+            deps.append(set(j for j in range(i)
+                            if (uses_state and self.actions[j]['name'] in _state_actions) or
+                            hosts[i] & hosts[j]))
+        return deps
+
     def all_actions(self):
-        # TODO: run asynchronously on remote nodes
-        # run on remote nodes
-        # run on local nodes
-        # TODO: wait for remote results
-        for action in self.actions:
-            if Actions.needs_sudo(action):
-                self._check_sudo_pass()
-            if not self._run_action(action):
-                return False
-        return True
+        """
+        Run the actions as a DAG (see _dependencies): an action
+        starts once those it depends on are done, so independent
+        actions run concurrently, and the results are reported as
+        the actions complete.
+
+        On failure, either stop starting new actions (fail-fast),
+        or skip only those depending on the failed one (collect).
+        """
+        if any(Actions.needs_sudo(action) for action in self.actions):
+            self._check_sudo_pass()
+        deps = self._dependencies()
+        pending = list(range(len(self.actions)))
+        running = {}
+        done, failed = set(), set()
+        with ThreadPoolExecutor() as pool:
+            while pending or running:
+                if not failed or self.failure_policy == 'collect':
+                    for i in list(pending):
+                        if deps[i] & failed:
+                            action = self.actions[i]
+                            self.printer.debug("Skipped (depends on a failed action): %s" %
+                                               (action['shortdesc'] or action['name']))
+                            failed.add(i)
+                            pending.remove(i)
+                        elif deps[i] <= done:
+                            self.printer.start(self.actions[i])
+                            running[pool.submit(copy(self)._execute, self.actions[i])] = i
+                            pending.remove(i)
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for f in finished:
+                    i = running.pop(f)
+                    try:
+                        rc, output = f.result()
+                        self.printer.finish(self.actions[i], rc, output)
+                    finally:
+                        self.printer.flush()
+                    if rc:
+                        done.add(i)
+                    else:
+                        failed.add(i)
+        return not failed
 
     def _update_state(self):
+        """
+        Write the state for the local commands if it changed.
+        The remote nodes get the changes with the next remote
+        command (see _remote_state_update).
+        """
         if self.dry_run:
-            return True
-        json.dump(self.data, open(self.statefile, 'w'))
-        return _copy_to_all(self.printer,
-                            self.workdir,
-                            self.hosts,
-                            self.local_node,
-                            self.statefile,
-                            self.dstfile,
-                            self.opts)
+            return
+        digests = _state_digests(self.data)
+        if _state_delta(self.state_sent['local'], digests) is not None:
+            json.dump(self.data, open(self.dstfile, 'w'))
+            self.state_sent['local'] = digests
+
+    def _remote_state_update(self):
+        """
+        The shell commands to apply the changes to the state
+        on the remote nodes, to be run in the same session as
+        the command, or '' if the state did not change; and the
+        digests of the state sent.
+        The changes are sent from the first entry not acknowledged
+        by every node: a node acknowledges the state once the
+        command succeeded on it (see _process_remote).
+        """
+        digests = _state_digests(self.data)
+        changed = [_state_delta(self.state_sent['remote'].get(h[0], []), digests) for h in self.hosts]
+        changed = [i for i in changed if i is not None]
+        if not changed:
+            return '', digests
+        i = min(changed)
+        return _STATE_UPDATE % (self.workdir, json.dumps([i, self.data[i:]])), digests
 
     def run_command(self, nodes, command, is_json_output):
         "called by Actions"
         cmdline = 'cd "%s"; ./%s' % (self.workdir, command)
-        if not self._update_state():
-            raise ValueError("Failed when updating input, aborting.")
-        self.call(nodes, cmdline, is_json_output)
+        self._update_state()
+        self.call(nodes, cmdline, is_json_output, with_state=True)
 
     def copy_file(self, nodes, src, dst):
         if not self._is_local(nodes):
@@ -1885,19 +2177,29 @@ class RunActions(object):
         """
         Execute a single action
         """
-        method = _actions[action['name']]
         self.printer.start(action)
         try:
-            self.output = None
-            self.result = None
-            self.rc = False
-            method(Actions(self, action))
-            self.printer.finish(action, self.rc, self.output)
-            return self.rc
+            rc, output = self._execute(action)
+            self.printer.finish(action, rc, output)
+            return rc
         finally:
             self.printer.flush()
         return False
 
+    def _execute(self, action):
+        """
+        Execute a single action, return (rc, output).
+        The time it took is recorded in the action.
+        """
+        method = _actions[action['name']]
+        start = time.time()
+        self.output = None
+        self.result = None
+        self.rc = False
+        method(Actions(self, action))
+        action['duration'] = round(time.time() - start, 3)
+        return self.rc, self.output
+
     def _check_sudo_pass(self):
         if self.sudo and not self.sudo_pass and userdir.getuser() != 'root':
             prompt = "sudo password: "
@@ -1916,12 +2218,12 @@ class RunActions(object):
         self.printer.debug("is_local (%s): %s" % (nodes, islocal))
         return islocal
 
-    def call(self, nodes, cmdline, is_json_output=False):
+    def call(self, nodes, cmdline, is_json_output=False, with_state=False):
         if cmdline.startswith("#!"):
             self.execute_shell(nodes or 'all', cmdline)
         else:
             if not self._is_local(nodes):
-                self.result = self._process_remote(cmdline, is_json_output)
+                self.result = self._process_remote(cmdline, is_json_output, with_state)
             else:
                 self.result = self._process_local(cmdline, is_json_output)
             self.rc = self.result not in (False, None)
@@ -1977,9 +2279,10 @@ class RunActions(object):
             return
         return fn
 
-    def _process_remote(self, cmdline, is_json_output):
+    def _process_remote(self, cmdline, is_json_output, with_state=False):
         """
         Handle an action that executes on all nodes
+        with_state: the command needs the current state
         """
         ok = True
         action_result = {}
@@ -1995,9 +2298,21 @@ class RunActions(object):
         elif config.core.debug:
             self.printer.print_command(self.hosts, cmdline)
 
+        # run on the local node while waiting for the remote ones
+        local = None
+        if self.local_node:
+            local_pool = ThreadPoolExecutor(max_workers=1)
+            local = local_pool.submit(self._process_local, cmdline, False)
+            local_pool.shutdown(wait=False)
+
+        remote_cmdline = cmdline
+        digests = None
+        if with_state:
+            state_update, digests = self._remote_state_update()
+            remote_cmdline = state_update + cmdline
         for host, result in _parallax_call(self.printer,
                                            self.hosts,
-                                           cmdline,
+                                           remote_cmdline,
                                            self.opts).items():
             if isinstance(result, parallax.Error):
                 self.printer.error(host, "Remote error: %s" % (result))
@@ -2008,12 +2323,15 @@ class RunActions(object):
                 if rc != 0:
                     self.printer.error(host, "Remote error (rc=%s) %s%s" % (rc, out, err))
                     ok = False
-                elif is_json_output:
+                    continue
+                if digests is not None:
+                    self.state_sent['remote'][host] = digests
+                if is_json_output:
                     action_result[host] = json.loads(out)
                 else:
                     action_result[host] = out
-        if self.local_node:
-            ret = self._process_local(cmdline, False)
+        if local is not None:
+            ret = local.result()
             if ret is None:
                 ok = False
             elif is_json_output:
@@ -2071,6 +2389,7 @@ def run(script, params, printer):
     _filter_dict(params, 'nodes', _filter_nodes, user, port)
     _filter_dict(params, 'dry_run', _make_boolean)
     _filter_dict(params, 'sudo', _make_boolean)
+    _filter_dict(params, 'failure_policy', _check_failure_policy)
     _filter_dict(params, 'statefile', lambda x: (x and os.path.abspath(x)) or x)
     if config.core.debug:
         params['debug'] = True
@@ -0,0 +1,56 @@
+'''
+Pool of persistent ssh connections.
+
+The plain ssh/scp command lines (bootstrap, lock, watchdog, crm report)
+pass the options returned here to ssh, so the first connection to a
+host becomes the ControlMaster for that host and later ssh/scp calls are
+multiplexed over its socket instead of doing a new TCP and SSH
+handshake. An idle master exits by itself after SSH_CONTROL_PERSIST.
+
+Calls through parallax don't use the pool: ControlPersist is broken
+with parallax (see scripts._set_controlpersist), so they keep
+ControlPersist=no.
+
+The control socket directory is created on demand, each time the
+options are asked for.
+'''
+
+import os
+from . import constants
+from . import log
+
+
+logger = log.setup_logger(__name__)
+
+
+def prepare():
+    """
+    Create the directory holding the control sockets.
+    ssh refuses to start a master when the directory is missing
+    Return True when the pool is usable
+    """
+    try:
+        os.makedirs(constants.SSH_CONTROL_DIR, 0o700, exist_ok=True)
+    except OSError as err:
+        logger.debug("Cannot create %s: %s", constants.SSH_CONTROL_DIR, err)
+        return False
+    return True
+
+
+def options():
+    """
+    Return the ssh options for using the pool, as list of "Key=Value"
+    """
+    if not prepare():
+        return []
+    # %C is a hash of local host, remote host, port and user
+    return ["ControlMaster=auto",
+            "ControlPath={}".format(os.path.join(constants.SSH_CONTROL_DIR, "%C")),
+            "ControlPersist={}".format(constants.SSH_CONTROL_PERSIST)]
+
+
+def ssh_option():
+    """
+    Return the options for an ssh/scp command line, using the pool when usable
+    """
+    return ' '.join([constants.SSH_OPTION] + ["-o " + opt for opt in options()])
@@ -156,10 +156,15 @@ class Cluster(command.UI):
             service_check_list.append("corosync-qdevice.service")
 
         node_list = parse_option_for_nodes(context, *args)
-        for node in node_list[:]:
-            if all([utils.service_is_active(srv, remote_addr=node) for srv in service_check_list]):
-                logger.info("Cluster services already started on {}".format(node))
-                node_list.remove(node)
+        with utils.service_state_cache():
+            states = utils.query_services_on_nodes(service_check_list, node_list)
+            for node in node_list[:]:
+                if node not in states:
+                    logger.warning("Cannot reach {}, skipped".format(node))
+                    node_list.remove(node)
+                elif all([utils.service_is_active(srv, remote_addr=node) for srv in service_check_list]):
+                    logger.info("Cluster services already started on {}".format(node))
+                    node_list.remove(node)
         if not node_list:
             return
 
@@ -175,14 +180,19 @@ class Cluster(command.UI):
         Stops the cluster services on all nodes or specific node(s)
         '''
         node_list = parse_option_for_nodes(context, *args)
-        for node in node_list[:]:
-            if not utils.service_is_active("corosync.service", remote_addr=node):
-                if utils.service_is_active("sbd.service", remote_addr=node):
-                    utils.stop_service("corosync", remote_addr=node)
-                    logger.info("Cluster services stopped on {}".format(node))
-                else:
-                    logger.info("Cluster services already stopped on {}".format(node))
-                node_list.remove(node)
+        with utils.service_state_cache():
+            states = utils.query_services_on_nodes(("corosync.service", "sbd.service"), node_list)
+            for node in node_list[:]:
+                if node not in states:
+                    logger.warning("Cannot reach {}, skipped".format(node))
+                    node_list.remove(node)
+                elif not utils.service_is_active("corosync.service", remote_addr=node):
+                    if utils.service_is_active("sbd.service", remote_addr=node):
+                        utils.stop_service("corosync", remote_addr=node)
+                        logger.info("Cluster services stopped on {}".format(node))
+                    else:
+                        logger.info("Cluster services already stopped on {}".format(node))
+                    node_list.remove(node)
         if not node_list:
             return
 
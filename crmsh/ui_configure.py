@@ -109,6 +109,7 @@ def _advanced_completer(args):
 def _list_resource(args):
     if len(args) > 3:
         if args[2] == "remove":
+            cib_factory.initialize()
             res = cib_factory.f_prim_list_in_group(args[1])
             if len(res) <= 1:
                 return []
@@ -120,6 +121,7 @@ def _list_resource(args):
 
 def _list_resource_2(args):
     if len(args) > 5:
+        cib_factory.initialize()
         return cib_factory.f_prim_list_in_group(args[1])
 
 
@@ -150,6 +152,7 @@ def node_id_colon_list(args):
 
 
 def stonith_resource_list(args):
+    cib_factory.initialize()
     return [x.obj_id for x in
             cib_factory.get_elems_on_type("type:primitive")
             if x.node.get("class") == "stonith"]
@@ -176,6 +179,7 @@ def get_prim_token(words, n):
 
 def ra_agent_for_template(tmpl):
     '''@template -> ra.agent'''
+    cib_factory.initialize()
     obj = cib_factory.find_resource(tmpl[1:])
     if obj is None:
         return None
@@ -496,7 +500,9 @@ class CibConfig(command.UI):
         # immediately so that tab completion works
 
     def requires(self):
-        if not cib_factory.initialize():
+        # completing for the shell needs the object ids only,
+        # which come from the snapshot (see cibconfig.completion_list)
+        if not options.shell_completion and not cib_factory.initialize():
             return False
         # see the configure ptest/simulate command
         has_ptest = utils.is_program('ptest')
@@ -6,7 +6,6 @@ import os
 import sys
 import time
 import re
-import bz2
 from . import config
 from . import command
 from . import completers as compl
@@ -190,12 +189,11 @@ class History(command.UI):
 
     def ptest(self, nograph, scores, utilization, actions, verbosity):
         'Send a decompressed self.pe_file to ptest'
-        try:
-            bits = bz2.decompress(open(self.pe_file, "rb").read())
-        except IOError as msg:
-            logger.error("open: %s", msg)
+        r = crm_report().simulate(self.pe_file, nograph, scores, utilization, actions, verbosity)
+        if r is None:
             return False
-        return utils.run_ptest(bits, nograph, scores, utilization, actions, verbosity)
+        rc, s, dot = r
+        return utils.show_ptest(rc, s, dot, nograph, actions)
 
     @command.skill_level('administrator')
     def do_events(self, context):
@@ -273,6 +271,7 @@ class History(command.UI):
 
     def _show_pe(self, f, opt_l):
         self.pe_file = f  # self.pe_file needed by self.ptest
+        crm_report().prerender_transitions('vv')
         ui_utils.ptestlike(self.ptest, 'vv', "transition", opt_l)
         return crm_report().show_transition_log(f)
 
@@ -293,12 +292,14 @@ class History(command.UI):
         except:
             name = os.path.basename(f).replace(".bz2", "")
         logger.info("transition %s saved to shadow %s", f, name)
+        crm_report().extract_pe_input(f)
         return xmlutil.pe2shadow(f, name)
 
     @command.skill_level('administrator')
     def do_transitions(self, context):
         self._init_source()
         s = '\n'.join(crm_report().show_transitions())
+        crm_report().prerender_transitions('vv')
         utils.page_string(s)
 
     @command.skill_level('administrator')
@@ -418,7 +419,10 @@ class History(command.UI):
 
     def _get_diff_pe_input(self, t):
         if t != "live":
-            return self._get_pe_input(t)
+            f = self._get_pe_input(t)
+            if f:
+                crm_report().extract_pe_input(f)
+            return f
         if not utils.get_dc():
             logger.error("cluster not running")
             return None
@@ -3,6 +3,8 @@
 # See COPYING for license information.
 
 import re
+import copy
+from lxml import etree
 from . import config
 from . import command
 from . import completers as compl
@@ -130,11 +132,51 @@ def set_node_attr(cluster_node_name, attr_name, value, commit=True):
         return False
     return True
 
+
+def _patch_path(elem):
+    """
+    Path of elem as used in cib patches, like
+    /cib/configuration/nodes/node[@id='1']/instance_attributes[@id='nodes-1']
+    """
+    steps = []
+    for e in [elem] + list(elem.iterancestors()):
+        steps.append(e.tag if e.get("id") is None else "{}[@id='{}']".format(e.tag, e.get("id")))
+    return "/" + "/".join(reversed(steps))
+
+
+def commit_nvpairs(nvpairs, created=None, nvpairs_to_delete=None):
+    """
+    Commit the changes to a dumped cib in one transaction, instead of
+    replacing the whole cib: one cib patch (format 2) fed to
+    "cibadmin --patch", modifying the given changed nvpairs, creating
+    the given new elements and deleting the given nvpairs
+    """
+    diff = xmlutil.new("diff", format="2")
+    for nvpair in nvpairs_to_delete or []:
+        xmlutil.child(diff, "change", operation="delete", path=_patch_path(nvpair))
+    for elem in created or []:
+        parent = elem.getparent()
+        change = xmlutil.child(diff, "change", operation="create", path=_patch_path(parent),
+                               position=str(parent.index(elem)))
+        change.append(copy.deepcopy(elem))
+    for nvpair in nvpairs:
+        change = xmlutil.child(diff, "change", operation="modify", path=_patch_path(nvpair))
+        change_list = xmlutil.child(change, "change-list")
+        xmlutil.child(change_list, "change-attr", name="value", operation="set", value=nvpair.get("value"))
+        xmlutil.child(change, "change-result").append(copy.deepcopy(nvpair))
+    if len(diff) == 0:
+        return
+    utils.get_stdout_or_raise_error(constants.CIB_PATCH, input_s=etree.tostring(diff))
+
+
 def _oneline(s):
     'join s into a single line of space-separated tokens'
     return ' '.join(l.strip() for l in s.splitlines())
 
 
+_instance_attributes_xpath = etree.XPath('./instance_attributes')
+
+
 def unpack_node_xmldata(node, is_offline):
     """
     takes an XML element defining a node, and
@@ -155,7 +197,7 @@ def unpack_node_xmldata(node, is_offline):
         else:
             other[attr] = v
     inst_attr = [cli_nvpairs(nvpairs2list(elem))
-                 for elem in node.xpath('./instance_attributes')]
+                 for elem in _instance_attributes_xpath(node)]
     return uname, ident, typ, other, inst_attr, is_offline
 
 
@@ -262,18 +304,17 @@ class NodeMgmt(command.UI):
         if cib is None:
             return False
 
-        cfg_nodes = cib.xpath('/cib/configuration/nodes/node')
-        node_states = cib.xpath('/cib/status/node_state')
-
-        def find(it, lst):
-            for n in lst:
-                if n.get("uname") == it:
-                    return n
-            return None
+        # index by uname once, instead of scanning the lists for each node
+        cfg_nodes = {}
+        for n in cib.xpath('/cib/configuration/nodes/node'):
+            cfg_nodes.setdefault(n.get("uname"), n)
+        node_states = {}
+        for n in cib.xpath('/cib/status/node_state'):
+            node_states.setdefault(n.get("uname"), n)
 
         def do_print(uname):
-            xml = find(uname, cfg_nodes)
-            state = find(uname, node_states)
+            xml = cfg_nodes.get(uname)
+            state = node_states.get(uname)
             if xml is not None or state is not None:
                 is_offline = state is not None and state.get("crmd") == "offline"
                 print_node(*unpack_node_xmldata(xml if xml is not None else state, is_offline))
@@ -281,7 +322,7 @@ class NodeMgmt(command.UI):
         if node is not None:
             do_print(node)
         else:
-            all_nodes = set([n.get("uname") for n in cfg_nodes + node_states])
+            all_nodes = set(cfg_nodes) | set(node_states)
             for uname in sorted(all_nodes):
                 do_print(uname)
         return True
@@ -291,7 +332,7 @@ class NodeMgmt(command.UI):
     def do_standby(self, context, *args):
         """
         usage: standby [<node>] [<lifetime>]
-        To avoid race condition for --all option, melt all standby values into one cib replace session
+        To avoid race condition for --all option, melt all standby values into one cib update session
         """
         # Parse lifetime option
         lifetime_opt = "forever"
@@ -316,29 +357,39 @@ class NodeMgmt(command.UI):
             xml_query_path_oppsite = constants.XML_NODE_QUERY_STANDBY_PATH
 
         cib = xmlutil.cibdump2elem()
-        xml_item_list = cib.xpath(xml_path)
-        for xml_item in xml_item_list:
+        changed_list = []
+        create_list = []
+        delete_list = []
+        for xml_item in cib.xpath(xml_path):
             if xml_item.get("uname") in node_list:
                 node_id = xml_item.get('id')
                 # Remove possible oppsite lifetime standby nvpair
-                item_to_del = cib.xpath(xml_query_path_oppsite.format(node_id=node_id))
-                if item_to_del:
-                    xmlutil.rmnodes(item_to_del)
+                delete_list += cib.xpath(xml_query_path_oppsite.format(node_id=node_id))
                 # If the standby nvpair already exists, set and continue
                 item = cib.xpath(xml_query_path.format(node_id=node_id))
-                if item and item[0].get("value") != "on":
-                    item[0].set("value", "on")
+                if item:
+                    if item[0].get("value") != "on":
+                        item[0].set("value", "on")
+                        changed_list.append(item[0])
                     continue
-                # Create standby nvpair
+                # Create standby nvpair, with the sets holding it if missing
                 interface_item = xml_item
+                new_item = None
+                setnames = ["instance_attributes"]
                 if lifetime_opt == "reboot":
-                    res_item = xmlutil.get_set_nodes(xml_item, "transient_attributes", create=True)
+                    setnames.insert(0, "transient_attributes")
+                for setname in setnames:
+                    res_item = xmlutil.get_set_nodes(interface_item, setname)
+                    if not res_item:
+                        res_item = xmlutil.get_set_nodes(interface_item, setname, create=True)
+                        new_item = res_item[0] if new_item is None else new_item
                     interface_item = res_item[0]
-                res_item = xmlutil.get_set_nodes(interface_item, "instance_attributes", create=True)
-                xmlutil.set_attr(res_item[0], "standby", "on")
+                xmlutil.set_attr(interface_item, "standby", "on")
+                if new_item is None:
+                    new_item = xmlutil.get_attr_in_set(interface_item, "standby")
+                create_list.append(new_item)
 
-        cmd = constants.CIB_REPLACE.format(xmlstr=xmlutil.xml_tostring(cib))
-        utils.get_stdout_or_raise_error(cmd)
+        commit_nvpairs(changed_list, create_list, delete_list)
         for node in node_list:
             logger.info("standby node %s", node)
 
@@ -347,7 +398,7 @@ class NodeMgmt(command.UI):
     def do_online(self, context, *args):
         """
         usage: online [<node>]
-        To avoid race condition for --all option, melt all online values into one cib replace session
+        To avoid race condition for --all option, melt all online values into one cib update session
         """
         # Parse node option
         node_list = parse_option_for_nodes(context, *args)
@@ -355,15 +406,16 @@ class NodeMgmt(command.UI):
             return
 
         cib = xmlutil.cibdump2elem()
+        changed_list = []
         for node in node_list:
             node_id = utils.get_nodeid_from_name(node)
             for query_path in [constants.XML_NODE_QUERY_STANDBY_PATH, constants.XML_STATUS_QUERY_STANDBY_PATH]:
                 item = cib.xpath(query_path.format(node_id=node_id))
                 if item and item[0].get("value") != "off":
                     item[0].set("value", "off")
+                    changed_list.append(item[0])
 
-        cmd = constants.CIB_REPLACE.format(xmlstr=xmlutil.xml_tostring(cib))
-        utils.get_stdout_or_raise_error(cmd)
+        commit_nvpairs(changed_list)
         for node in node_list:
             logger.info("online node %s", node)
 
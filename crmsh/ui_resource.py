@@ -2,6 +2,8 @@
 # Copyright (C) 2013-2018 Kristoffer Gronlund <kgronlund@suse.com>
 # See COPYING for license information.
 
+import shlex
+import sys
 from . import command
 from . import completers as compl
 from . import constants
@@ -172,6 +174,41 @@ def set_deep_meta_attr(rsc, attr, value, commit=True):
     return True
 
 
+def set_rsc_attr(rsc, set_tag, attr, value=None, commit=True):
+    """
+    Set the attribute in the given attribute sets (instance_attributes,
+    meta_attributes or utilization) of the resource, or delete it
+    if the value is None.
+    """
+    obj = cib_factory.find_object(rsc)
+    if obj is None or not xmlutil.is_resource(obj.node):
+        logger.error("Resource not found: %s", rsc)
+        return False
+    node = obj.node
+    nvpairs = node.xpath("./%s/nvpair[@name='%s']" % (set_tag, attr))
+    if value is None:
+        if not nvpairs:
+            logger.error("Attribute %s not found in %s of %s", attr, set_tag, rsc)
+            return False
+        xmlutil.rmnodes(nvpairs)
+        xmlutil.xml_processnodes(node, xmlutil.is_emptynvpairs, xmlutil.rmnodes)
+    elif nvpairs:
+        for nvpair in nvpairs:
+            nvpair.set("value", value)
+    else:
+        xmlutil.set_attr(xmlutil.get_set_nodes(node, set_tag, create=True)[0], attr, value)
+    obj.set_updated()
+
+    if not commit:
+        return True
+
+    ok = cib_factory.commit()
+    if not ok:
+        logger.error("Failed to commit updates to %s", rsc)
+        return False
+    return True
+
+
 _attrcmds = compl.choice(['delete', 'set', 'show'])
 _raoperations = compl.choice(constants.ra_operations)
 
@@ -225,6 +262,13 @@ class RscMgmt(command.UI):
         'check': "cibsecret check '%s' '%s'",
     }
 
+    # attribute sets updated by the batch command
+    batch_attr_sets = {
+        'param': 'instance_attributes',
+        'meta': 'meta_attributes',
+        'utilization': 'utilization',
+    }
+
     def _refresh_cleanup(self, action, rsc, node, force):
         """
         Implements the refresh and cleanup commands.
@@ -604,6 +648,88 @@ class RscMgmt(command.UI):
         return ui_utils.manage_attr(context.get_command_name(), self.rsc_utilization,
                                     rsc, cmd, attr, value)
 
+    def _batch_item(self, args):
+        """
+        Apply one batch line to the CIB (without committing),
+        return None for a cleanup which has to run after the commit
+        """
+        if args[0] in self.batch_attr_sets:
+            if len(args) == 5 and args[2] == "set":
+                value = args[4]
+            elif len(args) == 4 and args[2] == "delete":
+                value = None
+            else:
+                raise ValueError("Expected %s <rsc> set <attr> <value> | %s <rsc> delete <attr>" % (args[0], args[0]))
+            for arg in args[1:]:
+                if not utils.is_name_sane(arg):
+                    raise ValueError("Expected valid name, got '%s'" % (arg))
+            return set_rsc_attr(args[1], self.batch_attr_sets[args[0]], args[3], value, commit=False)
+        if args[0] == "maintenance":
+            on_off = args[2].lower() if len(args) == 3 else "true"
+            if len(args) not in (2, 3) or on_off not in ('on', 'true', 'off', 'false'):
+                raise ValueError("Expected maintenance <rsc> [on|off|true|false]")
+            if not utils.is_name_sane(args[1]):
+                return False
+            on_off = 'true' if on_off in ('on', 'true') else 'false'
+            return set_deep_meta_attr(args[1], "maintenance", on_off, commit=False)
+        if args[0] == "cleanup":
+            if len(args) > 4:
+                raise ValueError("Expected cleanup [<rsc>] [<node>] [force]")
+            return None
+        raise ValueError("Unknown batch command %s" % (args[0]))
+
+    @command.skill_level('administrator')
+    @command.wait
+    def do_batch(self, context, infile="-"):
+        """usage: batch [<file>]"""
+        if cib_factory.has_cib_changed():
+            context.fatal_error("Currently editing the CIB, commit or discard the changes first")
+        try:
+            f = sys.stdin if infile == "-" else open(infile)
+            lines = f.readlines()
+            if f is not sys.stdin:
+                f.close()
+        except IOError as msg:
+            context.fatal_error(msg)
+
+        results = []
+        cleanups = []
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                args = shlex.split(line)
+                rc = self._batch_item(args)
+            except ValueError as msg:
+                logger_utils.bad_usage("batch", line, msg)
+                rc = False
+            if rc is None:
+                cleanups.append((line, args))
+            else:
+                results.append((line, rc))
+
+        # all changes in one CIB update, or none of them
+        ok = all(rc for _, rc in results)
+        if ok and results:
+            ok = cib_factory.commit()
+            if not ok:
+                logger.error("Failed to commit the batch updates")
+        elif not ok:
+            cib_factory.refresh()
+        if not ok:
+            results = [(line, False) for line, _ in results]
+        for line, args in cleanups:
+            rsc, node, force = (args[1:] + [None] * 3)[:3]
+            results.append((line, ok and self._refresh_cleanup("cleanup", rsc, node, force)))
+
+        for line, rc in results:
+            if rc:
+                logger.info("%s: done", line)
+            else:
+                logger.error("%s: failed", line)
+        return all(rc for _, rc in results)
+
     @command.alias('reprobe')
     @command.completers(compl.resources, compl.nodes)
     def do_refresh(self, context, rsc=None, node=None, force=False):
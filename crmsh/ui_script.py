@@ -95,6 +95,8 @@ class JsonPrinter(object):
 
     def finish(self, action, rc, output):
         ret = {'rc': rc, 'shortdesc': str(action['shortdesc'])}
+        if 'duration' in action:
+            ret['duration'] = action['duration']
         if rc != 0 and not rc:
             ret['error'] = str(output) if output else ''
         else:
@@ -504,7 +506,7 @@ class Script(command.UI):
         ["verify", <name>, <values>]
         => [{shortdesc, longdesc, nodes}]
         ["run", <name>, <values>]
-        => [{shortdesc, rc, output|error}]
+        => [{shortdesc, rc, duration, output|error}]
         """
         cmd = json.loads(command)
         if len(cmd) < 1:
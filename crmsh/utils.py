@@ -28,8 +28,8 @@ from . import constants
 from . import options
 from . import term
 from . import parallax
+from . import ssh_pool
 from distutils.version import LooseVersion
-from .constants import SSH_OPTION
 from . import log
 
 
@@ -919,9 +919,10 @@ def wait4dc(what="", show_progress=True):
                 sys.stderr.write(".")
 
 
-def run_ptest(graph_s, nograph, scores, utilization, actions, verbosity):
+def ptest_cmd(nograph, scores, utilization, actions, verbosity, dotfile=None):
     '''
-    Pipe graph_s thru ptest(8). Show graph using dotty if requested.
+    The ptest(8) command line for the options, reading the
+    graph from stdin and writing the dot graph to dotfile.
     '''
     actions_filter = "grep LogActions: | grep -vw Leave"
     ptest = "2>&1 %s -x -" % config.core.ptest
@@ -936,27 +937,60 @@ def run_ptest(graph_s, nograph, scores, utilization, actions, verbosity):
         ptest = "%s -s" % ptest
     if utilization:
         ptest = "%s -U" % ptest
-    if config.core.dotty and not nograph:
-        fd, dotfile = mkstemp()
+    if dotfile:
         ptest = "%s -D %s" % (ptest, dotfile)
-    else:
-        dotfile = None
     # ptest prints to stderr
     if actions:
         ptest = "%s | %s" % (ptest, actions_filter)
     if options.regression_tests:
         ptest = ">/dev/null %s" % ptest
+    return ptest
+
+
+@memoize
+def ptest_version():
+    "Version of the ptest(8) program, part of the simulation cache keys"
+    _, out, _ = get_stdout_stderr("%s --version" % config.core.ptest, no_reg=True)
+    return out
+
+
+def simulate(graph_s, nograph, scores, utilization, actions, verbosity):
+    '''
+    Pipe graph_s thru ptest(8). Return the exit code, the output
+    and the dot graph (None if not requested).
+    '''
+    dotfile = None
+    if config.core.dotty and not nograph:
+        fd, dotfile = mkstemp()
+        os.close(fd)
+    ptest = ptest_cmd(nograph, scores, utilization, actions, verbosity, dotfile)
     logger.debug("invoke: %s", ptest)
     rc, s = get_stdout(ptest, input_s=graph_s)
     if rc != 0:
         logger.debug("'%s' exited with (rc=%d)", ptest, rc)
+    dot = None
+    if dotfile:
+        try:
+            with open(dotfile) as f:
+                dot = f.read()
+        finally:
+            os.unlink(dotfile)
+    return rc, s, dot
+
+
+def show_ptest(rc, s, dot, nograph, actions):
+    '''
+    Show the results of simulate(). Show graph using dotty if
+    requested.
+    '''
+    if rc != 0:
         if actions and rc == 1:
             logger.warning("No actions found.")
         else:
             logger.warning("Simulation was unsuccessful (RC=%d).", rc)
-    if dotfile:
-        if os.path.getsize(dotfile) > 0:
-            show_dot_graph(dotfile)
+    if dot is not None:
+        if dot:
+            show_dot_graph(str2tmp(dot, suffix=".dot"))
         else:
             logger.warning("ptest produced empty dot file")
     else:
@@ -967,6 +1001,14 @@ def run_ptest(graph_s, nograph, scores, utilization, actions, verbosity):
     return True
 
 
+def run_ptest(graph_s, nograph, scores, utilization, actions, verbosity):
+    '''
+    Pipe graph_s thru ptest(8). Show graph using dotty if requested.
+    '''
+    rc, s, dot = simulate(graph_s, nograph, scores, utilization, actions, verbosity)
+    return show_ptest(rc, s, dot, nograph, actions)
+
+
 def is_id_valid(ident):
     """
     Verify that the id follows the definition:
@@ -1271,11 +1313,12 @@ def cli_append_attr(pl, name, val):
 
 def lines2cli(s):
     '''
-    Convert a string into a list of lines. Replace continuation
-    characters. Strip white space, left and right. Drop empty lines.
+    Convert a string (or an iterable of lines) into a list of lines.
+    Replace continuation characters. Strip white space, left and right.
+    Drop empty lines.
     '''
     cl = []
-    l = s.split('\n')
+    l = s.split('\n') if isinstance(s, str) else s
     cum = []
     for p in l:
         p = p.strip()
@@ -2517,6 +2560,14 @@ class ServiceManager(object):
             "is_available": "list-unit-files"
             }
 
+    SHOW_PROPERTIES = ("LoadState", "ActiveState", "UnitFileState")
+    # "systemctl is-active" and "systemctl is-enabled" return 0 for these states
+    ACTIVE_STATES = ("active", "reloading")
+    ENABLED_STATES = ("enabled", "enabled-runtime", "static", "indirect", "alias", "generated", "transient")
+
+    # {(node, service_name): {property: value}}, None means caching is off
+    _state_cache = None
+
     def __init__(self, service_name, remote_addr=None, node_list=[]):
         """
         Init function
@@ -2526,6 +2577,131 @@ class ServiceManager(object):
         self.remote_addr = remote_addr
         self.node_list = node_list
 
+    @classmethod
+    def _show_cmd(cls, names):
+        return "systemctl show -p {} {}".format(','.join(cls.SHOW_PROPERTIES), ' '.join(names))
+
+    @classmethod
+    def _parse_show_output(cls, names, output):
+        """
+        Parse output of "systemctl show" for several units,
+        which prints one block per unit, in argument order, separated by empty lines
+        Return {service_name: {property: value}}
+        """
+        blocks = re.split(r"\n\s*\n", output.strip()) if output else []
+        res = {}
+        for name, block in zip(names, blocks):
+            res[name] = dict(line.split('=', 1) for line in block.splitlines() if '=' in line)
+        for name in names:
+            res.setdefault(name, {"LoadState": "not-found", "ActiveState": "inactive", "UnitFileState": ""})
+        return res
+
+    @classmethod
+    def query_services(cls, names, remote_addr=None):
+        """
+        Query states of several services with a single systemctl call
+        Return {service_name: {property: value}}
+        """
+        names = list(names)
+        if not names:
+            return {}
+        cmd = cls._show_cmd(names)
+        if remote_addr and remote_addr != this_node():
+            prompt_msg = "Run \"{}\" on {}".format(cmd, remote_addr)
+            rc, output, err = run_cmd_on_remote(cmd, remote_addr, prompt_msg)
+        else:
+            rc, output, err = get_stdout_stderr(cmd)
+        if rc != 0 and err:
+            raise ValueError("Run \"{}\" error: {}".format(cmd, err))
+        res = cls._parse_show_output(names, output)
+        cls._cache_update(remote_addr, res)
+        return res
+
+    @classmethod
+    def query_services_on_nodes(cls, names, node_list):
+        """
+        Query states of several services on several nodes,
+        with one systemctl call per node, executed in parallel
+        Return {node: {service_name: {property: value}}},
+        nodes which can't be reached are left out
+        """
+        names = list(names)
+        if not names or not node_list:
+            return {}
+        res = {}
+        me = this_node()
+        if me in node_list:
+            res[me] = cls.query_services(names)
+        remote_list = [node for node in node_list if node != me]
+        if not remote_list:
+            return res
+        results = parallax.parallax_call(remote_list, cls._show_cmd(names), strict=False)
+        for host, result in results:
+            if parallax.is_error(result):
+                logger.debug("Failed to query services on %s: %s", host, result)
+                continue
+            _, out, _ = result
+            res[host] = cls._parse_show_output(names, to_ascii(out))
+            cls._cache_update(host, res[host])
+        return res
+
+    @classmethod
+    def _cache_key(cls, remote_addr, name):
+        if remote_addr and remote_addr != this_node():
+            return (remote_addr, name)
+        return (None, name)
+
+    @classmethod
+    def _cache_update(cls, remote_addr, states):
+        if cls._state_cache is None:
+            return
+        for name, props in states.items():
+            cls._state_cache[cls._cache_key(remote_addr, name)] = props
+
+    @classmethod
+    def _cache_invalidate(cls, remote_addr):
+        """
+        Drop cached states of all services on one node
+        """
+        if not cls._state_cache:
+            return
+        node = cls._cache_key(remote_addr, None)[0]
+        for key in [k for k in cls._state_cache if k[0] == node]:
+            del cls._state_cache[key]
+
+    @classmethod
+    @contextmanager
+    def cached(cls, names=None, remote_addr=None):
+        """
+        Cache service states within this context
+        names are prefetched with a single systemctl call;
+        any start/stop/enable/disable action drops the cached states of the nodes it runs on
+        """
+        if cls._state_cache is not None:
+            names = [name for name in names or [] if cls._cache_key(remote_addr, name) not in cls._state_cache]
+            if names:
+                cls.query_services(names, remote_addr)
+            yield
+            return
+        cls._state_cache = {}
+        try:
+            if names:
+                cls.query_services(names, remote_addr)
+            yield
+        finally:
+            cls._state_cache = None
+
+    def _cached_state(self):
+        """
+        Return cached properties of this service, or None when caching is off
+        """
+        if self.__class__._state_cache is None or self.node_list:
+            return None
+        key = self._cache_key(self.remote_addr, self.service_name)
+        if key not in self.__class__._state_cache:
+            self.query_services([self.service_name], self.remote_addr)
+        return self.__class__._state_cache[key]
+
     def _do_action(self, action_type):
         """
         Actual do actions to manage service
@@ -2534,6 +2710,9 @@ class ServiceManager(object):
             raise ValueError("status_type should be {}".format('/'.join(list(self.ACTION_MAP.values()))))
 
         cmd = "systemctl {} {}".format(action_type, self.service_name)
+        if action_type not in ("is-enabled", "is-active", "list-unit-files"):
+            for node in self.node_list or [self.remote_addr]:
+                self._cache_invalidate(node)
         if self.node_list:
             cluster_run_cmd(cmd, self.node_list)
             return True, None
@@ -2548,14 +2727,23 @@ class ServiceManager(object):
 
     @property
     def is_available(self):
+        state = self._cached_state()
+        if state is not None:
+            return state.get("LoadState") != "not-found" and bool(state.get("UnitFileState"))
         return self.service_name in self._do_action(self.ACTION_MAP["is_available"])[1]
 
     @property
     def is_enabled(self):
+        state = self._cached_state()
+        if state is not None:
+            return state.get("UnitFileState") in self.ENABLED_STATES
         return self._do_action(self.ACTION_MAP["is_enabled"])[0]
 
     @property
     def is_active(self):
+        state = self._cached_state()
+        if state is not None:
+            return state.get("ActiveState") in self.ACTIVE_STATES
         return self._do_action(self.ACTION_MAP["is_active"])[0]
 
     def start(self):
@@ -2640,6 +2828,9 @@ start_service = ServiceManager.start_service
 stop_service = ServiceManager.stop_service
 enable_service = ServiceManager.enable_service
 disable_service = ServiceManager.disable_service
+query_services = ServiceManager.query_services
+query_services_on_nodes = ServiceManager.query_services_on_nodes
+service_state_cache = ServiceManager.cached
 
 
 def package_is_installed(pkg, remote_addr=None):
@@ -2673,13 +2864,13 @@ def calculate_quorate_status(expected_votes, actual_votes):
     return int(actual_votes)/int(expected_votes) > 0.5
 
 
-def get_stdout_or_raise_error(cmd, remote=None, success_val_list=[0], no_raise=False):
+def get_stdout_or_raise_error(cmd, remote=None, success_val_list=[0], no_raise=False, input_s=None):
     """
     Common function to get stdout from cmd or raise exception
     """
     if remote:
-        cmd = "ssh {} root@{} \"{}\"".format(SSH_OPTION, remote, cmd)
-    rc, out, err = get_stdout_stderr(cmd, no_reg=True)
+        cmd = "ssh {} root@{} \"{}\"".format(ssh_pool.ssh_option(), remote, cmd)
+    rc, out, err = get_stdout_stderr(cmd, input_s=input_s, no_reg=True)
     if rc not in success_val_list and not no_raise:
         raise ValueError("Failed to run \"{}\": {}".format(cmd, err))
     return out
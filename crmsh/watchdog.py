@@ -1,6 +1,6 @@
 import re
 from . import utils
-from .constants import SSH_OPTION
+from . import ssh_pool
 from .bootstrap import invoke, invokerc, WATCHDOG_CFG, SYSCONFIG_SBD
 
 
@@ -87,7 +87,7 @@ class Watchdog(object):
         """
         Given watchdog device name, get driver name on remote node
         """
-        cmd = "ssh {} root@{} {}".format(SSH_OPTION, self._peer_host, self.QUERY_CMD)
+        cmd = "ssh {} root@{} {}".format(ssh_pool.ssh_option(), self._peer_host, self.QUERY_CMD)
         rc, out, err = utils.get_stdout_stderr(cmd)
         if rc == 0 and out:
             # output format might like:
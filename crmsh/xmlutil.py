@@ -3,6 +3,7 @@
 # See COPYING for license information.
 
 import os
+import re
 import subprocess
 from lxml import etree, doctestcompare
 import copy
@@ -68,6 +69,7 @@ def compressed_file_to_cib(s):
 
 
 cib_dump = "cibadmin -Ql"
+cib_version_query = "cibadmin -Ql --xpath /cib --no-children"
 
 
 def sudocall(cmd):
@@ -126,6 +128,28 @@ def cibdump2elem(section=None):
     return None
 
 
+def cib_version(with_status=False):
+    '''
+    Returns the version of the CIB in use, without dumping
+    the whole CIB: (cib, admin_epoch, epoch, cib-last-written),
+    plus num_updates with_status (num_updates changes with the
+    status only). The epoch alone may repeat with other contents
+    after the CIB was initialized again or restored.
+    None if the version is not available.
+    '''
+    rc, outp, _ = sudocall(cib_version_query)
+    if rc != 0 or not outp:
+        return None
+    attrs = dict(re.findall(r'([\w-]+)="([^"]*)"', outp.split('>', 1)[0]))
+    if "epoch" not in attrs:
+        return None
+    cib = get_cib_in_use() or os.getenv("CIB_file") or ""
+    version = (cib, attrs.get("admin_epoch"), attrs.get("epoch"), attrs.get("cib-last-written"))
+    if with_status:
+        version += (attrs.get("num_updates"),)
+    return version
+
+
 def read_cib(fun, params=None):
     cib_elem = fun(params)
     if cib_elem is None or cib_elem.tag != "cib":
@@ -979,6 +1003,8 @@ def rset_uniq(c_obj, d):
             l.append(rref)
             d[rsc_id] -= 1
     rmnodes(l)
+    if l:
+        c_obj.node_changed()
 
 
 def delete_rscref_rset(c_obj, rsc_id):
@@ -1022,6 +1048,7 @@ def rset_convert(c_obj):
             del rset.attrib["sequential"]
         rsetcnt += 1
     c_obj.modified = True
+    c_obj.node_changed()
     cli = c_obj.repr_cli(format_mode=-1)
     cli = cli.replace("_rsc_set_ ", "")
     newnode = c_obj.cli2node(cli)
@@ -21,7 +21,7 @@ except ImportError:
 
 from crmsh import bootstrap
 from crmsh import corosync
-from crmsh import constants
+from crmsh import ssh_pool
 from crmsh import qdevice
 
 
@@ -395,7 +395,7 @@ class TestBootstrap(unittest.TestCase):
         mock_invoke.return_value = (False, None, "error")
         error_string = 'Failed to append contents of fromfile to node1:\n"error"\n\n    crmsh has no way to help you to setup up passwordless ssh among nodes at this time. \n    As the hint, likely, `PasswordAuthentication` is \'no\' in /etc/ssh/sshd_config. \n    Given in this case, users must setup passwordless ssh beforehand, or change it to \'yes\' and manage passwords properly\n    '
         bootstrap.append_to_remote_file("fromfile", "node1", "tofile")
-        cmd = "cat fromfile | ssh {} root@node1 'cat >> tofile'".format(constants.SSH_OPTION)
+        cmd = "cat fromfile | ssh {} root@node1 'cat >> tofile'".format(ssh_pool.ssh_option())
         mock_invoke.assert_called_once_with(cmd)
         mock_error.assert_called_once_with(error_string)
 
@@ -408,10 +408,10 @@ class TestBootstrap(unittest.TestCase):
         self.assertEqual("No ssh key exist on node1", str(err.exception))
 
         mock_invoke.assert_has_calls([
-            mock.call("ssh {} root@node1 'test -f /root/.ssh/id_rsa.pub'".format(constants.SSH_OPTION)),
-            mock.call("ssh {} root@node1 'test -f /root/.ssh/id_ecdsa.pub'".format(constants.SSH_OPTION)),
-            mock.call("ssh {} root@node1 'test -f /root/.ssh/id_ed25519.pub'".format(constants.SSH_OPTION)),
-            mock.call("ssh {} root@node1 'test -f /root/.ssh/id_dsa.pub'".format(constants.SSH_OPTION))
+            mock.call("ssh {} root@node1 'test -f /root/.ssh/id_rsa.pub'".format(ssh_pool.ssh_option())),
+            mock.call("ssh {} root@node1 'test -f /root/.ssh/id_ecdsa.pub'".format(ssh_pool.ssh_option())),
+            mock.call("ssh {} root@node1 'test -f /root/.ssh/id_ed25519.pub'".format(ssh_pool.ssh_option())),
+            mock.call("ssh {} root@node1 'test -f /root/.ssh/id_dsa.pub'".format(ssh_pool.ssh_option()))
             ])
 
     @mock.patch('crmsh.tmpfiles.create')
@@ -425,8 +425,8 @@ class TestBootstrap(unittest.TestCase):
         res = bootstrap.fetch_public_key_from_remote_node("node1")
         self.assertEqual(res, "temp_file_name")
 
-        mock_invokerc.assert_called_once_with("ssh {} root@node1 'test -f /root/.ssh/id_rsa.pub'".format(constants.SSH_OPTION))
-        mock_invoke.assert_called_once_with("scp -o StrictHostKeyChecking=no root@node1:/root/.ssh/id_rsa.pub temp_file_name")
+        mock_invokerc.assert_called_once_with("ssh {} root@node1 'test -f /root/.ssh/id_rsa.pub'".format(ssh_pool.ssh_option()))
+        mock_invoke.assert_called_once_with("scp {} root@node1:/root/.ssh/id_rsa.pub temp_file_name".format(ssh_pool.ssh_option()))
         mock_tmpfile.assert_called_once_with()
 
     @mock.patch('crmsh.utils.fatal')
@@ -456,7 +456,7 @@ class TestBootstrap(unittest.TestCase):
             mock.call("node1", "root"),
             mock.call("node1", "hacluster")
             ])
-        mock_invoke.assert_called_once_with("ssh {} root@node1 crm cluster init -i eth1 ssh_remote".format(constants.SSH_OPTION))
+        mock_invoke.assert_called_once_with("ssh {} root@node1 crm cluster init -i eth1 ssh_remote".format(ssh_pool.ssh_option()))
         mock_error.assert_called_once_with("Can't invoke crm cluster init -i eth1 ssh_remote on node1: error")
 
     def test_swap_public_ssh_key_return(self):
@@ -508,7 +508,7 @@ class TestBootstrap(unittest.TestCase):
         with self.assertRaises(SystemExit):
             bootstrap.setup_passwordless_with_other_nodes("node1")
 
-        mock_run.assert_called_once_with("ssh {} root@node1 crm_node -l".format(constants.SSH_OPTION))
+        mock_run.assert_called_once_with("ssh {} root@node1 crm_node -l".format(ssh_pool.ssh_option()))
         mock_error.assert_called_once_with("Can't fetch cluster nodes list from node1: None")
 
     @mock.patch('crmsh.utils.fatal')
@@ -526,31 +526,71 @@ class TestBootstrap(unittest.TestCase):
             bootstrap.setup_passwordless_with_other_nodes("node1")
 
         mock_run.assert_has_calls([
-            mock.call("ssh {} root@node1 crm_node -l".format(constants.SSH_OPTION)),
-            mock.call("ssh {} root@node1 hostname".format(constants.SSH_OPTION))
+            mock.call("ssh {} root@node1 crm_node -l".format(ssh_pool.ssh_option())),
+            mock.call("ssh {} root@node1 hostname".format(ssh_pool.ssh_option()))
             ])
         mock_error.assert_called_once_with("Can't fetch hostname of node1: None")
 
     @mock.patch('crmsh.bootstrap.swap_public_ssh_key')
+    @mock.patch('crmsh.bootstrap.swap_public_ssh_key_with_nodes')
     @mock.patch('crmsh.utils.get_stdout_stderr')
-    def test_setup_passwordless_with_other_nodes(self, mock_run, mock_swap):
+    def test_setup_passwordless_with_other_nodes(self, mock_run, mock_swap_nodes, mock_swap):
         out_node_list = """1 node1 member
-        2 node2 member"""
+        2 node2 member
+        3 node3 member"""
         mock_run.side_effect = [
                 (0, out_node_list, None),
                 (0, "node1", None)
                 ]
+        mock_swap_nodes.side_effect = [["node3"], []]
 
         bootstrap.setup_passwordless_with_other_nodes("node1")
 
         mock_run.assert_has_calls([
-            mock.call("ssh {} root@node1 crm_node -l".format(constants.SSH_OPTION)),
-            mock.call("ssh {} root@node1 hostname".format(constants.SSH_OPTION))
+            mock.call("ssh {} root@node1 crm_node -l".format(ssh_pool.ssh_option())),
+            mock.call("ssh {} root@node1 hostname".format(ssh_pool.ssh_option()))
             ])
-        mock_swap.assert_has_calls([
-            mock.call("node2", "root"),
-            mock.call("node2", "hacluster")
+        mock_swap_nodes.assert_has_calls([
+            mock.call(["node2", "node3"], "root"),
+            mock.call(["node2", "node3"], "hacluster")
             ])
+        mock_swap.assert_called_once_with("node3", "root")
+
+    def test_swap_public_ssh_key_with_nodes_skip_user(self):
+        bootstrap._context = mock.Mock(with_other_user=False)
+        res = bootstrap.swap_public_ssh_key_with_nodes(["node1"], "hacluster")
+        self.assertEqual(res, [])
+
+    @mock.patch('crmsh.bootstrap.append_unique')
+    @mock.patch('crmsh.utils.str2file')
+    @mock.patch('crmsh.tmpfiles.create')
+    @mock.patch('logging.Logger.warning')
+    @mock.patch('crmsh.parallax.parallax_call')
+    @mock.patch('crmsh.bootstrap.key_files')
+    @mock.patch('crmsh.log.LoggerUtils.log_only_to_file')
+    def test_swap_public_ssh_key_with_nodes(self, mock_log, mock_key_files, mock_call, mock_warn, mock_create, mock_str2file, mock_append_unique):
+        import parallax
+        bootstrap._context = mock.Mock(with_other_user=True)
+        mock_key_files.return_value = {"private": "/root/.ssh/id_rsa", "public": "/root/.ssh/id_rsa.pub", "authorized": "/root/.ssh/authorized_keys"}
+        mock_call.return_value = [
+                ("node1", (0, b"ssh-rsa KEY1 root@node1\n", b"")),
+                ("node2", (0, b"", b"")),
+                ("node3", parallax.Error("Exited with error code 255", None)),
+                ("node4", (1, b"", b"chown: invalid user"))
+                ]
+        mock_create.return_value = (None, "tmpfile")
+
+        with mock.patch('builtins.open', mock.mock_open(read_data="ssh-rsa LOCAL root@local\n")):
+            res = bootstrap.swap_public_ssh_key_with_nodes(["node1", "node2", "node3", "node4"], "root")
+
+        self.assertEqual(res, ["node3", "node4"])
+        cmd = mock_call.call_args[0][1]
+        self.assertIn("mkdir -p /root/.ssh && chown root: /root/.ssh && chmod 700 /root/.ssh && ", cmd)
+        self.assertIn("grep -qsF 'ssh-rsa LOCAL root@local' /root/.ssh/authorized_keys", cmd)
+        self.assertIn("chown root: /root/.ssh/authorized_keys && chmod 600 /root/.ssh/authorized_keys", cmd)
+        mock_warn.assert_called_once_with("No ssh key exist on node2")
+        mock_str2file.assert_called_once_with("ssh-rsa KEY1 root@node1\n", "tmpfile")
+        mock_append_unique.assert_called_once_with("tmpfile", "/root/.ssh/authorized_keys")
 
     @mock.patch('builtins.open')
     @mock.patch('crmsh.bootstrap.append')
@@ -592,7 +632,7 @@ class TestBootstrap(unittest.TestCase):
         peer_node = bootstrap.get_cluster_node_hostname()
         assert peer_node == "Node1"
 
-        mock_stdout_stderr.assert_called_once_with("ssh {} node1 crm_node --name".format(constants.SSH_OPTION))
+        mock_stdout_stderr.assert_called_once_with("ssh {} node1 crm_node --name".format(ssh_pool.ssh_option()))
 
     @mock.patch('crmsh.utils.fatal')
     @mock.patch('crmsh.utils.get_stdout_stderr')
@@ -604,7 +644,7 @@ class TestBootstrap(unittest.TestCase):
         with self.assertRaises(SystemExit):
             bootstrap.get_cluster_node_hostname()
 
-        mock_stdout_stderr.assert_called_once_with("ssh {} node2 crm_node --name".format(constants.SSH_OPTION))
+        mock_stdout_stderr.assert_called_once_with("ssh {} node2 crm_node --name".format(ssh_pool.ssh_option()))
         mock_error.assert_called_once_with("error")
 
     @mock.patch('crmsh.utils.this_node')
@@ -1424,7 +1464,7 @@ class TestValidation(unittest.TestCase):
             bootstrap.remove_self()
 
         mock_list.assert_called_once_with(include_remote_nodes=False)
-        mock_ext.assert_called_once_with("ssh {} node2 'crm cluster remove -y -c node1'".format(constants.SSH_OPTION))
+        mock_ext.assert_called_once_with("ssh {} node2 'crm cluster remove -y -c node1'".format(ssh_pool.ssh_option()))
         mock_error.assert_called_once_with("Failed to remove this node from node2")
 
     @mock.patch('crmsh.utils.fatal')
@@ -1500,7 +1540,7 @@ class TestValidation(unittest.TestCase):
 
         mock_get_ip.assert_called_once_with()
         mock_stop.assert_called_once_with(bootstrap.SERVICES_STOP_LIST, remote_addr="node1")
-        mock_invoke.assert_called_once_with('ssh {} root@node1 "bash -c \\"rm -f file1 file2\\""'.format(constants.SSH_OPTION))
+        mock_invoke.assert_called_once_with('ssh {} root@node1 "bash -c \\"rm -f file1 file2\\""'.format(ssh_pool.ssh_option()))
         mock_error.assert_called_once_with("Deleting the configuration files failed: error")
 
     @mock.patch('crmsh.utils.fatal')
@@ -1520,7 +1560,7 @@ class TestValidation(unittest.TestCase):
         mock_status.assert_called_once_with("Removing the node node1")
         mock_stop.assert_called_once_with(bootstrap.SERVICES_STOP_LIST, remote_addr="node1")
         mock_invoke.assert_has_calls([
-            mock.call('ssh {} root@node1 "bash -c \\"rm -f file1 file2\\""'.format(constants.SSH_OPTION)),
+            mock.call('ssh {} root@node1 "bash -c \\"rm -f file1 file2\\""'.format(ssh_pool.ssh_option())),
             mock.call('crm node delete node1')
             ])
         mock_error.assert_called_once_with("Failed to remove node1: error data")
@@ -1544,7 +1584,7 @@ class TestValidation(unittest.TestCase):
         mock_status.assert_called_once_with("Removing the node node1")
         mock_stop.assert_called_once_with(bootstrap.SERVICES_STOP_LIST, remote_addr="node1")
         mock_invoke.assert_has_calls([
-            mock.call('ssh {} root@node1 "bash -c \\"rm -f file1 file2\\""'.format(constants.SSH_OPTION)),
+            mock.call('ssh {} root@node1 "bash -c \\"rm -f file1 file2\\""'.format(ssh_pool.ssh_option())),
             mock.call('crm node delete node1')
             ])
         mock_invokerc.assert_has_calls([
@@ -1578,7 +1618,7 @@ class TestValidation(unittest.TestCase):
             ])
         mock_stop.assert_called_once_with(bootstrap.SERVICES_STOP_LIST, remote_addr="node1")
         mock_invoke.assert_has_calls([
-            mock.call('ssh {} root@node1 "bash -c \\"rm -f file1 file2\\""'.format(constants.SSH_OPTION)),
+            mock.call('ssh {} root@node1 "bash -c \\"rm -f file1 file2\\""'.format(ssh_pool.ssh_option())),
             mock.call('crm node delete node1'),
             mock.call("corosync-cfgtool -R")
             ])
@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from crmsh import cache, completers, xmlutil
+
+
+class TestSnapshot(unittest.TestCase):
+    """
+    Unitary tests for the completion snapshot in crmsh.cache
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.patches = [
+            mock.patch('crmsh.constants.CRM_CACHE_DIR', self.tmpdir),
+            mock.patch('crmsh.cache.SNAPSHOT_FILE', os.path.join(self.tmpdir, 'completions')),
+            mock.patch('crmsh.cache._snapshot', None),
+            mock.patch('crmsh.cache._snapshot_dirty', False),
+            mock.patch('atexit.register'),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def test_no_key(self):
+        fn = mock.Mock(return_value=["a"])
+        self.assertEqual(cache.snapshot("name", None, fn), ["a"])
+        self.assertEqual(cache.snapshot("name", None, fn), ["a"])
+        self.assertEqual(fn.call_count, 2)
+        self.assertFalse(cache._snapshot_dirty)
+
+    def test_same_key(self):
+        fn = mock.Mock(return_value=["a", "b"])
+        self.assertEqual(cache.snapshot("name", ("cib", "0", "1"), fn), ["a", "b"])
+        self.assertEqual(cache.snapshot("name", ("cib", "0", "1"), fn), ["a", "b"])
+        fn.assert_called_once_with()
+
+    def test_key_changed(self):
+        fn = mock.Mock(side_effect=[["a"], ["a", "b"]])
+        self.assertEqual(cache.snapshot("name", ("cib", "0", "1"), fn), ["a"])
+        self.assertEqual(cache.snapshot("name", ("cib", "0", "2"), fn), ["a", "b"])
+        self.assertEqual(fn.call_count, 2)
+
+    def test_shared_across_invocations(self):
+        cache.snapshot("name", ("cib", "0", "1"), lambda: ["a", "b"])
+        cache._save_snapshot()
+        self.assertTrue(os.path.exists(cache.SNAPSHOT_FILE))
+        cache._snapshot = None
+        fn = mock.Mock()
+        self.assertEqual(cache.snapshot("name", ("cib", "0", "1"), fn), ["a", "b"])
+        fn.assert_not_called()
+
+    def test_broken_file(self):
+        with open(cache.SNAPSHOT_FILE, 'wb') as f:
+            f.write(b'garbage')
+        self.assertEqual(cache.snapshot("name", ("cib", "0", "1"), lambda: ["a"]), ["a"])
+
+
+class TestCibVersion(unittest.TestCase):
+    """
+    Unitary tests for crmsh.xmlutil.cib_version
+    """
+
+    @mock.patch('os.getenv')
+    @mock.patch('crmsh.xmlutil.get_cib_in_use')
+    @mock.patch('crmsh.xmlutil.sudocall')
+    def test_cib_version(self, mock_call, mock_in_use, mock_getenv):
+        mock_call.return_value = (0, '<cib crm_feature_set="3.10.2" validate-with="pacemaker-3.7" epoch="12" num_updates="4" admin_epoch="0" cib-last-written="Mon Oct 19 09:00:00 2026"/>\n', '')
+        mock_in_use.return_value = ""
+        mock_getenv.return_value = None
+        self.assertEqual(xmlutil.cib_version(), ("", "0", "12", "Mon Oct 19 09:00:00 2026"))
+        self.assertEqual(xmlutil.cib_version(with_status=True), ("", "0", "12", "Mon Oct 19 09:00:00 2026", "4"))
+        mock_call.assert_called_with(xmlutil.cib_version_query)
+
+    @mock.patch('crmsh.xmlutil.sudocall')
+    def test_cib_version_failed(self, mock_call):
+        mock_call.return_value = (1, '', 'error')
+        self.assertIsNone(xmlutil.cib_version())
+
+
+class TestCompleters(unittest.TestCase):
+    """
+    Unitary tests for the completers served from the snapshot
+    """
+
+    @mock.patch('crmsh.cache.snapshot')
+    @mock.patch('crmsh.xmlutil.cib_version')
+    def test_resources_started(self, mock_version, mock_snapshot):
+        mock_version.return_value = ("", "0", "12", "Mon Oct 19 09:00:00 2026", "4")
+        mock_snapshot.return_value = ["r1"]
+        self.assertEqual(completers.resources(["started"]), ["r1"])
+        mock_version.assert_called_once_with(True)
+        mock_snapshot.assert_called_once_with("cib-resources-started", ("", "0", "12", "Mon Oct 19 09:00:00 2026", "4"), mock.ANY)
+
+    @mock.patch('crmsh.cache.snapshot')
+    @mock.patch('crmsh.xmlutil.cib_version')
+    def test_primitives(self, mock_version, mock_snapshot):
+        mock_version.return_value = ("", "0", "12", "Mon Oct 19 09:00:00 2026")
+        mock_snapshot.return_value = ["p1"]
+        self.assertEqual(completers.primitives([]), ["p1"])
+        mock_version.assert_called_once_with(False)
+        mock_snapshot.assert_called_once_with("cib-primitives", ("", "0", "12", "Mon Oct 19 09:00:00 2026"), mock.ANY)
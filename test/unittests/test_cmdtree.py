@@ -0,0 +1,129 @@
+import os
+import sys
+import json
+import tempfile
+import subprocess
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from crmsh import cmdtree
+from crmsh import command
+
+
+class Sub(command.UI):
+    name = "sub"
+
+    @command.alias('ls2')
+    @command.help("list things")
+    def do_list(self, context):
+        pass
+
+    @command.help("show thing")
+    def do_show(self, context, name):
+        pass
+
+
+class Top(command.UI):
+    name = "top"
+
+    @command.level(Sub)
+    @command.help("sub level")
+    def do_sub(self):
+        pass
+
+    @command.help("show status")
+    def do_status(self, context):
+        pass
+
+
+TREE = {
+    cmdtree.ROOT_ID: (["cluster", "status"], {"cluster": "crmsh.ui_cluster.Cluster", "status": None}),
+    "crmsh.ui_cluster.Cluster": (["start", "stop"], {"start": None, "stop": None})
+}
+
+
+class TestCmdTree(unittest.TestCase):
+    """
+    Unitary tests for crmsh/cmdtree.py
+    """
+
+    def test_command_tree(self):
+        Top.init_ui()
+        tree = Top.command_tree()
+        top_completions, top_children = tree[Top.tree_id()]
+        self.assertIn("sub", top_completions)
+        self.assertIn("status", top_completions)
+        self.assertEqual(top_children["sub"], Sub.tree_id())
+        self.assertIsNone(top_children["status"])
+        sub_completions, sub_children = tree[Sub.tree_id()]
+        self.assertIn("list", sub_completions)
+        self.assertNotIn("ls2", sub_completions)
+        self.assertIsNone(sub_children["ls2"])
+
+    def test_complete(self):
+        self.assertEqual(cmdtree.complete(TREE, ""), ["cluster", "status"])
+        self.assertEqual(cmdtree.complete(TREE, "clu"), ["cluster", "status"])
+        self.assertEqual(cmdtree.complete(TREE, "cluster"), ["cluster", "status"])
+        self.assertEqual(cmdtree.complete(TREE, "cluster "), ["start", "stop"])
+        self.assertEqual(cmdtree.complete(TREE, "cluster st"), ["start", "stop"])
+        self.assertEqual(cmdtree.complete(TREE, "'cluster"), [])
+        self.assertIsNone(cmdtree.complete(TREE, "cluster start "))
+        self.assertIsNone(cmdtree.complete(TREE, "status"))
+
+    def test_strip_crm(self):
+        self.assertEqual(cmdtree.strip_crm("/usr/sbin/crm  cluster "), "cluster ")
+
+    @mock.patch('crmsh.cmdtree.load')
+    def test_compgen_no_tree(self, mock_load):
+        mock_load.return_value = None
+        self.assertFalse(cmdtree.compgen(["5", "crm clu"]))
+
+    @mock.patch('builtins.print')
+    @mock.patch('crmsh.cmdtree.load')
+    def test_compgen(self, mock_load, mock_print):
+        mock_load.return_value = TREE
+        self.assertTrue(cmdtree.compgen(["5", "crm cluster "]))
+        mock_print.assert_has_calls([mock.call("start"), mock.call("stop")])
+        self.assertFalse(cmdtree.compgen(["5", "crm cluster start "]))
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with mock.patch('crmsh.cmdtree.CMDTREE_FILE', os.path.join(tmpdir, "cmdtree")), \
+                    mock.patch('crmsh.constants.CRM_CACHE_DIR', tmpdir):
+                self.assertIsNone(cmdtree.load())
+                cmdtree.save(TREE)
+                self.assertEqual(cmdtree.load(), TREE)
+                with mock.patch('crmsh.cmdtree._key', return_value=[]):
+                    self.assertIsNone(cmdtree.load())
+
+
+class TestCompgenImports(unittest.TestCase):
+    """
+    "crm --compgen" level and command name completion from the saved
+    tree must not import the UI, the CIB layer or lxml
+    """
+
+    SCRIPT = """
+import sys, json
+from crmsh import log
+from crmsh import cmdtree
+handled = cmdtree.compgen(["5", "crm cluster "])
+heavy = [m for m in ("crmsh.ui_root", "crmsh.utils", "crmsh.cibconfig", "lxml") if m in sys.modules]
+sys.stderr.write(json.dumps([handled, heavy]))
+"""
+
+    def test_compgen_imports(self):
+        topdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+        with tempfile.TemporaryDirectory() as home:
+            env = dict(os.environ, HOME=home, PYTHONPATH=topdir)
+            subprocess.check_call([sys.executable, "-c",
+                                   "from crmsh import cmdtree; cmdtree.save({})".format(repr(TREE))], env=env)
+            proc = subprocess.run([sys.executable, "-c", self.SCRIPT], env=env,
+                                  stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        handled, heavy = json.loads(proc.stderr.decode().splitlines()[-1])
+        self.assertEqual(proc.stdout.decode().split(), ["start", "stop"])
+        self.assertTrue(handled)
+        self.assertEqual(heavy, [])
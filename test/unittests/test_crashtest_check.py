@@ -44,11 +44,12 @@ class TestCheck(TestCase):
         mock_hostname.assert_called_once_with()
         mock_task_inst.error.assert_called_once_with('Hostname "node1" is unresolvable.\n  Please add an entry to /etc/hosts or configure DNS.')
 
+    @mock.patch('crmsh.crash_test.check.crmshutils.service_state_cache')
     @mock.patch('crmsh.crash_test.check.crmshutils.service_is_active')
     @mock.patch('crmsh.crash_test.check.crmshutils.service_is_enabled')
     @mock.patch('crmsh.crash_test.check.crmshutils.service_is_available')
     @mock.patch('crmsh.crash_test.task.TaskCheck')
-    def test_check_time_service_none(self, mock_task, mock_service_available, mock_service_enabled, mock_service_active):
+    def test_check_time_service_none(self, mock_task, mock_service_available, mock_service_enabled, mock_service_active, mock_cache):
         mock_task_inst = mock.Mock()
         mock_task.return_value = mock_task_inst
         mock_task_inst.run.return_value.__enter__ = mock.Mock()
@@ -65,11 +66,12 @@ class TestCheck(TestCase):
             ])
         mock_task_inst.warn.assert_called_once_with("No NTP service found.")
 
+    @mock.patch('crmsh.crash_test.check.crmshutils.service_state_cache')
     @mock.patch('crmsh.crash_test.check.crmshutils.service_is_active')
     @mock.patch('crmsh.crash_test.check.crmshutils.service_is_enabled')
     @mock.patch('crmsh.crash_test.check.crmshutils.service_is_available')
     @mock.patch('crmsh.crash_test.task.TaskCheck')
-    def test_check_time_service_warn(self, mock_task, mock_service_available, mock_service_enabled, mock_service_active):
+    def test_check_time_service_warn(self, mock_task, mock_service_available, mock_service_enabled, mock_service_active, mock_cache):
         mock_task_inst = mock.Mock()
         mock_task.return_value = mock_task_inst
         mock_task_inst.run.return_value.__enter__ = mock.Mock()
@@ -88,11 +90,12 @@ class TestCheck(TestCase):
             mock.call("chronyd.service is not active"),
             ])
 
+    @mock.patch('crmsh.crash_test.check.crmshutils.service_state_cache')
     @mock.patch('crmsh.crash_test.check.crmshutils.service_is_active')
     @mock.patch('crmsh.crash_test.check.crmshutils.service_is_enabled')
     @mock.patch('crmsh.crash_test.check.crmshutils.service_is_available')
     @mock.patch('crmsh.crash_test.task.TaskCheck')
-    def test_check_time_service(self, mock_task, mock_service_available, mock_service_enabled, mock_service_active):
+    def test_check_time_service(self, mock_task, mock_service_available, mock_service_enabled, mock_service_active, mock_cache):
         mock_task_inst = mock.Mock()
         mock_task.return_value = mock_task_inst
         mock_task_inst.run.return_value.__enter__ = mock.Mock()
@@ -229,10 +232,11 @@ class TestCheck(TestCase):
         mock_check_nodes.assert_called_once_with()
         mock_check_resources.assert_called_once_with()
 
+    @mock.patch('crmsh.crash_test.check.crmshutils.service_state_cache')
     @mock.patch('crmsh.crash_test.check.crmshutils.service_is_active')
     @mock.patch('crmsh.crash_test.check.crmshutils.service_is_enabled')
     @mock.patch('crmsh.crash_test.task.TaskCheck')
-    def test_check_cluster_service_pacemaker_disable(self, mock_task, mock_enabled, mock_active):
+    def test_check_cluster_service_pacemaker_disable(self, mock_task, mock_enabled, mock_active, mock_cache):
         mock_task_inst = mock.Mock(passed=False)
         mock_task.return_value = mock_task_inst
         mock_task_inst.run.return_value.__enter__ = mock.Mock()
@@ -259,10 +263,11 @@ class TestCheck(TestCase):
         mock_task_inst.info.assert_called_once_with("corosync.service is running")
         mock_task_inst.error.assert_called_once_with("pacemaker.service is not running!")
 
+    @mock.patch('crmsh.crash_test.check.crmshutils.service_state_cache')
     @mock.patch('crmsh.crash_test.check.crmshutils.service_is_active')
     @mock.patch('crmsh.crash_test.check.crmshutils.service_is_enabled')
     @mock.patch('crmsh.crash_test.task.TaskCheck')
-    def test_check_cluster_service(self, mock_task, mock_enabled, mock_active):
+    def test_check_cluster_service(self, mock_task, mock_enabled, mock_active, mock_cache):
         mock_task_inst = mock.Mock(passed=True)
         mock_task.return_value = mock_task_inst
         mock_task_inst.run.return_value.__enter__ = mock.Mock()
@@ -74,6 +74,7 @@ class TestMain(TestCase):
         mock_is_root.assert_called_once_with()
         mock_log_fatal.assert_called_once_with("{} can only be executed as user root!".format(ctx.process_name))
 
+    @mock.patch('crmsh.crash_test.utils.journal_compact')
     @mock.patch('crmsh.crash_test.main.split_brain')
     @mock.patch('crmsh.crash_test.main.fence_node')
     @mock.patch('crmsh.crash_test.main.kill_process')
@@ -85,7 +86,7 @@ class TestMain(TestCase):
     @mock.patch('crmsh.crash_test.main.parse_argument')
     @mock.patch('crmsh.crash_test.main.setup_basic_context')
     def test_run(self, mock_setup, mock_parse, mock_is_root, mock_exists, mock_mkdir,
-                 mock_fix, mock_check, mock_kill, mock_fence, mock_sb):
+                 mock_fix, mock_check, mock_kill, mock_fence, mock_sb, mock_compact):
         mock_is_root.return_value = True
         ctx = mock.Mock(var_dir="/var/lib/crash_test")
         mock_exists.return_value = False
@@ -103,7 +104,7 @@ class TestMain(TestCase):
         mock_fence.assert_called_once_with(ctx)
         mock_sb.assert_called_once_with(ctx)
 
-    @mock.patch('crmsh.crash_test.utils.json_dumps')
+    @mock.patch('crmsh.crash_test.utils.journal_compact')
     @mock.patch('crmsh.crash_test.main.check.check')
     @mock.patch('crmsh.crash_test.main.check.fix')
     @mock.patch('os.path.exists')
@@ -111,7 +112,7 @@ class TestMain(TestCase):
     @mock.patch('crmsh.crash_test.main.parse_argument')
     @mock.patch('crmsh.crash_test.main.setup_basic_context')
     def test_run_except(self, mock_setup, mock_parse, mock_is_root, mock_exists,
-            mock_fix, mock_check, mock_dumps):
+            mock_fix, mock_check, mock_compact):
         mock_is_root.return_value = True
         ctx = mock.Mock(var_dir="/var/lib/crash_test")
         mock_exists.return_value = True
@@ -126,7 +127,7 @@ class TestMain(TestCase):
         mock_exists.assert_called_once_with(ctx.var_dir)
         mock_check.assert_called_once_with(ctx)
         mock_fix.assert_called_once_with(ctx)
-        mock_dumps.assert_called_once_with()
+        mock_compact.assert_has_calls([mock.call(), mock.call(ctx.task_list), mock.call()])
 
     @mock.patch('crmsh.crash_test.task.TaskKill')
     def test_kill_porcess_return_pacemaker_loop(self, mock_task_kill):
@@ -702,6 +702,26 @@ class TestTask(TestCase):
         self.task_inst.to_json.assert_called_once_with()
         self.task_inst.to_report.assert_called_once_with()
 
+    @mock.patch('crmsh.crash_test.utils.journal_append')
+    def test_to_journal(self, mock_append):
+        self.task_inst.to_json = mock.Mock()
+        self.task_inst.messages = [("info", "msg1", "time1"), ("warn", "msg2", "time2")]
+        self.task_inst.to_journal()
+        self.task_inst.to_json.assert_not_called()
+        mock_append.assert_called_once_with({
+            "Timestamp": self.task_inst.timestamp,
+            "Description": self.task_inst.description,
+            "Message": "time2 WARN:msg2"
+            })
+
+    @mock.patch('crmsh.crash_test.utils.journal_append')
+    def test_to_journal_compact(self, mock_append):
+        self.task_inst.to_json = mock.Mock()
+        self.task_inst.messages = [("info", "msg", "time")] * (config.JOURNAL_COMPACT_INTERVAL + 1)
+        self.task_inst.to_journal()
+        self.task_inst.to_json.assert_called_once_with()
+        mock_append.assert_not_called()
+
     def test_build_base_result(self):
         self.task_inst.build_base_result()
         expected_result = {
@@ -724,44 +744,53 @@ class TestTask(TestCase):
         mock_ask.assert_called_once_with(task.Task.REBOOT_WARNING)
         self.task_inst.info.assert_called_once_with("Testcase cancelled")
 
-    @mock.patch('crmsh.crash_test.utils.str_to_datetime')
-    @mock.patch('time.sleep')
+    @mock.patch('crmsh.crash_test.watcher.watcher')
     @mock.patch('crmsh.crash_test.task.Task.info')
-    @mock.patch('crmsh.crash_test.task.crmshutils.get_stdout_stderr')
-    def test_fence_action_monitor(self, mock_run, mock_info, mock_sleep, mock_datetime):
+    def test_fence_action_monitor(self, mock_info, mock_watcher):
+        import queue
+        from crmsh.crash_test import watcher
         self.task_inst.thread_stop_event = mock.Mock()
-        self.task_inst.thread_stop_event.is_set.side_effect = [False, False, False, False]
+        self.task_inst.thread_stop_event.is_set.return_value = False
         self.task_inst.fence_start_event = mock.Mock()
         self.task_inst.fence_finish_event = mock.Mock()
-        output = "Pending Fencing Actions:\n  * reboot of 15sp2-2 pending: client=pacemaker-controld.2430, origin=15sp2-1"
-        output2 = "Node 15sp2-2 last fenced at: Tue Jan 19 16:08:37 2021"
-        mock_run.side_effect = [(1, None, None), (0, output, None), (1, None, None), (0, output2, None)]
         self.task_inst.timestamp = "2021/01/19 16:08:24"
-        mock_datetime.side_effect = [
-            datetime.strptime(self.task_inst.timestamp, '%Y/%m/%d %H:%M:%S'),
-            datetime.strptime("Tue Jan 19 16:08:37 2021", '%a %b %d %H:%M:%S %Y')
-        ]
+        task_ts = crmshutils.parse_to_timestamp(self.task_inst.timestamp)
+        events = queue.Queue()
+        events.put(watcher.Event(watcher.EVENT_FENCE_SUCCESS, task_ts - 100, "15sp2-2", "15sp2-1", "reboot"))
+        events.put(watcher.Event(watcher.EVENT_FENCE_PENDING, task_ts + 1, "15sp2-2", "15sp2-1", "reboot"))
+        events.put(watcher.Event(watcher.EVENT_FENCE_PENDING, task_ts + 5, "15sp2-3", "15sp2-1", "reboot"))
+        events.put(watcher.Event(watcher.EVENT_FENCE_SUCCESS, task_ts + 13, "15sp2-2", "15sp2-1", "reboot"))
+        mock_watcher.subscribe.return_value = events
 
         self.task_inst.fence_action_monitor()
 
-        self.task_inst.thread_stop_event.is_set.assert_has_calls([
-            mock.call(),
-            mock.call(),
-            mock.call(),
-            mock.call()
-            ])
-        mock_run.assert_has_calls([
-            mock.call("crm_mon -1|grep -A1 \"Fencing Actions:\""),
-            mock.call("crm_mon -1|grep -A1 \"Fencing Actions:\""),
-            mock.call(config.FENCE_HISTORY.format(node="15sp2-2")),
-            mock.call(config.FENCE_HISTORY.format(node="15sp2-2"))
-            ])
         mock_info.assert_has_calls([
             mock.call("Node \"15sp2-2\" will be fenced by \"15sp2-1\"!"),
             mock.call("Node \"15sp2-2\" was successfully fenced by \"15sp2-1\"")
             ])
         self.task_inst.fence_start_event.set.assert_called_once_with()
         self.task_inst.fence_finish_event.set.assert_called_once_with()
+        mock_watcher.unsubscribe.assert_called_once_with(events)
+
+    @mock.patch('crmsh.crash_test.watcher.watcher')
+    @mock.patch('crmsh.crash_test.task.Task.info')
+    def test_fence_action_monitor_missed_pending(self, mock_info, mock_watcher):
+        import queue
+        from crmsh.crash_test import watcher
+        self.task_inst.thread_stop_event = mock.Mock()
+        self.task_inst.thread_stop_event.is_set.return_value = False
+        self.task_inst.fence_start_event = mock.Mock()
+        self.task_inst.fence_finish_event = mock.Mock()
+        self.task_inst.timestamp = "2021/01/19 16:08:24"
+        task_ts = crmshutils.parse_to_timestamp(self.task_inst.timestamp)
+        events = queue.Queue()
+        events.put(watcher.Event(watcher.EVENT_FENCE_SUCCESS, task_ts + 3, "15sp2-2", "15sp2-1", "reboot"))
+        mock_watcher.subscribe.return_value = events
+
+        self.task_inst.fence_action_monitor()
+
+        self.task_inst.fence_start_event.set.assert_called_once_with()
+        self.task_inst.fence_finish_event.set.assert_called_once_with()
 
 class TestFixSBD(TestCase):
     """
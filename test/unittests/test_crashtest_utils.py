@@ -201,10 +201,73 @@ class TestUtils(TestCase):
         file_handle.flush.assert_called_once_with()
         mock_fsync.assert_called_once_with(file_handle)
 
+    def test_journal_file(self):
+        main.ctx = mock.Mock(jsonfile="/var/lib/crmsh/crash_test/crash_test.json")
+        self.assertEqual(utils.journal_file(), "/var/lib/crmsh/crash_test/crash_test.jsonl")
+
+    @mock.patch('os.fsync')
+    @mock.patch('builtins.open', new_callable=mock.mock_open)
+    def test_journal_append(self, mock_open_file, mock_fsync):
+        main.ctx = mock.Mock(jsonfile="file1", fsync=False)
+        utils.journal_append({"Message": "msg1"})
+        mock_open_file.assert_called_once_with("file1l", "a")
+        mock_open_file().write.assert_called_once_with('{"Message": "msg1"}\n')
+        mock_fsync.assert_not_called()
+
+    @mock.patch('os.fsync')
+    @mock.patch('builtins.open', new_callable=mock.mock_open)
+    def test_journal_append_fsync(self, mock_open_file, mock_fsync):
+        main.ctx = mock.Mock(jsonfile="file1", fsync=True)
+        utils.journal_append({"Message": "msg1"})
+        mock_fsync.assert_called_once_with(mock_open_file())
+
+    def test_journal_compact(self):
+        import json
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmpdir:
+            jsonfile = os.path.join(tmpdir, "crash_test.json")
+            main.ctx = mock.Mock(jsonfile=jsonfile, task_list=[])
+            with open(jsonfile, 'w') as f:
+                json.dump([{"Timestamp": "t1", "Description": "task1", "Messages": ["m1"]}], f)
+            with open(jsonfile + 'l', 'w') as f:
+                f.write(json.dumps({"Timestamp": "t1", "Description": "task1", "Message": "m2"}) + '\n')
+                f.write(json.dumps({"Timestamp": "t2", "Description": "task2", "Message": "m3"}) + '\n')
+                f.write('{"Timestamp": "t2", "Descr')
+
+            utils.journal_compact()
+
+            with open(jsonfile) as f:
+                res = json.load(f)
+            self.assertEqual(res, [
+                {"Timestamp": "t1", "Description": "task1", "Messages": ["m1", "m2"]},
+                {"Timestamp": "t2", "Description": "task2", "Messages": ["m3"]}
+                ])
+            self.assertFalse(os.path.exists(jsonfile + 'l'))
+            self.assertEqual(main.ctx.task_list, [])
+
+    def test_journal_compact_task_list(self):
+        import json
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmpdir:
+            jsonfile = os.path.join(tmpdir, "crash_test.json")
+            main.ctx = mock.Mock(jsonfile=jsonfile)
+            task_list = [{"Timestamp": "t1", "Description": "task1", "Messages": ["m1"]}]
+            with open(jsonfile + 'l', 'w') as f:
+                f.write(json.dumps({"Timestamp": "t1", "Description": "task1", "Message": "m2"}) + '\n')
+
+            utils.journal_compact(task_list)
+
+            with open(jsonfile) as f:
+                res = json.load(f)
+            self.assertEqual(res, [{"Timestamp": "t1", "Description": "task1", "Messages": ["m1", "m2"]}])
+            self.assertEqual(task_list, [{"Timestamp": "t1", "Description": "task1", "Messages": ["m1"]}])
+            self.assertFalse(os.path.exists(jsonfile + 'l'))
+
     @mock.patch('crmsh.crash_test.utils.crmshutils.this_node')
     @mock.patch('crmsh.crash_test.utils.msg_error')
     @mock.patch('crmsh.crash_test.utils.crmshutils.get_stdout_stderr')
     def test_this_node_false(self, mock_run, mock_error, mock_this_node):
+        utils.this_node.cache_clear()
         mock_run.return_value = (1, None, "error data")
         mock_this_node.return_value = "node1"
 
@@ -217,6 +280,7 @@ class TestUtils(TestCase):
     
     @mock.patch('crmsh.crash_test.utils.crmshutils.get_stdout_stderr')
     def test_this_node(self, mock_run):
+        utils.this_node.cache_clear()
         mock_run.return_value = (0, "data", None)
         res = utils.this_node()
         self.assertEqual(res, "data")
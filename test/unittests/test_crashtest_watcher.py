@@ -0,0 +1,97 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+try:
+    from unittest import mock, TestCase
+except ImportError:
+    import mock
+
+from crmsh import xmlutil
+from crmsh.crash_test import watcher
+
+
+CRM_MON_XML = """<pacemaker-result api-version="2.3" request="crm_mon --output-as=xml">
+  <nodes>
+    <node name="15sp2-1" id="1" online="true"/>
+    <node name="15sp2-2" id="2" online="{online}"/>
+  </nodes>
+  <fence_history>
+    {fence}
+  </fence_history>
+</pacemaker-result>"""
+FENCE_PENDING = '<fence_event action="reboot" target="15sp2-2" client="pacemaker-controld.2430" origin="15sp2-1" status="pending"/>'
+FENCE_SUCCESS = '<fence_event action="reboot" target="15sp2-2" client="pacemaker-controld.2430" origin="15sp2-1" status="success" delegate="15sp2-1" completed="2021-01-19 16:08:37 +08:00"/>'
+
+
+class TestClusterWatcher(TestCase):
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+        self.watcher_inst = watcher.ClusterWatcher()
+
+    def test_diff(self):
+        elem = xmlutil.text2elem(CRM_MON_XML.format(online="true", fence=FENCE_PENDING))
+        events = self.watcher_inst.diff(elem)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].type, watcher.EVENT_FENCE_PENDING)
+        self.assertEqual(events[0].node, "15sp2-2")
+        self.assertEqual(events[0].origin, "15sp2-1")
+        self.assertEqual(self.watcher_inst.online_nodes, ["15sp2-1", "15sp2-2"])
+
+        # same snapshot again, nothing new
+        self.assertEqual(self.watcher_inst.diff(elem), [])
+
+        elem = xmlutil.text2elem(CRM_MON_XML.format(online="false", fence=FENCE_SUCCESS))
+        events = self.watcher_inst.diff(elem)
+        self.assertEqual([e.type for e in events], [watcher.EVENT_FENCE_SUCCESS])
+        self.assertEqual(events[0].timestamp, 1611043717)
+        self.assertEqual(self.watcher_inst.online_nodes, ["15sp2-1"])
+
+    @mock.patch('crmsh.crash_test.watcher.crmshutils.get_stdout_stderr')
+    def test_poll(self, mock_run):
+        mock_run.return_value = (0, CRM_MON_XML.format(online="true", fence=FENCE_PENDING), None)
+        q = mock.Mock()
+        self.watcher_inst.subscribers = [q]
+        self.watcher_inst.poll()
+        mock_run.assert_called_once_with(watcher.ClusterWatcher.CMD, no_reg=True)
+        self.assertEqual(q.put.call_args[0][0].type, watcher.EVENT_FENCE_PENDING)
+
+    @mock.patch('crmsh.crash_test.watcher.crmshutils.get_stdout_stderr')
+    def test_poll_error(self, mock_run):
+        mock_run.return_value = (1, "", "error")
+        self.watcher_inst.poll()
+        self.assertIsNone(self.watcher_inst.online_nodes)
+
+    @mock.patch('threading.Thread')
+    def test_subscribe_unsubscribe(self, mock_thread):
+        q1 = self.watcher_inst.subscribe()
+        q2 = self.watcher_inst.subscribe()
+        stop_event = self.watcher_inst.stop_event
+        mock_thread.assert_called_once_with(target=self.watcher_inst._run, args=(stop_event,), daemon=True)
+        mock_thread.return_value.start.assert_called_once_with()
+        self.watcher_inst.unsubscribe(q1)
+        self.assertFalse(stop_event.is_set())
+        mock_thread.return_value.join.assert_not_called()
+        self.watcher_inst.unsubscribe(q2)
+        self.assertTrue(stop_event.is_set())
+        self.assertIsNone(self.watcher_inst.thread)
+        mock_thread.return_value.join.assert_called_once_with(watcher.ClusterWatcher.STOP_TIMEOUT)
+
+        # a new thread never shares the stopped event of the previous one
+        self.watcher_inst.subscribe()
+        self.assertIsNot(self.watcher_inst.stop_event, stop_event)
+        self.assertTrue(stop_event.is_set())
+        self.assertEqual(mock_thread.call_count, 2)
+
+    @mock.patch('crmsh.crash_test.watcher.crmshutils.get_stdout_stderr')
+    def test_poll_stopped(self, mock_run):
+        mock_run.return_value = (0, CRM_MON_XML.format(online="true", fence=FENCE_PENDING), None)
+        q = mock.Mock()
+        self.watcher_inst.subscribers = [q]
+        stop_event = watcher.threading.Event()
+        stop_event.set()
+        self.watcher_inst.poll(stop_event)
+        q.put.assert_not_called()
@@ -164,3 +164,31 @@ colocation nfs-with-rootfs inf: g-nfs c-rfs
                                     'primitive vip IPaddr2\n  params ip=192.168.0.2'),
     }
     assert r == handles.parse(t, v)
+
+
+def test_compiled():
+    t = "a {{foo}}{{#bar}}\n{{bar:x}}\n{{/bar}}\nb"
+    assert handles._compile(t) is handles._compile(t)
+    assert handles._compile(t) == (
+        (handles._LITERAL, "a "),
+        (handles._LOOKUP, ("foo",)),
+        (handles._SECTION, ("bar",), "\n{{bar:x}}\n", True),
+        (handles._NEWLINE,),
+        (handles._LITERAL, "b"))
+    assert "a 1\n2\nb" == handles.parse(t, {'foo': 1, 'bar': {'x': 2}})
+
+
+def test_unrendered_section():
+    t = "{{#foo}}{{#bar}}{{/foo}}ok"
+    assert "ok" == handles.parse(t, {})
+    try:
+        handles.parse(t, {'foo': True})
+        assert False
+    except ValueError as e:
+        assert "Unclosed conditional" in str(e)
+
+
+def test_many_items():
+    t = "{{#nodes}}\nnode {{nodes:name}}\n{{/nodes}}\n"
+    v = {'nodes': [{'name': 'n%d' % i} for i in range(2000)]}
+    assert handles.parse(t, v) == ''.join('\nnode n%d\n' % i for i in range(2000))
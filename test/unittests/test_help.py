@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from crmsh import help as crmhelp
+
+
+HELP_TEXT = """= Title
+
+[[topics_Intro,Introduction]]
+=== Introduction
+
+Some text, see <<cmdhelp_node_show,show nodes>>.
+
+[[cmdhelp_node,Node management]]
+=== `node` - Node management
+
+Node commands.
+
+[[cmdhelp_node_show,Show node]]
+==== `show`
+
+Show a node.
+...............
+show [<node>]
+...............
+"""
+
+
+class TestHelpIndex(unittest.TestCase):
+    """
+    Unitary tests for the help index
+    """
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.helpfile = os.path.join(self.tmpdir.name, "crm.8.adoc")
+        with open(self.helpfile, "w") as f:
+            f.write(HELP_TEXT)
+        self.index_patcher = mock.patch('crmsh.help.HELP_INDEX', os.path.join(self.tmpdir.name, "help.index"))
+        self.index_patcher.start()
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+        self.index_patcher.stop()
+        self.tmpdir.cleanup()
+
+    def test_parse_help_file(self):
+        index = crmhelp._parse_help_file(self.helpfile)
+        self.assertEqual([(e['type'], e['level'], e['name'], e['short']) for e in index], [
+            ('topic', '', 'Intro', 'Introduction'),
+            ('level', '', 'node', 'Node management'),
+            ('command', 'node', 'show', 'Show node')
+            ])
+        self.assertEqual(crmhelp._read_long_help(self.helpfile, index[0]['offset'], index[0]['length']),
+                         "\nSome text, see show nodes.")
+        self.assertEqual(crmhelp._read_long_help(self.helpfile, index[2]['offset'], index[2]['length']),
+                         "\nShow a node.\n...............\nshow [<node>]\n...............")
+
+    @mock.patch('crmsh.help._parse_help_file')
+    def test_load_help_index_cached(self, mock_parse):
+        mock_parse.return_value = [{'type': 'topic'}]
+        self.assertEqual(crmhelp._load_help_index(self.helpfile), [{'type': 'topic'}])
+        self.assertEqual(crmhelp._load_help_index(self.helpfile), [{'type': 'topic'}])
+        mock_parse.assert_called_once_with(self.helpfile)
+
+        # help file changed
+        os.utime(self.helpfile, (0, 0))
+        crmhelp._load_help_index(self.helpfile)
+        self.assertEqual(mock_parse.call_count, 2)
+
+    def test_help_entry_lazy_long(self):
+        loader = mock.Mock(return_value="long help")
+        entry = crmhelp.HelpEntry("short", long_loader=loader)
+        entry.append_long_help("\nCommands:")
+        loader.assert_not_called()
+        self.assertEqual(entry.long, "long help\nCommands:")
+        self.assertEqual(entry.long, "long help\nCommands:")
+        loader.assert_called_once_with()
+        entry.long = "new"
+        self.assertEqual(str(entry), "Short\nnew")
@@ -0,0 +1,270 @@
+import bz2
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from crmsh import history, logparser
+
+
+class TestSimulate(unittest.TestCase):
+    """
+    Unitary tests for the simulation cache in crmsh.history
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.patches = [
+            mock.patch('crmsh.utils.ptest_version', return_value="2.1.5"),
+            mock.patch('crmsh.options.regression_tests', False),
+        ]
+        for p in self.patches:
+            p.start()
+        self.simulate = mock.patch('crmsh.utils.simulate', return_value=(0, "output", None)).start()
+        self.patches.append(self.simulate)
+        self.pe_files = []
+        for n in range(4):
+            self.pe_files.append(self._pe_file(n, "<cib epoch=\"%d\"/>" % (n)))
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def _pe_file(self, n, cib):
+        pe_file = os.path.join(self.tmpdir, "pe-input-%d.bz2" % (n))
+        with open(pe_file, 'wb') as f:
+            f.write(bz2.compress(cib.encode('utf-8')))
+        return pe_file
+
+    def _report(self):
+        report = history.Report()
+        report.loc = self.tmpdir
+        return report
+
+    def test_cached(self):
+        report = self._report()
+        opts = (False, False, False, False, 'vv')
+        self.assertEqual(report.simulate(self.pe_files[0], *opts), (0, "output", None))
+        self.assertEqual(report.simulate(self.pe_files[0], *opts), (0, "output", None))
+        self.simulate.assert_called_once_with(b'<cib epoch="0"/>', *opts)
+        # shared across invocations
+        self.assertEqual(self._report().simulate(self.pe_files[0], *opts), (0, "output", None))
+        self.assertEqual(self.simulate.call_count, 1)
+
+    def test_key(self):
+        report = self._report()
+        report.simulate(self.pe_files[0], False, False, False, False, 'vv')
+        report.simulate(self.pe_files[0], False, True, False, False, 'vv')
+        report.simulate(self.pe_files[1], False, False, False, False, 'vv')
+        self._pe_file(0, "<cib epoch=\"5\"/>")
+        report.simulate(self.pe_files[0], False, False, False, False, 'vv')
+        with mock.patch('crmsh.utils.ptest_version', return_value="2.1.6"):
+            report.simulate(self.pe_files[0], False, False, False, False, 'vv')
+        self.assertEqual(self.simulate.call_count, 5)
+
+    @mock.patch('crmsh.history.logger')
+    def test_missing(self, mock_logger):
+        self.assertIsNone(self._report().simulate(os.path.join(self.tmpdir, "nope.bz2"),
+                                                  False, False, False, False, 'vv'))
+        self.simulate.assert_not_called()
+        mock_logger.error.assert_called_once_with("open: %s", mock.ANY)
+
+    def test_prerender(self):
+        report = self._report()
+        with mock.patch.object(report, 'pelist', return_value=self.pe_files):
+            report.prerender_transitions('vv')
+            report.prerender_transitions('vv')
+        report._prerender_q.join()
+        self.assertEqual(self.simulate.call_count, 4)
+        for pe_file in self.pe_files:
+            report.simulate(pe_file, False, False, False, False, 'vv')
+        self.assertEqual(self.simulate.call_count, 4)
+
+
+class TestPEIndex(unittest.TestCase):
+    """
+    Unitary tests for the PE input index in crmsh.logparser
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.tmpdir, "node1", "pengine"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _pe_file(self, n, epoch):
+        pe_file = os.path.join(self.tmpdir, "node1", "pengine", "pe-input-%d.bz2" % (n))
+        cib = '<?xml version="1.0"?>\n<cib epoch="%d" num_updates="3" admin_epoch="0" update-client="cibadmin">\n  <configuration/>\n</cib>\n' % (epoch)
+        with open(pe_file, 'wb') as f:
+            f.write(bz2.compress(cib.encode('utf-8')))
+        return pe_file
+
+    def _transition(self, n, epoch, start_ts, end_ts):
+        self._pe_file(n, epoch)
+        t = logparser.Transition(self.tmpdir, "node1", start_ts, n, "pe-input-%d.bz2" % (n), n)
+        t.end_ts = end_ts
+        t.end_actions = {}
+        return t
+
+    def test_root_attributes(self):
+        pe_file = self._pe_file(1, 12)
+        self.assertEqual(logparser.pe_root_attributes(pe_file),
+                         {"epoch": "12", "num_updates": "3", "admin_epoch": "0", "update-client": "cibadmin"})
+        self.assertIsNone(logparser.pe_root_attributes(os.path.join(self.tmpdir, "nope.bz2")))
+
+    def test_index(self):
+        pe_files = [self._pe_file(n, n) for n in range(3)]
+        peindex = logparser.PEIndex(self.tmpdir)
+        peindex.update(pe_files)
+        with mock.patch('crmsh.logparser.pe_root_attributes') as mock_attrs:
+            peindex = logparser.PEIndex(self.tmpdir)
+            peindex.update(pe_files)
+            self.assertEqual(peindex.get_attributes(pe_files[2], ("epoch", "update-user"), ("0", "no-user")),
+                             ["2", "no-user"])
+            mock_attrs.assert_not_called()
+        os.utime(self._pe_file(2, 5), ns=(0, 0))
+        self.assertEqual(logparser.PEIndex(self.tmpdir).get(pe_files[2])["epoch"], "5")
+
+    def test_transitions(self):
+        transitions = [self._transition(1, 1, 100, 110),
+                       self._transition(2, 1, 200, 210),
+                       self._transition(3, 2, 300, None)]
+        parser = logparser.LogParser(self.tmpdir, None, [], 0)
+        parser.transitions = transitions
+        parser._index_transitions()
+        self.assertTrue(transitions[1].empty(transitions[0], parser.peindex))
+        self.assertFalse(transitions[2].empty(transitions[1], parser.peindex))
+        parser.set_timeframe(150, 250)
+        self.assertEqual(list(parser.get_transitions()), transitions[1:2])
+        self.assertIs(parser.find_transition(str(transitions[1])), transitions[1])
+        self.assertIsNone(parser.find_transition(str(transitions[0])))
+        parser.set_timeframe(150, None)
+        self.assertEqual(list(parser.get_transitions()), transitions[1:])
+
+    def test_transitions_wrapped(self):
+        transitions = [self._transition(1, 1, 100, 110),
+                       self._transition(2, 1, 200, 210),
+                       self._transition(1, 2, 300, 310),
+                       self._transition(2, 2, 400, 410)]
+        parser = logparser.LogParser(self.tmpdir, None, [], 0)
+        parser.transitions = transitions
+        parser._index_transitions()
+        self.assertIs(parser.find_transition(str(transitions[0])), transitions[0])
+        parser.set_timeframe(250, None)
+        self.assertIs(parser.find_transition(str(transitions[0])), transitions[2])
+        self.assertIs(parser.find_transition(str(transitions[1])), transitions[3])
+        parser.set_timeframe(None, 250)
+        self.assertIs(parser.find_transition(str(transitions[3])), transitions[1])
+
+
+class TestUnpackReport(unittest.TestCase):
+    """
+    Unitary tests for the report tarball extraction in crmsh.history
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.pe_data = bz2.compress(b'<cib epoch="7" admin_epoch="0">\n</cib>\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _tarball(self, name, top, extra=()):
+        tarball = os.path.join(self.tmpdir, name)
+        with tarfile.open(tarball, "w:bz2") as tar:
+            for path, data in (("%s/description.txt" % (top), b"report\n"),
+                               ("%s/node1/ha-log.txt" % (top), b"log\n"),
+                               ("%s/node1/pengine/pe-input-1.bz2" % (top), self.pe_data)) + tuple(extra):
+                info = tarfile.TarInfo(path)
+                info.size = len(data)
+                info.mtime = 1000000
+                tar.addfile(info, io.BytesIO(data))
+        return tarball
+
+    def test_unpack(self):
+        report = history.Report()
+        report.source = self._tarball("report.tar.bz2", "report")
+        loc = report.unpack_report(report.source)
+        self.assertEqual(loc, os.path.join(self.tmpdir, "report"))
+        self.assertTrue(os.path.isfile(os.path.join(loc, "node1", "ha-log.txt")))
+        pe_file = os.path.join(loc, "node1", "pengine", "pe-input-1.bz2")
+        self.assertFalse(os.path.exists(pe_file))
+
+        peindex = logparser.PEIndex(loc)
+        self.assertTrue(peindex.exists(pe_file))
+        self.assertEqual(peindex.get(pe_file)["epoch"], "7")
+        self.assertFalse(os.path.exists(pe_file))
+        peindex.extract(pe_file)
+        with open(pe_file, "rb") as f:
+            self.assertEqual(f.read(), self.pe_data)
+        self.assertEqual(os.stat(pe_file).st_mtime, 1000000)
+
+    def test_unpack_top_dir(self):
+        report = history.Report()
+        report.source = self._tarball("other.tar.bz2", "report")
+        self.assertEqual(report.unpack_report(report.source), os.path.join(self.tmpdir, "report"))
+
+    def test_unpack_broken(self):
+        report = history.Report()
+        report.source = os.path.join(self.tmpdir, "broken.tar.bz2")
+        with open(report.source, "wb") as f:
+            f.write(b"garbage")
+        with mock.patch('crmsh.history.logger') as mock_logger:
+            self.assertIsNone(report.unpack_report(report.source))
+        mock_logger.error.assert_called_once()
+
+    def test_unpack_packed_again(self):
+        pe_data2 = bz2.compress(b'<cib epoch="8" admin_epoch="0">\n</cib>\n')
+        report = history.Report()
+        report.source = self._tarball("report.tar.bz2", "report",
+                                      (("report/node1/pengine/pe-input-2.bz2", pe_data2),))
+        loc = report.unpack_report(report.source)
+        pe_files = [os.path.join(loc, "node1", "pengine", "pe-input-%d.bz2" % (n)) for n in (1, 2)]
+        logparser.PEIndex(loc).extract(pe_files[0])
+        self.assertTrue(os.path.isfile(pe_files[0]))
+
+        # pack the report directory again, the PE index and pack last
+        os.remove(report.source)
+        with tarfile.open(report.source, "w:bz2") as tar:
+            for name in ("description.txt", "node1", "__peinputs.pack", "__peindex.json"):
+                tar.add(os.path.join(loc, name), os.path.join("report", name))
+        shutil.rmtree(loc)
+        self.assertEqual(report.unpack_report(report.source), loc)
+
+        peindex = logparser.PEIndex(loc)
+        for pe_file, data, epoch in zip(pe_files, (self.pe_data, pe_data2), ("7", "8")):
+            self.assertTrue(peindex.exists(pe_file))
+            self.assertEqual(peindex.get(pe_file)["epoch"], epoch)
+            peindex.extract(pe_file)
+            with open(pe_file, "rb") as f:
+                self.assertEqual(f.read(), data)
+
+    def test_unpack_outside(self):
+        report = history.Report()
+        report.source = self._tarball("report.tar.bz2", "report", (("report/../../evil", b"x"),))
+        with mock.patch('tarfile.tar_filter', None), mock.patch('crmsh.history.logger') as mock_logger:
+            self.assertIsNone(report.unpack_report(report.source))
+        mock_logger.error.assert_called_once()
+        self.assertFalse(os.path.exists(os.path.join(os.path.dirname(self.tmpdir), "evil")))
+
+    def test_unpack_symlink_outside(self):
+        report = history.Report()
+        report.source = os.path.join(self.tmpdir, "report.tar.bz2")
+        with tarfile.open(report.source, "w:bz2") as tar:
+            info = tarfile.TarInfo("report/link")
+            info.type = tarfile.SYMTYPE
+            info.linkname = "../../etc"
+            tar.addfile(info)
+        with mock.patch('tarfile.tar_filter', None), mock.patch('crmsh.history.logger') as mock_logger:
+            self.assertIsNone(report.unpack_report(report.source))
+        mock_logger.error.assert_called_once()
+        self.assertFalse(os.path.lexists(os.path.join(self.tmpdir, "report", "link")))
@@ -17,7 +17,7 @@ try:
 except ImportError:
     import mock
 
-from crmsh import lock, config
+from crmsh import lock, config, ssh_pool
 
 
 class TestLock(unittest.TestCase):
@@ -118,7 +118,9 @@ class TestRemoteLock(unittest.TestCase):
         """
         Test setUp.
         """
-        self.lock_inst = lock.RemoteLock("node1")
+        with mock.patch('crmsh.utils.this_node', return_value="node0"), \
+                mock.patch('os.getpid', return_value=1234):
+            self.lock_inst = lock.RemoteLock("node1")
 
     def tearDown(self):
         """
@@ -137,14 +139,14 @@ class TestRemoteLock(unittest.TestCase):
         with self.assertRaises(lock.SSHError) as err:
             self.lock_inst._run("cmd")
         self.assertEqual("ssh error", str(err.exception))
-        mock_run.assert_called_once_with("ssh -o ConnectTimeout=10 -o StrictHostKeyChecking=no root@node1 \"cmd\"")
+        mock_run.assert_called_once_with("ssh -o ConnectTimeout=10 {} root@node1 \"cmd\"".format(ssh_pool.ssh_option()))
 
     @mock.patch('crmsh.utils.get_stdout_stderr')
     def test_run(self, mock_run):
         mock_run.return_value = (0, None, None)
         res = self.lock_inst._run("cmd")
         self.assertEqual(res, mock_run.return_value)
-        mock_run.assert_called_once_with("ssh -o ConnectTimeout=10 -o StrictHostKeyChecking=no root@node1 \"cmd\"")
+        mock_run.assert_called_once_with("ssh -o ConnectTimeout=10 {} root@node1 \"cmd\"".format(ssh_pool.ssh_option()))
 
     def test_lock_timeout_error_format(self):
         config.core.lock_timeout = "pwd"
@@ -162,30 +164,86 @@ class TestRemoteLock(unittest.TestCase):
         config.core.lock_timeout = "130"
         self.assertEqual(self.lock_inst.lock_timeout, 130)
 
+    def test_new_lease(self):
+        self.assertEqual(self.lock_inst._new_lease(), "node0 1234 \\$((\\$(date +%s) + 60))")
+
+    def test_parse_lease(self):
+        self.assertEqual(lock.RemoteLock._parse_lease("node2 4321 10060\n"), ("node2", "4321", 10060))
+        self.assertIsNone(lock.RemoteLock._parse_lease(""))
+        self.assertIsNone(lock.RemoteLock._parse_lease(None))
+        self.assertIsNone(lock.RemoteLock._parse_lease("node2 4321 xxx"))
+
+    @mock.patch('crmsh.lock.RemoteLock._new_lease')
     @mock.patch('crmsh.lock.RemoteLock._run')
-    def test_get_online_nodelist_error(self, mock_run):
-        mock_run.return_value = (1, None, "error data")
-        with self.assertRaises(ValueError) as err:
-            self.lock_inst._get_online_nodelist()
-        self.assertEqual("error data", str(err.exception))
-        mock_run.assert_called_once_with("crm_node -l")
+    def test_create_lock_dir(self, mock_run, mock_lease):
+        mock_lease.return_value = "node0 1234 10060"
+        mock_run.return_value = (0, "", None)
+        self.assertTrue(self.lock_inst._create_lock_dir())
+        self.assertTrue(self.lock_inst.lock_owner)
+        mock_run.assert_called_once_with("if mkdir {dir} 2>/dev/null; then echo node0 1234 10060 > {dir}/lease; else cat {dir}/lease; date +%s; exit 1; fi".format(dir=lock.Lock.LOCK_DIR))
+
+    @mock.patch('crmsh.lock.RemoteLock._new_lease')
+    @mock.patch('crmsh.lock.RemoteLock._run')
+    def test_create_lock_dir_false(self, mock_run, mock_lease):
+        mock_lease.return_value = "node0 1234 10060"
+        mock_run.return_value = (1, "node2 4321 10030\n10040", None)
+        self.assertFalse(self.lock_inst._create_lock_dir())
+        self.assertFalse(self.lock_inst.lock_owner)
+        self.assertEqual(self.lock_inst.current_lease, ("node2", "4321", 10030))
+        self.assertEqual(self.lock_inst.remote_time, 10040)
 
     @mock.patch('crmsh.lock.RemoteLock._run')
-    def test_get_online_nodelist(self, mock_run):
-        output = """
-        1084783297 15sp2-1 member
-        1084783193 15sp2-2 lost
-        1084783331 15sp2-3 member
-        """
-        mock_run.return_value = (0, output, None)
-        res = self.lock_inst._get_online_nodelist()
-        self.assertEqual(res, ["15sp2-1", "15sp2-3"])
-        mock_run.assert_called_once_with("crm_node -l")
+    def test_create_lock_dir_no_lease(self, mock_run):
+        mock_run.return_value = (1, "10040", None)
+        self.assertFalse(self.lock_inst._create_lock_dir())
+        self.assertIsNone(self.lock_inst.current_lease)
+        self.assertEqual(self.lock_inst.remote_time, 10040)
 
-    @mock.patch('crmsh.lock.Lock._create_lock_dir')
+    @mock.patch('logging.Logger.warning')
+    @mock.patch('crmsh.lock.RemoteLock._run')
+    def test_takeover_stale_lease(self, mock_run, mock_warn):
+        mock_run.return_value = (0, "", None)
+        self.assertTrue(self.lock_inst._takeover_stale_lease(("node2", "4321", 10030)))
+        mock_run.assert_called_once_with("mv -T {dir} {dir}.stale.node0.1234 2>/dev/null || exit 1; "
+                "if grep -qxF 'node2 4321 10030' {dir}.stale.node0.1234/lease; then rm -rf {dir}.stale.node0.1234; "
+                "else mv -T {dir}.stale.node0.1234 {dir} 2>/dev/null || rm -rf {dir}.stale.node0.1234; exit 1; fi".format(dir=lock.Lock.LOCK_DIR))
+        mock_warn.assert_called_once_with("Took over the expired lock of %s(pid %s) on %s", "node2", "4321", "node1")
+
+    @mock.patch('crmsh.lock.RemoteLock._run')
+    def test_takeover_stale_lease_false(self, mock_run):
+        mock_run.return_value = (1, "", None)
+        self.assertFalse(self.lock_inst._takeover_stale_lease(("node2", "4321", 10030)))
+
+    @mock.patch('crmsh.lock.RemoteLock._stop_renew_lease')
+    @mock.patch('crmsh.lock.RemoteLock._run')
+    def test_unlock(self, mock_run, mock_stop):
+        self.lock_inst.lock_owner = True
+        self.lock_inst._unlock()
+        mock_stop.assert_called_once_with()
+        mock_run.assert_called_once_with("grep -q '^node0 1234 ' {dir}/lease && rm -rf {dir}".format(dir=lock.Lock.LOCK_DIR))
+
+    @mock.patch('crmsh.lock.RemoteLock._run')
+    def test_unlock_not_owner(self, mock_run):
+        self.lock_inst._unlock()
+        mock_run.assert_not_called()
+
+    @mock.patch('crmsh.lock.RemoteLock._new_lease')
+    @mock.patch('crmsh.lock.RemoteLock._run')
+    def test_renew_lease(self, mock_run, mock_lease):
+        mock_lease.return_value = "node0 1234 10060"
+        self.lock_inst.renew_stop_event = mock.Mock()
+        self.lock_inst.renew_stop_event.wait.side_effect = [False, False, True]
+        mock_run.side_effect = [(0, "", None), lock.SSHError("ssh error")]
+        self.lock_inst._renew_lease()
+        self.lock_inst.renew_stop_event.wait.assert_called_with(20)
+        mock_run.assert_called_with("grep -q '^node0 1234 ' {dir}/lease && echo node0 1234 10060 > {dir}/lease".format(dir=lock.Lock.LOCK_DIR))
+        self.assertEqual(mock_run.call_count, 2)
+
+    @mock.patch('crmsh.lock.RemoteLock._start_renew_lease')
+    @mock.patch('crmsh.lock.RemoteLock._create_lock_dir')
     @mock.patch('crmsh.lock.RemoteLock.lock_timeout', new_callable=mock.PropertyMock)
     @mock.patch('time.time')
-    def test_lock_or_wait_break(self, mock_time, mock_time_out, mock_create):
+    def test_lock_or_wait_break(self, mock_time, mock_time_out, mock_create, mock_renew):
         mock_time.return_value = 10000
         mock_time_out.return_value = 120
         mock_create.return_value = True
@@ -194,19 +252,20 @@ class TestRemoteLock(unittest.TestCase):
 
         mock_time.assert_called_once_with()
         mock_time_out.assert_called_once_with()
+        mock_renew.assert_called_once_with()
 
+    @mock.patch('random.uniform')
     @mock.patch('time.sleep')
     @mock.patch('logging.Logger.warning')
-    @mock.patch('crmsh.lock.RemoteLock._get_online_nodelist')
-    @mock.patch('crmsh.lock.Lock._create_lock_dir')
+    @mock.patch('crmsh.lock.RemoteLock._create_lock_dir')
     @mock.patch('crmsh.lock.RemoteLock.lock_timeout', new_callable=mock.PropertyMock)
     @mock.patch('time.time')
     def test_lock_or_wait_timed_out(self, mock_time, mock_time_out, mock_create,
-            mock_get_nodelist, mock_warn, mock_sleep):
+            mock_warn, mock_sleep, mock_uniform):
         mock_time.side_effect = [10000, 10121]
         mock_time_out.return_value = 120
         mock_create.return_value = False
-        mock_get_nodelist.return_value = ["node2"]
+        mock_uniform.return_value = 0.4
 
         with self.assertRaises(lock.ClaimLockError) as err:
             self.lock_inst._lock_or_wait()
@@ -215,33 +274,70 @@ class TestRemoteLock(unittest.TestCase):
         mock_time.assert_has_calls([ mock.call(), mock.call()])
         mock_time_out.assert_has_calls([mock.call(), mock.call(), mock.call()])
         mock_create.assert_called_once_with()
-        mock_get_nodelist.assert_called_once_with()
         mock_warn.assert_called_once_with('Might have unfinished process on other nodes, wait %ss...', 120)
-        mock_sleep.assert_called_once_with(10)
+        mock_uniform.assert_called_once_with(0.25, 0.5)
+        mock_sleep.assert_called_once_with(0.4)
 
+    @mock.patch('crmsh.lock.RemoteLock._start_renew_lease')
+    @mock.patch('crmsh.lock.RemoteLock._takeover_stale_lease')
+    @mock.patch('random.uniform')
     @mock.patch('time.sleep')
     @mock.patch('logging.Logger.warning')
-    @mock.patch('crmsh.lock.RemoteLock._get_online_nodelist')
-    @mock.patch('crmsh.lock.Lock._create_lock_dir')
+    @mock.patch('crmsh.lock.RemoteLock._create_lock_dir')
     @mock.patch('crmsh.lock.RemoteLock.lock_timeout', new_callable=mock.PropertyMock)
     @mock.patch('time.time')
     def test_lock_or_wait_again(self, mock_time, mock_time_out, mock_create,
-            mock_get_nodelist, mock_warn, mock_sleep):
-        mock_time.side_effect = [10000, 10010, 10020]
-        mock_time_out.side_effect = [120, 120, 120]
-        mock_create.side_effect = [False, False, True]
-        mock_get_nodelist.side_effect = [["node1"], ["node1", "node2"]]
+            mock_warn, mock_sleep, mock_uniform, mock_takeover, mock_renew):
+        leases = [("node2", "1", 10060), ("node3", "2", 10150)]
+
+        def create():
+            self.lock_inst.current_lease = leases.pop(0) if leases else None
+            self.lock_inst.remote_time = 10030
+            return self.lock_inst.current_lease is None
+
+        mock_time.side_effect = [10000, 10090, 10200]
+        mock_time_out.return_value = 120
+        mock_create.side_effect = create
+        mock_uniform.side_effect = lambda a, b: b
 
         self.lock_inst._lock_or_wait()
 
-        mock_time.assert_has_calls([mock.call(), mock.call(), mock.call()])
-        mock_time_out.assert_has_calls([mock.call(), mock.call(), mock.call()])
         mock_create.assert_has_calls([mock.call(), mock.call(), mock.call()])
-        mock_get_nodelist.assert_has_calls([mock.call(), mock.call()])
+        mock_takeover.assert_not_called()
         mock_warn.assert_called_once_with('Might have unfinished process on other nodes, wait %ss...', 120)
-        mock_sleep.assert_has_calls([mock.call(10), mock.call(10)])
+        mock_sleep.assert_has_calls([mock.call(0.5), mock.call(1)])
+        mock_renew.assert_called_once_with()
 
-    @mock.patch('crmsh.lock.Lock._unlock')
+    @mock.patch('crmsh.lock.RemoteLock._start_renew_lease')
+    @mock.patch('crmsh.lock.RemoteLock._takeover_stale_lease')
+    @mock.patch('time.sleep')
+    @mock.patch('logging.Logger.warning')
+    @mock.patch('crmsh.lock.RemoteLock._create_lock_dir')
+    @mock.patch('crmsh.lock.RemoteLock.lock_timeout', new_callable=mock.PropertyMock)
+    @mock.patch('time.time')
+    def test_lock_or_wait_takeover(self, mock_time, mock_time_out, mock_create,
+            mock_warn, mock_sleep, mock_takeover, mock_renew):
+        leases = [("node2", "1", 10010)]
+
+        def create():
+            self.lock_inst.current_lease = leases.pop(0) if leases else None
+            # the clock of the remote node is ahead of the local one
+            self.lock_inst.remote_time = 10020
+            return self.lock_inst.current_lease is None
+
+        mock_time.return_value = 10000
+        mock_time_out.return_value = 120
+        mock_create.side_effect = create
+        mock_takeover.return_value = True
+
+        self.lock_inst._lock_or_wait()
+
+        mock_takeover.assert_called_once_with(("node2", "1", 10010))
+        mock_sleep.assert_not_called()
+        mock_warn.assert_not_called()
+        mock_renew.assert_called_once_with()
+
+    @mock.patch('crmsh.lock.RemoteLock._unlock')
     @mock.patch('crmsh.lock.RemoteLock._lock_or_wait')
     def test_lock_exception(self, mock_lock, mock_unlock):
         mock_lock.side_effect = lock.ClaimLockError
@@ -253,7 +349,7 @@ class TestRemoteLock(unittest.TestCase):
         mock_lock.assert_called_once_with()
         mock_unlock.assert_called_once_with()
 
-    @mock.patch('crmsh.lock.Lock._unlock')
+    @mock.patch('crmsh.lock.RemoteLock._unlock')
     @mock.patch('crmsh.lock.RemoteLock._lock_or_wait')
     def test_lock(self, mock_lock, mock_unlock):
         with self.lock_inst.lock():
@@ -0,0 +1,63 @@
+import pytest
+
+from crmsh import minieval
+
+ENV = {'a': 1, 'b': 'x', 'c': {'d': [1, 2, 3], 'e': 's'}, 't': True}
+
+
+def _slow_minieval(expr, env):
+    """Parse for every evaluation, as before the expressions were compiled."""
+    minieval.compile_expr.cache_clear()
+    return minieval.minieval(expr, env)
+
+
+@pytest.mark.parametrize("expr,value", [
+    ('a == 1', True),
+    ('b != "x" or a', 1),
+    ('c.d[1:2]', [2]),
+    ('c.d[::2]', [1, 3]),
+    ('c["e"]', 's'),
+    ('a if t else b', 1),
+    ('1 < a <= 2', False),
+    ('a in c.d', True),
+    ('True or zz', True),
+])
+def test_evaluate(expr, value):
+    assert minieval.minieval(expr, ENV) == value
+    assert minieval.minieval(" %s " % (expr), ENV) == value
+
+
+@pytest.mark.parametrize("expr,exc", [
+    ('c.__class__', minieval.FeatureNotAvailable),
+    ('b.format', minieval.FeatureNotAvailable),
+    ('(lambda: 1)', minieval.FeatureNotAvailable),
+    ('t and f(1)', minieval.FeatureNotAvailable),
+    ('c.nope', minieval.AttributeDoesNotExist),
+    ('"%s"' % ('x' * (minieval.MAX_STRING_LENGTH + 1)), minieval.IterableTooLong),
+])
+def test_disallowed(expr, exc):
+    # raised on every evaluation, not only when compiling
+    for _ in range(2):
+        with pytest.raises(exc):
+            minieval.minieval(expr, ENV)
+
+
+def test_disallowed_not_evaluated():
+    assert minieval.minieval('t or f(1)', ENV) is True
+    assert minieval.minieval('b if t else c.__class__', ENV) == 'x'
+
+
+def test_compiled_once():
+    minieval.compile_expr.cache_clear()
+    expr = 'a == 1 and b == "y"'
+    for env in ({'a': 1, 'b': 'y'}, {'a': 1, 'b': 'z'}, {'a': 2, 'b': 'y'}):
+        assert minieval.minieval(expr, env) == (env['a'] == 1 and env['b'] == 'y')
+    info = minieval.compile_expr.cache_info()
+    assert (info.misses, info.hits) == (1, 2)
+
+
+def test_compiled_matches_parsed():
+    expr = 'a == 1 and b != "y" or c.d[0] > 0'
+    assert _slow_minieval(expr, ENV) is True
+    for _ in range(3):
+        assert minieval.minieval(expr, ENV) is True
@@ -3,6 +3,11 @@ from __future__ import unicode_literals
 # See COPYING for license information.
 
 
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
 from crmsh import cibconfig
 
 factory = cibconfig.cib_factory
@@ -38,3 +43,110 @@ def test_show():
     s = setobj.repr_nopretty()
     sp = s.splitlines()
     assert_in("node ha-one", sp[0:3])
+
+
+def _bulk_config(count):
+    lines = ['primitive bulk-p%d Dummy params state=/run/bulk-p%d op monitor interval=10s' % (i, i)
+             for i in range(count)]
+    lines += ['location bulk-l%d bulk-p%d 100: ha-one' % (i, i) for i in range(0, count, 2)]
+    lines += ['group bulk-g%d bulk-p%d bulk-p%d' % (i, i, i + 1) for i in range(0, count, 2)]
+    lines += ['colocation bulk-c%d inf: bulk-g%d bulk-g%d' % (i, i, i + 2) for i in range(0, count - 2, 2)]
+    return lines
+
+
+@mock.patch('crmsh.cibconfig.CibPrimitive.normalize_parameters')
+@mock.patch("crmsh.log.LoggerUtils.line_number")
+@mock.patch("crmsh.log.LoggerUtils.incr_lineno")
+def test_bulk_load(mock_incr, mock_line_num, mock_normalize):
+    count = 200
+    setobj = cibconfig.mkset_obj()
+    assert setobj.save(iter(line + '\n' for line in _bulk_config(count)), remove=False, method='update')
+    assert factory._id_index is None
+    try:
+        for i in range(0, count, 2):
+            g = factory.find_object('bulk-g%d' % i)
+            assert [c.obj_id for c in g.children] == ['bulk-p%d' % i, 'bulk-p%d' % (i + 1)]
+            assert factory.find_object('bulk-l%d' % i).node.get('rsc') == 'bulk-p%d' % i
+        assert len(factory.find_objects('bulk-*')) == count * 2 + count // 2 - 1
+    finally:
+        factory.delete(*['bulk-g%d' % i for i in range(0, count, 2)])
+        factory.delete(*['bulk-p%d' % i for i in range(count)])
+    assert factory.find_objects('bulk-*') == []
+
+
+def test_find_objects_index():
+    ids = [obj.obj_id for obj in factory.cib_objects] + ['ha-two', 'no-such-object', 'ha-*']
+    scanned = [factory.find_objects(i) for i in ids]
+    factory._build_id_index()
+    try:
+        assert [factory.find_objects(i) for i in ids] == scanned
+    finally:
+        factory._drop_id_index()
+
+
+def test_repr_cli_cache():
+    obj = factory.find_object('ha-one')
+    s = obj.repr_cli(format_mode=-1)
+    with mock.patch.object(obj, '_repr_cli_head') as mock_head:
+        assert obj.repr_cli(format_mode=-1) == s
+        mock_head.assert_not_called()
+        obj.set_updated()
+        mock_head.return_value = 'node ha-one'
+        assert obj.repr_cli(format_mode=-1) == 'node ha-one'
+        mock_head.assert_called_once_with(-1)
+    obj.set_updated()
+    assert obj.repr_cli(format_mode=-1) == s
+    with mock.patch.object(obj, '_render_cli', return_value='node ha-one') as mock_render:
+        assert obj.repr_cli(format_mode=-1) == s
+        obj.node_changed()
+        assert obj.repr_cli(format_mode=-1) == 'node ha-one'
+        obj.node = obj.node
+        assert obj.repr_cli(format_mode=-1) == 'node ha-one'
+        assert mock_render.call_count == 2
+    obj.node_changed()
+    assert obj.repr_cli(format_mode=-1) == s
+
+
+def test_fencing_topology_cli_deps():
+    with mock.patch.object(factory, 'node_id_list', return_value=['ha-one', 'ha-two']):
+        assert cibconfig.CibFencingOrder._repr_cli_deps(None) == ('ha-one', 'ha-two')
+
+
+@mock.patch('crmsh.cibconfig.CibPrimitive.normalize_parameters')
+@mock.patch("crmsh.log.LoggerUtils.line_number")
+@mock.patch("crmsh.log.LoggerUtils.incr_lineno")
+def test_remove_tagged(mock_incr, mock_line_num, mock_normalize):
+    setobj = cibconfig.mkset_obj()
+    config = ['primitive tag-r%d Dummy' % i for i in range(3)] + ['tag tag-t0 tag-r0 tag-r1 tag-r2']
+    assert setobj.save(iter(line + '\n' for line in config), remove=False, method='update')
+    try:
+        tag = factory.find_object('tag-t0')
+        assert tag.repr_cli(format_mode=-1) == 'tag tag-t0 tag-r0 tag-r1 tag-r2'
+        factory.delete('tag-r0')
+        assert tag.repr_cli(format_mode=-1) == 'tag tag-t0 tag-r1 tag-r2'
+    finally:
+        factory.delete('tag-r1', 'tag-r2')
+    assert factory.find_objects('tag-*') == []
+
+
+@mock.patch('crmsh.cibconfig.CibPrimitive.normalize_parameters')
+@mock.patch("crmsh.log.LoggerUtils.line_number")
+@mock.patch("crmsh.log.LoggerUtils.incr_lineno")
+def test_save_unchanged(mock_incr, mock_line_num, mock_normalize):
+    setobj = cibconfig.mkset_obj()
+    assert setobj.save(iter(line + '\n' for line in _bulk_config(4)), remove=False, method='update')
+    try:
+        setobj = cibconfig.mkset_obj('bulk-*')
+        s = setobj.repr_nopretty()
+        edited = s.replace("/run/bulk-p1\"", "/run/bulk-p1.new\"")
+        assert edited != s
+        with mock.patch('crmsh.parse.parse', wraps=cibconfig.parse.parse) as mock_parse:
+            assert setobj.save(edited)
+            # only the edited primitive is parsed (and validated)
+            assert set(c[0][0].split()[1] for c in mock_parse.call_args_list) == set(['bulk-p1'])
+        assert "/run/bulk-p1.new" in factory.find_object('bulk-p1').repr_cli(format_mode=-1)
+        assert len(factory.find_objects('bulk-*')) == 9
+    finally:
+        factory.delete('bulk-g0', 'bulk-g2')
+        factory.delete(*['bulk-p%d' % i for i in range(4)])
+    assert factory.find_objects('bulk-*') == []
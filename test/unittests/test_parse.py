@@ -107,6 +107,63 @@ class TestBaseParser(unittest.TestCase):
         self.assertEqual(retdict['wiz'], 'fizz buzz')
 
 
+class TestSplitTokens(unittest.TestCase):
+    SAMPLES = [
+        '',
+        'primitive p1 Dummy',
+        '  op  monitor\tinterval=10s \n',
+        'description="this is a description"',
+        "params a='b c' d=\"e 'f' g\"",
+        'foo="a \\"quoted\\" \\\\ \\n value"',
+        "a\\ b c\\'d",
+        'x=""  y=\'\'  ""',
+        'abc"def"\'ghi\'jkl',
+        "location l1 { a b } rule #uname eq node1",
+    ]
+
+    def test_same_as_shlex(self):
+        for s in self.SAMPLES:
+            self.assertEqual(parse.split_tokens(s), shlex.split(s))
+
+    def test_unbalanced(self):
+        for s in ('a "b', "a 'b", 'a b\\', 'a "b\\'):
+            self.assertRaises(ValueError, shlex.split, s)
+            self.assertRaises(ValueError, parse.split_tokens, s)
+
+
+class TestParseGeneratedConfig(unittest.TestCase):
+    """
+    Tokenize and parse a generated configuration: split_tokens()
+    must agree with shlex.split() and every line must parse
+    """
+
+    COUNT = 1000
+
+    def setUp(self):
+        parse.validator = MockValidation()
+
+    def _config(self):
+        lines = []
+        for i in range(self.COUNT):
+            lines += [
+                'primitive p%d ocf:heartbeat:Dummy params state="/run/p%d state" fake=%d '
+                'meta target-role=Started op monitor interval=10s timeout=20s op start timeout=60s' % (i, i, i),
+                'location l%d p%d rule 100: #uname eq node%d and pingd gt 0' % (i, i, i % 3),
+                'colocation c%d inf: p%d p%d' % (i, i, i + 1),
+                'order o%d Mandatory: p%d:start p%d:start symmetrical=true' % (i, i, i + 1),
+                'monitor p%d:Started 10s:20s' % (i),
+            ]
+        return lines
+
+    def test_tokens_match_shlex_and_parse(self):
+        lines = self._config()
+
+        self.assertEqual([parse.split_tokens(line) for line in lines],
+                         [shlex.split(line) for line in lines])
+        for line in lines:
+            self.assertNotIn(parse.parse(line), (None, False))
+
+
 class TestCliParser(unittest.TestCase):
     def setUp(self):
         parse.validator = MockValidation()
@@ -448,6 +505,10 @@ class TestCliParser(unittest.TestCase):
         self.assertEqual(['no'], out.xpath('//nvpair[@name="stonith-enabled"]/@value'))
         self.assertEqual(['2014'], out.xpath('//date_spec/@years'))
 
+        # date_spec keys are case sensitive
+        out = self._parse('location l1 r1 rule 100: date date_spec Hours=9-16')
+        self.assertFalse(out)
+
         out = self._parse('rsc_defaults failure-timeout=3m')
         self.assertEqual(['3m'], out.xpath('//nvpair[@name="failure-timeout"]/@value'))
 
@@ -0,0 +1,109 @@
+import bz2
+import lzma
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from crmsh.report import constants, utillib
+
+
+def _ts(day, hour):
+    return time.mktime((2026, 3, day, hour, 0, 0, 0, 0, -1))
+
+
+class TestLogs(unittest.TestCase):
+    """
+    Unitary tests for reading rotated and compressed logs in crmsh.report.utillib
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.logf = os.path.join(self.tmpdir, "ha.log")
+        # one line an hour, one day per log, oldest compressed
+        for day, suffix, _open in ((1, "-2.xz", lzma.open), (2, "-1.bz2", bz2.open), (3, "", open)):
+            with _open(self.logf + suffix, "wt") as f:
+                for hour in range(24):
+                    f.write("Mar %02d %02d:00:00 node1 pacemakerd [1] info: line %d %d\n" % (day, hour, day, hour))
+            os.utime(self.logf + suffix, (_ts(day, 23), _ts(day, 23)))
+        self.patches = [mock.patch('crmsh.report.constants.GET_STAMP_FUNC', "syslog"),
+                        mock.patch('crmsh.report.constants.LOG_CHUNK_SIZE', 256)]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def test_read_log(self):
+        self.assertEqual(len(utillib.read_log(self.logf + "-1.bz2").splitlines()), 24)
+        data = utillib.read_log(self.logf + "-1.bz2", _ts(2, 3))
+        self.assertTrue(data.endswith("\n"))
+        self.assertLess(len(data.splitlines()), 24)
+        self.assertIn("line 2 3\n", data)
+
+    def test_arch_logs(self):
+        self.assertEqual(utillib.arch_logs(self.logf, _ts(1, 12), _ts(2, 12)),
+                         [self.logf + "-1.bz2", self.logf + "-2.xz"])
+        self.assertEqual(utillib.arch_logs(self.logf, _ts(3, 1), 0), [self.logf])
+
+    @mock.patch('crmsh.report.utillib.multiprocessing.cpu_count')
+    def test_dump_logset(self, mock_cpu_count):
+        outf = os.path.join(self.tmpdir, "out")
+        results = []
+        for cpus in (1, 4):
+            mock_cpu_count.return_value = cpus
+            self.assertTrue(utillib.dump_logset(self.logf, _ts(1, 20), _ts(3, 2), outf))
+            with open(outf) as f:
+                results.append(f.read())
+        self.assertEqual(results[0], results[1])
+        lines = results[0].splitlines()
+        self.assertEqual((lines[0], lines[-1]), ("Mar 02 00:00:00 node1 pacemakerd [1] info: line 2 0",
+                                                 "Mar 03 02:00:00 node1 pacemakerd [1] info: line 3 2"))
+
+
+class TestFindFiles(unittest.TestCase):
+    """
+    Unitary tests for crmsh.report.utillib.find_files
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        for d, name, mtime in (("pengine", "pe-input-1.bz2", 100), ("pengine", "pe-input-2.bz2", 200),
+                               ("pengine", "pe-input-3.bz2", 300), ("pengine/sub", "pe-input-4.bz2", 200),
+                               ("cores", "core.123", 200), ("cores", "other", 200)):
+            path = os.path.join(self.tmpdir, d, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, "w").close()
+            os.utime(path, (mtime, mtime))
+        os.symlink(os.path.join(self.tmpdir, "cores", "core.123"), os.path.join(self.tmpdir, "pengine", "link"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _find(self, dirs, from_time, to_time, pattern=None):
+        return sorted(os.path.relpath(f, self.tmpdir) for f in utillib.find_files(dirs, from_time, to_time, pattern))
+
+    def test_time_span(self):
+        self.assertEqual(self._find(os.path.join(self.tmpdir, "pengine"), 100, 200),
+                         ["pengine/pe-input-2.bz2", "pengine/sub/pe-input-4.bz2"])
+        self.assertEqual(self._find(os.path.join(self.tmpdir, "pengine"), 200, 0),
+                         ["pengine/pe-input-3.bz2"])
+
+    def test_dirs_and_pattern(self):
+        dirs = "%s %s/missing %s" % (os.path.join(self.tmpdir, "cores"), self.tmpdir, os.path.join(self.tmpdir, "pengine"))
+        self.assertEqual(self._find(dirs, 150, 250, "*core*"), ["cores/core.123"])
+        self.assertEqual(self._find(dirs.split(), 150, 250),
+                         ["cores/core.123", "cores/other", "pengine/pe-input-2.bz2", "pengine/sub/pe-input-4.bz2"])
+
+    @mock.patch('crmsh.report.utillib.logger')
+    def test_no_time(self, mock_logger):
+        self.assertEqual(self._find(self.tmpdir, 0, 0), [])
+        mock_logger.warning.assert_called_once_with("sorry, can't find files based on time if you don't supply time")
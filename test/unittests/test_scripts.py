@@ -6,10 +6,15 @@ from __future__ import unicode_literals
 
 from builtins import str
 from builtins import object
+import os
 from os import path
 from pprint import pprint
 import pytest
 from lxml import etree
+try:
+    from unittest import mock
+except ImportError:
+    import mock
 from crmsh import scripts
 from crmsh import ra
 from crmsh import utils
@@ -456,6 +461,14 @@ def teardown_function():
     utils.list_cluster_nodes = _saved_cluster_nodes
 
 
+@pytest.fixture(autouse=True, scope='module')
+def compiled_dir(tmp_path_factory):
+    saved = scripts.COMPILED_DIR
+    scripts.COMPILED_DIR = str(tmp_path_factory.mktemp('compiled'))
+    yield
+    scripts.COMPILED_DIR = saved
+
+
 def test_list():
     assert set(['v2', 'legacy', '10-webserver', 'inc1', 'inc2', 'vip', 'vipinc', 'unified']) == set(s for s in scripts.list_scripts())
 
@@ -912,3 +925,162 @@ actions:
 
     a1 = runtest('stringtest == "yes" or stringtest == "no"', "yes")
     assert len(a1) == 1
+
+
+def _runner(actions, policy='fail-fast'):
+    actions = [dict(name=name, shortdesc='', **kw) for name, kw in actions]
+    return scripts.RunActions(TestPrinter(), None, {'failure_policy': policy}, actions,
+                              None, [('node1', None, None), ('node2', None, None)], None, '/tmp/none')
+
+
+def test_action_dependencies():
+    runner = _runner([('install', {'nodes': 'all'}),
+                      ('call', {'nodes': 'local'}),
+                      ('collect', {}),
+                      ('report', {}),
+                      ('cib', {})])
+    assert runner._dependencies() == [set(), set(), set([0]), set([1, 2]), set([0, 1, 2, 3])]
+
+
+@pytest.mark.parametrize("policy,executed", [('fail-fast', ['call', 'install']),
+                                             ('collect', ['call', 'install', 'collect'])])
+def test_failure_policy(policy, executed):
+    runner = _runner([('call', {'nodes': 'local'}),
+                      ('install', {'nodes': 'all'}),
+                      ('collect', {}),
+                      ('report', {})], policy)
+    names = []
+
+    def execute(action):
+        names.append(action['name'])
+        return action['name'] != 'call', None
+    with mock.patch.object(scripts.RunActions, '_execute', side_effect=execute):
+        assert runner.all_actions() is False
+    assert sorted(names) == sorted(executed)
+
+
+def test_state_delta(tmpdir):
+    import json
+    import subprocess
+    runner = _runner([])
+    runner.workdir = str(tmpdir)
+    runner.data = [{'foo': 'bar'}]
+    with open(str(tmpdir.join('script.input')), 'w') as f:
+        json.dump(runner.data, f)
+    digests = scripts._state_digests(runner.data)
+    runner.state_sent['remote'] = {'node1': digests, 'node2': digests}
+    assert runner._remote_state_update() == ('', digests)
+
+    runner.data.append({'node1': {'x': "it's"}})
+    update, digests = runner._remote_state_update()
+    assert json.dumps([1, [{'node1': {'x': "it's"}}]]) in update
+    runner.state_sent['remote'] = {'node1': digests, 'node2': digests}
+    assert runner._remote_state_update()[0] == ''
+
+    runner.data[0]['foo'] = 'baz'
+    update += runner._remote_state_update()[0]
+    assert json.dumps([0, runner.data]) in update
+    subprocess.check_call(['sh', '-c', update])
+    with open(str(tmpdir.join('script.input'))) as f:
+        assert json.load(f) == runner.data
+
+
+@mock.patch('crmsh.scripts._parallax_call')
+def test_state_sent_with_command(mock_call):
+    import json
+    mock_call.return_value = {'node1': (0, '', ''), 'node2': (0, '', '')}
+    runner = _runner([])
+    runner.opts = mock.Mock()
+    runner.data.append({'node1': 'result'})
+    runner._process_remote('./collect.py', False)
+    assert mock_call.call_args[0][2] == './collect.py'
+    runner._process_remote('./collect.py', False, with_state=True)
+    assert mock_call.call_args[0][2].startswith('cd "/tmp/none" && python3')
+    assert mock_call.call_args[0][2].endswith('END_OF_STATE\n./collect.py')
+    runner._process_remote('./collect.py', False, with_state=True)
+    assert mock_call.call_args[0][2] == './collect.py'
+
+    # node2 failed: the changes are sent again, from the first one
+    # node2 did not acknowledge
+    mock_call.return_value = {'node1': (0, '', ''), 'node2': (1, '', 'error')}
+    runner.data.append({'node1': 'result2'})
+    runner._process_remote('./collect.py', False, with_state=True)
+    mock_call.return_value = {'node1': (0, '', ''), 'node2': (0, '', '')}
+    runner.data.append({'node1': 'result3'})
+    runner._process_remote('./collect.py', False, with_state=True)
+    assert json.dumps([2, runner.data[2:]]) in mock_call.call_args[0][2]
+    runner._process_remote('./collect.py', False, with_state=True)
+    assert mock_call.call_args[0][2] == './collect.py'
+
+
+def test_compiled_script(tmpdir):
+    import shutil
+    fixtures = str(tmpdir.join('scripts'))
+    shutil.copytree(path.join(path.dirname(__file__), 'scripts'), fixtures)
+    with mock.patch('crmsh.scripts._script_dirs', return_value=[fixtures]):
+        scripts._script_cache = None
+        vipinc = scripts.load_script('vipinc')
+        assert os.path.isfile(path.join(scripts.COMPILED_DIR, 'vipinc.pickle'))
+        assert ('file', path.join(fixtures, 'vip', 'main.yml')) in scripts._script_deps['vipinc']
+        assert ('agent', 'test:virtual-ip') in scripts._script_deps['vipinc']
+
+        scripts._script_cache = None
+        with mock.patch('crmsh.scripts._compile_script_file') as mock_compile:
+            script = scripts.load_script('vipinc')
+            mock_compile.assert_not_called()
+        assert script['steps'][0]['name'] == vipinc['steps'][0]['name']
+        assert str(script['actions'][1]['cib']) == str(vipinc['actions'][1]['cib'])
+
+        # the included script changed: compile again
+        vip = path.join(fixtures, 'vip', 'main.yml')
+        st = os.stat(vip)
+        os.utime(vip, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+        scripts._script_cache = None
+        with mock.patch('crmsh.scripts._compile_script_file', wraps=scripts._compile_script_file) as mock_compile:
+            scripts.load_script('vipinc')
+            assert [c[0][0] for c in mock_compile.call_args_list] == ['vipinc', 'vip']
+
+        # writable by others: not loaded
+        os.chmod(path.join(scripts.COMPILED_DIR, 'vipinc.pickle'), 0o666)
+        assert scripts._load_compiled('vipinc', path.join(fixtures, 'vipinc', 'main.yml')) is None
+        os.chmod(path.join(scripts.COMPILED_DIR, 'vipinc.pickle'), 0o600)
+        assert scripts._load_compiled('vipinc', path.join(fixtures, 'vipinc', 'main.yml')) is not None
+    scripts._script_cache = None
+
+
+def test_list_verify_compiled():
+    """
+    script list and verify across all the bundled scripts,
+    compiling them, then from the compiled scripts
+    """
+    class Agent(object):
+        def __init__(self, agent):
+            self.name = agent.split(':')[-1]
+
+        def meta(self):
+            meta = etree.fromstring(_virtual_ip)
+            meta.set('name', self.name)
+            return meta
+
+    def list_verify():
+        scripts._script_cache = None
+        ret = []
+        for name in scripts.list_scripts():
+            script = scripts.load_script(name)
+            try:
+                actions = len(scripts.verify(script, {}, external_check=False))
+            except ValueError:
+                actions = None  # missing parameters
+            ret.append((name, script['category'], str(script['shortdesc']), actions))
+        return ret
+
+    bundled = path.join(path.dirname(__file__), '..', '..', 'scripts')
+    with mock.patch('crmsh.scripts._script_dirs', return_value=[bundled]), \
+            mock.patch('crmsh.ra.get_ra', side_effect=Agent):
+        try:
+            compiled = list_verify()
+            cached = list_verify()
+        finally:
+            scripts._script_cache = None
+    assert len(compiled) > 30
+    assert cached == compiled
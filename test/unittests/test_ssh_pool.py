@@ -0,0 +1,46 @@
+# unit tests for ssh_pool.py
+
+import unittest
+from unittest import mock
+from crmsh import ssh_pool, constants
+
+
+class TestSshPool(unittest.TestCase):
+
+    @mock.patch('os.makedirs')
+    def test_prepare(self, mock_makedirs):
+        self.assertTrue(ssh_pool.prepare())
+        mock_makedirs.assert_called_once_with(constants.SSH_CONTROL_DIR, 0o700, exist_ok=True)
+
+    @mock.patch('logging.Logger.debug')
+    @mock.patch('os.makedirs')
+    def test_prepare_failed(self, mock_makedirs, mock_debug):
+        mock_makedirs.side_effect = OSError("read-only")
+        self.assertFalse(ssh_pool.prepare())
+        mock_debug.assert_called_once_with("Cannot create %s: %s", constants.SSH_CONTROL_DIR, mock_makedirs.side_effect)
+
+    @mock.patch('crmsh.ssh_pool.prepare')
+    def test_options(self, mock_prepare):
+        mock_prepare.return_value = True
+        res = ssh_pool.options()
+        self.assertEqual(res[0], "ControlMaster=auto")
+        self.assertTrue(res[1].startswith("ControlPath={}".format(constants.SSH_CONTROL_DIR)))
+        mock_prepare.assert_called_once_with()
+
+    @mock.patch('crmsh.ssh_pool.prepare')
+    def test_options_unusable(self, mock_prepare):
+        mock_prepare.return_value = False
+        self.assertEqual(ssh_pool.options(), [])
+
+    @mock.patch('os.makedirs')
+    def test_ssh_option(self, mock_makedirs):
+        with mock.patch('crmsh.constants.SSH_CONTROL_DIR', '/tmp/ctl'):
+            res = ssh_pool.ssh_option()
+        self.assertEqual(res, "-o StrictHostKeyChecking=no -o ControlMaster=auto "
+                              "-o ControlPath=/tmp/ctl/%C -o ControlPersist=60s")
+        mock_makedirs.assert_called_once_with('/tmp/ctl', 0o700, exist_ok=True)
+
+    @mock.patch('crmsh.ssh_pool.prepare')
+    def test_ssh_option_unusable(self, mock_prepare):
+        mock_prepare.return_value = False
+        self.assertEqual(ssh_pool.ssh_option(), constants.SSH_OPTION)
@@ -36,14 +36,16 @@ class TestCluster(unittest.TestCase):
         Global tearDown.
         """
 
+    @mock.patch('crmsh.utils.query_services_on_nodes')
     @mock.patch('logging.Logger.info')
     @mock.patch('crmsh.utils.service_is_active')
     @mock.patch('crmsh.ui_cluster.parse_option_for_nodes')
     @mock.patch('crmsh.utils.is_qdevice_configured')
-    def test_do_start_already_started(self, mock_qdevice_configured, mock_parse_nodes, mock_active, mock_info):
+    def test_do_start_already_started(self, mock_qdevice_configured, mock_parse_nodes, mock_active, mock_info, mock_query):
         mock_qdevice_configured.return_value = False
         context_inst = mock.Mock()
         mock_parse_nodes.return_value = ["node1", "node2"]
+        mock_query.return_value = {"node1": {}, "node2": {}}
         mock_active.side_effect = [True, True]
         self.ui_cluster_inst.do_start(context_inst, "node1", "node2")
         mock_parse_nodes.assert_called_once_with(context_inst, "node1", "node2")
@@ -56,15 +58,17 @@ class TestCluster(unittest.TestCase):
             mock.call("Cluster services already started on node2")
             ])
 
+    @mock.patch('crmsh.utils.query_services_on_nodes')
     @mock.patch('crmsh.bootstrap.start_pacemaker')
     @mock.patch('logging.Logger.info')
     @mock.patch('crmsh.utils.is_qdevice_configured')
     @mock.patch('crmsh.utils.start_service')
     @mock.patch('crmsh.utils.service_is_active')
     @mock.patch('crmsh.ui_cluster.parse_option_for_nodes')
-    def test_do_start(self, mock_parse_nodes, mock_active, mock_start, mock_qdevice_configured, mock_info, mock_start_pacemaker):
+    def test_do_start(self, mock_parse_nodes, mock_active, mock_start, mock_qdevice_configured, mock_info, mock_start_pacemaker, mock_query):
         context_inst = mock.Mock()
         mock_parse_nodes.return_value = ["node1"]
+        mock_query.return_value = {"node1": {}}
         mock_active.side_effect = [False, False]
         mock_qdevice_configured.return_value = True
 
@@ -78,12 +82,14 @@ class TestCluster(unittest.TestCase):
         mock_qdevice_configured.assert_called_once_with()
         mock_info.assert_called_once_with("Cluster services started on node1")
 
+    @mock.patch('crmsh.utils.query_services_on_nodes')
     @mock.patch('logging.Logger.info')
     @mock.patch('crmsh.utils.service_is_active')
     @mock.patch('crmsh.ui_cluster.parse_option_for_nodes')
-    def test_do_stop_already_stopped(self, mock_parse_nodes, mock_active, mock_info):
+    def test_do_stop_already_stopped(self, mock_parse_nodes, mock_active, mock_info, mock_query):
         context_inst = mock.Mock()
         mock_parse_nodes.return_value = ["node1"]
+        mock_query.return_value = {"node1": {}}
         mock_active.side_effect = [False, False]
         self.ui_cluster_inst.do_stop(context_inst, "node1")
         mock_active.assert_has_calls([
@@ -92,6 +98,23 @@ class TestCluster(unittest.TestCase):
             ])
         mock_info.assert_called_once_with("Cluster services already stopped on node1")
 
+    @mock.patch('crmsh.utils.query_services_on_nodes')
+    @mock.patch('logging.Logger.warning')
+    @mock.patch('logging.Logger.info')
+    @mock.patch('crmsh.utils.stop_service')
+    @mock.patch('crmsh.utils.service_is_active')
+    @mock.patch('crmsh.ui_cluster.parse_option_for_nodes')
+    def test_do_stop_unreachable(self, mock_parse_nodes, mock_active, mock_stop, mock_info, mock_warn, mock_query):
+        context_inst = mock.Mock()
+        mock_parse_nodes.return_value = ["node1"]
+        mock_query.return_value = {}
+        self.ui_cluster_inst.do_stop(context_inst, "node1")
+        mock_warn.assert_called_once_with("Cannot reach node1, skipped")
+        mock_active.assert_not_called()
+        mock_stop.assert_not_called()
+        mock_info.assert_not_called()
+
+    @mock.patch('crmsh.utils.query_services_on_nodes')
     @mock.patch('logging.Logger.debug')
     @mock.patch('logging.Logger.info')
     @mock.patch('crmsh.utils.stop_service')
@@ -101,9 +124,10 @@ class TestCluster(unittest.TestCase):
     @mock.patch('crmsh.utils.get_dc')
     @mock.patch('crmsh.utils.service_is_active')
     @mock.patch('crmsh.ui_cluster.parse_option_for_nodes')
-    def test_do_stop(self, mock_parse_nodes, mock_active, mock_get_dc, mock_dlm_running, mock_is_quorate, mock_set_dlm, mock_stop, mock_info, mock_debug):
+    def test_do_stop(self, mock_parse_nodes, mock_active, mock_get_dc, mock_dlm_running, mock_is_quorate, mock_set_dlm, mock_stop, mock_info, mock_debug, mock_query):
         context_inst = mock.Mock()
         mock_parse_nodes.return_value = ["node1"]
+        mock_query.return_value = {"node1": {}}
         mock_active.side_effect = [True, True]
         mock_dlm_running.return_value = True
         mock_is_quorate.return_value = False
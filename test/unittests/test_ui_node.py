@@ -0,0 +1,139 @@
+import logging
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from lxml import etree
+from crmsh import ui_node
+from crmsh import xmlutil
+
+logging.basicConfig(level=logging.INFO)
+
+CIB_XML = """<cib epoch="1" num_updates="0" admin_epoch="0">
+  <configuration>
+    <crm_config/>
+    <nodes>
+      <node id="1" uname="node1">
+        <instance_attributes id="nodes-1">
+          <nvpair id="nodes-1-standby" name="standby" value="off"/>
+        </instance_attributes>
+      </node>
+      <node id="2" uname="node2"/>
+      <node id="3" uname="node3"/>
+    </nodes>
+    <resources/>
+    <constraints/>
+  </configuration>
+  <status>
+    <node_state id="1" uname="node1" crmd="online">
+      <transient_attributes id="1">
+        <instance_attributes id="status-1">
+          <nvpair id="status-1-standby" name="standby" value="on"/>
+        </instance_attributes>
+      </transient_attributes>
+    </node_state>
+    <node_state id="2" uname="node2" crmd="online"/>
+  </status>
+</cib>"""
+
+
+class TestNode(unittest.TestCase):
+    """
+    Unitary tests for class ui_node.NodeMgmt
+    """
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+        self.ui_node_inst = ui_node.NodeMgmt()
+        self.cib = xmlutil.text2elem(CIB_XML)
+
+    @mock.patch('logging.Logger.info')
+    @mock.patch('crmsh.utils.get_stdout_or_raise_error')
+    @mock.patch('crmsh.xmlutil.cibdump2elem')
+    @mock.patch('crmsh.ui_node.parse_option_for_nodes')
+    def test_standby(self, mock_parse, mock_dump, mock_run, mock_info):
+        mock_parse.return_value = ["node1", "node2"]
+        mock_dump.return_value = self.cib
+        self.ui_node_inst.do_standby(mock.Mock())
+
+        mock_run.assert_called_once_with("cibadmin --patch --xml-pipe", input_s=mock.ANY)
+        diff = etree.fromstring(mock_run.call_args[1]["input_s"])
+        self.assertEqual(diff.get("format"), "2")
+        self.assertEqual([(c.get("operation"), c.get("path")) for c in diff], [
+            ("delete", "/cib/status/node_state[@id='1']/transient_attributes[@id='1']/instance_attributes[@id='status-1']/nvpair[@id='status-1-standby']"),
+            ("create", "/cib/configuration/nodes/node[@id='2']"),
+            ("modify", "/cib/configuration/nodes/node[@id='1']/instance_attributes[@id='nodes-1']/nvpair[@id='nodes-1-standby']")
+            ])
+        self.assertEqual(diff[1].get("position"), "0")
+        self.assertEqual(diff[1].xpath("instance_attributes/nvpair/@value"), ["on"])
+        self.assertEqual(diff[2].xpath("change-list/change-attr/@value"), ["on"])
+        self.assertEqual(diff[2].xpath("change-result/nvpair/@value"), ["on"])
+        mock_info.assert_has_calls([
+            mock.call("standby node %s", "node1"),
+            mock.call("standby node %s", "node2")
+            ])
+
+    @mock.patch('logging.Logger.info')
+    @mock.patch('crmsh.utils.get_stdout_or_raise_error')
+    @mock.patch('crmsh.xmlutil.cibdump2elem')
+    @mock.patch('crmsh.ui_node.parse_option_for_nodes')
+    def test_standby_reboot(self, mock_parse, mock_dump, mock_run, mock_info):
+        mock_parse.return_value = ["node1", "node2", "node3"]
+        mock_dump.return_value = self.cib
+        self.ui_node_inst.do_standby(mock.Mock(), "reboot")
+
+        mock_parse.assert_called_once_with(mock.ANY)
+        mock_run.assert_called_once_with("cibadmin --patch --xml-pipe", input_s=mock.ANY)
+        diff = etree.fromstring(mock_run.call_args[1]["input_s"])
+        self.assertEqual([(c.get("operation"), c.get("path")) for c in diff], [
+            ("delete", "/cib/configuration/nodes/node[@id='1']/instance_attributes[@id='nodes-1']/nvpair[@id='nodes-1-standby']"),
+            ("create", "/cib/status/node_state[@id='2']")
+            ])
+        self.assertEqual(diff[1].xpath("transient_attributes/instance_attributes/nvpair/@value"), ["on"])
+
+    @mock.patch('logging.Logger.info')
+    @mock.patch('crmsh.utils.get_nodeid_from_name')
+    @mock.patch('crmsh.utils.get_stdout_or_raise_error')
+    @mock.patch('crmsh.xmlutil.cibdump2elem')
+    @mock.patch('crmsh.ui_node.parse_option_for_nodes')
+    def test_online(self, mock_parse, mock_dump, mock_run, mock_nodeid, mock_info):
+        mock_parse.return_value = ["node1"]
+        mock_dump.return_value = self.cib
+        mock_nodeid.return_value = "1"
+        self.ui_node_inst.do_online(mock.Mock())
+
+        mock_run.assert_called_once_with("cibadmin --patch --xml-pipe", input_s=mock.ANY)
+        diff = etree.fromstring(mock_run.call_args[1]["input_s"])
+        self.assertEqual(diff.xpath("change/@operation"), ["modify"])
+        self.assertEqual(diff.xpath("change/@path"), [
+            "/cib/status/node_state[@id='1']/transient_attributes[@id='1']/instance_attributes[@id='status-1']/nvpair[@id='status-1-standby']"])
+        self.assertEqual(diff.xpath("//change-result/nvpair/@value"), ["off"])
+        mock_info.assert_called_once_with("online node %s", "node1")
+
+    @mock.patch('crmsh.utils.get_stdout_or_raise_error')
+    def test_commit_nvpairs_nothing(self, mock_run):
+        ui_node.commit_nvpairs([], [], [])
+        mock_run.assert_not_called()
+
+    @mock.patch('crmsh.ui_node.print_node')
+    @mock.patch('crmsh.xmlutil.cibdump2elem')
+    def test_show(self, mock_dump, mock_print):
+        mock_dump.return_value = self.cib
+        self.assertTrue(self.ui_node_inst.do_show(mock.Mock()))
+        mock_print.assert_has_calls([
+            mock.call("node1", "1", "", {}, mock.ANY, False),
+            mock.call("node2", "2", "", {}, [], False),
+            mock.call("node3", "3", "", {}, [], False)
+            ])
+        self.assertIn("standby", mock_print.call_args_list[0][0][4][0])
+
+    @mock.patch('crmsh.ui_node.print_node')
+    @mock.patch('crmsh.xmlutil.cibdump2elem')
+    def test_show_node(self, mock_dump, mock_print):
+        mock_dump.return_value = self.cib
+        self.assertTrue(self.ui_node_inst.do_show(mock.Mock(), "node3"))
+        mock_print.assert_called_once_with("node3", "3", "", {}, [], False)
@@ -0,0 +1,119 @@
+import logging
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from lxml import etree
+from crmsh import cibconfig
+from crmsh import ui_resource
+
+logging.basicConfig(level=logging.INFO)
+
+factory = cibconfig.cib_factory
+
+RESOURCES_XML = ["""<primitive id="rsc1" class="ocf" provider="heartbeat" type="Dummy">
+  <instance_attributes id="rsc1-instance_attributes">
+    <nvpair id="rsc1-instance_attributes-state" name="state" value="/tmp/rsc1"/>
+  </instance_attributes>
+</primitive>""",
+"""<primitive id="rsc2" class="ocf" provider="heartbeat" type="Dummy"/>"""]
+
+
+class TestRscMgmt(unittest.TestCase):
+    """
+    Unitary tests for class ui_resource.RscMgmt
+    """
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+        from crmsh import idmgmt
+        idmgmt.clear()
+        factory._push_state()
+        # no RA meta-data here
+        with mock.patch('crmsh.cibconfig.CibPrimitive.normalize_parameters'):
+            for xml in RESOURCES_XML:
+                factory.create_from_node(etree.fromstring(xml))
+        self.ui_resource_inst = ui_resource.RscMgmt()
+        self.context = mock.Mock()
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+        factory._pop_state()
+
+    def _batch(self, lines):
+        with mock.patch('builtins.open', mock.mock_open(read_data="\n".join(lines))):
+            return self.ui_resource_inst.do_batch(self.context, "changes.txt")
+
+    def test_set_rsc_attr(self):
+        self.assertTrue(ui_resource.set_rsc_attr("rsc1", "instance_attributes", "state", "/tmp/x", commit=False))
+        self.assertTrue(ui_resource.set_rsc_attr("rsc2", "utilization", "memory", "1024", commit=False))
+        self.assertTrue(ui_resource.set_rsc_attr("rsc1", "instance_attributes", "state", commit=False))
+        rsc1 = factory.find_object("rsc1").node
+        rsc2 = factory.find_object("rsc2").node
+        self.assertEqual(rsc1.xpath(".//nvpair"), [])
+        self.assertEqual(rsc1.xpath("./instance_attributes"), [])
+        self.assertEqual(rsc2.xpath("./utilization/nvpair[@name='memory']/@value"), ["1024"])
+
+    @mock.patch('logging.Logger.error')
+    def test_set_rsc_attr_error(self, mock_error):
+        self.assertFalse(ui_resource.set_rsc_attr("rsc3", "meta_attributes", "target-role", "Stopped", commit=False))
+        self.assertFalse(ui_resource.set_rsc_attr("rsc2", "meta_attributes", "target-role", commit=False))
+        mock_error.assert_has_calls([
+            mock.call("Resource not found: %s", "rsc3"),
+            mock.call("Attribute %s not found in %s of %s", "target-role", "meta_attributes", "rsc2")
+            ])
+
+    @mock.patch('crmsh.ui_resource.RscMgmt._refresh_cleanup')
+    @mock.patch('crmsh.cibconfig.cib_factory.commit')
+    def test_batch(self, mock_commit, mock_cleanup):
+        mock_commit.return_value = True
+        mock_cleanup.return_value = True
+        self.assertTrue(self._batch([
+            "# comment",
+            "meta rsc1 set target-role Stopped",
+            "param rsc2 set state /tmp/rsc2",
+            "",
+            "maintenance rsc2",
+            "cleanup rsc1 node1"
+            ]))
+        mock_commit.assert_called_once_with()
+        mock_cleanup.assert_called_once_with("cleanup", "rsc1", "node1", None)
+        rsc1 = factory.find_object("rsc1").node
+        rsc2 = factory.find_object("rsc2").node
+        self.assertEqual(rsc1.xpath("./meta_attributes/nvpair[@name='target-role']/@value"), ["Stopped"])
+        self.assertEqual(rsc2.xpath("./instance_attributes/nvpair[@name='state']/@value"), ["/tmp/rsc2"])
+        self.assertEqual(rsc2.xpath("./meta_attributes/nvpair[@name='maintenance']/@value"), ["true"])
+
+    @mock.patch('logging.Logger.error')
+    @mock.patch('crmsh.ui_resource.RscMgmt._refresh_cleanup')
+    @mock.patch('crmsh.cibconfig.cib_factory.refresh')
+    @mock.patch('crmsh.cibconfig.cib_factory.commit')
+    def test_batch_failed(self, mock_commit, mock_refresh, mock_cleanup, mock_error):
+        self.assertFalse(self._batch([
+            "meta rsc1 set target-role Stopped",
+            "meta rsc3 set target-role Stopped",
+            "cleanup rsc1"
+            ]))
+        mock_commit.assert_not_called()
+        mock_refresh.assert_called_once_with()
+        mock_cleanup.assert_not_called()
+        mock_error.assert_has_calls([
+            mock.call("Resource not found: %s", "rsc3"),
+            mock.call("%s: failed", "meta rsc1 set target-role Stopped"),
+            mock.call("%s: failed", "meta rsc3 set target-role Stopped"),
+            mock.call("%s: failed", "cleanup rsc1")
+            ])
+
+    @mock.patch('logging.Logger.error')
+    @mock.patch('crmsh.cibconfig.cib_factory.refresh')
+    @mock.patch('crmsh.cibconfig.cib_factory.commit')
+    def test_batch_bad_usage(self, mock_commit, mock_refresh, mock_error):
+        self.assertFalse(self._batch(["meta rsc1 show target-role"]))
+        self.assertFalse(self._batch(["failcount rsc1 show node1"]))
+        mock_commit.assert_not_called()
@@ -13,7 +13,7 @@ import pytest
 import logging
 from unittest import mock
 from itertools import chain
-from crmsh import utils, config, tmpfiles, constants
+from crmsh import utils, config, tmpfiles, constants, ssh_pool
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -1145,6 +1145,79 @@ class TestServiceManager(unittest.TestCase):
         utils.ServiceManager.disable_service("service1")
         mock_disable.assert_called_once_with()
 
+    @mock.patch("crmsh.utils.get_stdout_stderr")
+    def test_query_services(self, mock_run):
+        mock_run.return_value = (0, "LoadState=loaded\nActiveState=active\nUnitFileState=enabled\n\nLoadState=not-found\nActiveState=inactive\nUnitFileState=", None)
+        res = utils.ServiceManager.query_services(["service1", "service2"])
+        self.assertEqual(res["service1"], {"LoadState": "loaded", "ActiveState": "active", "UnitFileState": "enabled"})
+        self.assertEqual(res["service2"]["LoadState"], "not-found")
+        mock_run.assert_called_once_with("systemctl show -p LoadState,ActiveState,UnitFileState service1 service2")
+
+    @mock.patch("crmsh.utils.parallax.parallax_call")
+    @mock.patch("crmsh.utils.this_node")
+    def test_query_services_on_nodes(self, mock_this_node, mock_call):
+        mock_this_node.return_value = "node0"
+        mock_call.return_value = [("node1", (0, b"LoadState=loaded\nActiveState=inactive\nUnitFileState=disabled", b""))]
+        res = utils.ServiceManager.query_services_on_nodes(["service1"], ["node1"])
+        self.assertEqual(res, {"node1": {"service1": {"LoadState": "loaded", "ActiveState": "inactive", "UnitFileState": "disabled"}}})
+        mock_call.assert_called_once_with(["node1"], "systemctl show -p LoadState,ActiveState,UnitFileState service1", strict=False)
+
+    @mock.patch("crmsh.utils.logger")
+    @mock.patch("crmsh.utils.parallax.parallax_call")
+    @mock.patch("crmsh.utils.this_node")
+    def test_query_services_on_nodes_unreachable(self, mock_this_node, mock_call, mock_logger):
+        mock_this_node.return_value = "node0"
+        error = utils.parallax.parallax.Error("timeout", None)
+        mock_call.return_value = [
+                ("node1", error),
+                ("node2", (0, b"LoadState=loaded\nActiveState=active\nUnitFileState=enabled", b""))]
+        with utils.ServiceManager.cached():
+            res = utils.ServiceManager.query_services_on_nodes(["service1"], ["node1", "node2"])
+            self.assertEqual(list(res), ["node2"])
+            self.assertNotIn(("node1", "service1"), utils.ServiceManager._state_cache)
+            self.assertTrue(utils.ServiceManager.service_is_active("service1", remote_addr="node2"))
+        mock_logger.debug.assert_called_once_with("Failed to query services on %s: %s", "node1", error)
+
+    @mock.patch("crmsh.utils.run_cmd_on_remote")
+    @mock.patch("crmsh.utils.parallax.parallax_call")
+    @mock.patch("crmsh.utils.this_node")
+    def test_cached_invalidate_node(self, mock_this_node, mock_call, mock_run_remote):
+        mock_this_node.return_value = "node0"
+        mock_call.return_value = [
+                ("node1", (0, b"LoadState=loaded\nActiveState=active\nUnitFileState=enabled", b"")),
+                ("node2", (0, b"LoadState=loaded\nActiveState=active\nUnitFileState=enabled", b""))]
+        mock_run_remote.return_value = (0, "", None)
+        with utils.ServiceManager.cached():
+            utils.ServiceManager.query_services_on_nodes(["service1"], ["node1", "node2"])
+            utils.ServiceManager.stop_service("service1", remote_addr="node1")
+            self.assertNotIn(("node1", "service1"), utils.ServiceManager._state_cache)
+            self.assertTrue(utils.ServiceManager.service_is_active("service1", remote_addr="node2"))
+        mock_run_remote.assert_called_once_with("systemctl stop service1", "node1", "Run \"systemctl stop service1\" on node1")
+
+    @mock.patch("crmsh.utils.get_stdout_stderr")
+    def test_cached(self, mock_run):
+        mock_run.return_value = (0, "LoadState=loaded\nActiveState=active\nUnitFileState=static\n\nLoadState=loaded\nActiveState=failed\nUnitFileState=disabled", None)
+        with utils.ServiceManager.cached(["service1", "service2"]):
+            self.assertTrue(utils.ServiceManager.service_is_available("service1"))
+            self.assertTrue(utils.ServiceManager.service_is_enabled("service1"))
+            self.assertTrue(utils.ServiceManager.service_is_active("service1"))
+            self.assertFalse(utils.ServiceManager.service_is_enabled("service2"))
+            self.assertFalse(utils.ServiceManager.service_is_active("service2"))
+        mock_run.assert_called_once_with("systemctl show -p LoadState,ActiveState,UnitFileState service1 service2")
+        self.assertIsNone(utils.ServiceManager._state_cache)
+
+    @mock.patch("crmsh.utils.get_stdout_stderr")
+    def test_cached_nested(self, mock_run):
+        mock_run.side_effect = [(0, "LoadState=loaded\nActiveState=active\nUnitFileState=enabled", None),
+                                (0, "LoadState=loaded\nActiveState=inactive\nUnitFileState=disabled", None)]
+        with utils.ServiceManager.cached(["service1"]):
+            with utils.ServiceManager.cached(["service1", "service2"]):
+                self.assertTrue(utils.ServiceManager.service_is_active("service1"))
+                self.assertFalse(utils.ServiceManager.service_is_active("service2"))
+        mock_run.assert_has_calls([
+            mock.call("systemctl show -p LoadState,ActiveState,UnitFileState service1"),
+            mock.call("systemctl show -p LoadState,ActiveState,UnitFileState service2")])
+
 
 @mock.patch("crmsh.utils.get_nodeid_from_name")
 def test_get_iplist_from_name_no_nodeid(mock_get_nodeid):
@@ -1196,7 +1269,7 @@ def test_get_stdout_or_raise_error_failed(mock_run):
     with pytest.raises(ValueError) as err:
         utils.get_stdout_or_raise_error("cmd")
     assert str(err.value) == 'Failed to run "cmd": error data'
-    mock_run.assert_called_once_with("cmd", no_reg=True)
+    mock_run.assert_called_once_with("cmd", input_s=None, no_reg=True)
 
 
 @mock.patch("crmsh.utils.get_stdout_stderr")
@@ -1204,7 +1277,7 @@ def test_get_stdout_or_raise_error(mock_run):
     mock_run.return_value = (0, "output data", None)
     res = utils.get_stdout_or_raise_error("cmd", remote="node1")
     assert res == "output data"
-    mock_run.assert_called_once_with("ssh -o StrictHostKeyChecking=no root@node1 \"cmd\"", no_reg=True)
+    mock_run.assert_called_once_with("ssh {} root@node1 \"cmd\"".format(ssh_pool.ssh_option()), input_s=None, no_reg=True)
 
 
 @mock.patch("crmsh.utils.get_stdout_or_raise_error")
@@ -7,7 +7,7 @@ except ImportError:
 
 from crmsh import watchdog
 from crmsh import bootstrap
-from crmsh import constants
+from crmsh import ssh_pool
 
 
 class TestWatchdog(unittest.TestCase):
@@ -149,7 +149,7 @@ Driver: iTCO_wdt
     def test_get_driver_through_device_remotely_error(self, mock_run, mock_error):
         mock_run.return_value = (1, None, "error")
         self.watchdog_join_inst._get_driver_through_device_remotely("test")
-        mock_run.assert_called_once_with("ssh {} root@node1 sbd query-watchdog".format(constants.SSH_OPTION))
+        mock_run.assert_called_once_with("ssh {} root@node1 sbd query-watchdog".format(ssh_pool.ssh_option()))
         mock_error.assert_called_once_with("Failed to run sbd query-watchdog remotely: error")
 
     @mock.patch('crmsh.utils.get_stdout_stderr')
@@ -157,7 +157,7 @@ Driver: iTCO_wdt
         mock_run.return_value = (0, "data", None)
         res = self.watchdog_join_inst._get_driver_through_device_remotely("/dev/watchdog")
         self.assertEqual(res, None)
-        mock_run.assert_called_once_with("ssh {} root@node1 sbd query-watchdog".format(constants.SSH_OPTION))
+        mock_run.assert_called_once_with("ssh {} root@node1 sbd query-watchdog".format(ssh_pool.ssh_option()))
 
     @mock.patch('crmsh.utils.get_stdout_stderr')
     def test_get_driver_through_device_remotely(self, mock_run):
@@ -181,7 +181,7 @@ Driver: iTCO_wdt
         mock_run.return_value = (0, output, None)
         res = self.watchdog_join_inst._get_driver_through_device_remotely("/dev/watchdog")
         self.assertEqual(res, "softdog")
-        mock_run.assert_called_once_with("ssh {} root@node1 sbd query-watchdog".format(constants.SSH_OPTION))
+        mock_run.assert_called_once_with("ssh {} root@node1 sbd query-watchdog".format(ssh_pool.ssh_option()))
 
     def test_get_first_unused_device_none(self):
         res = self.watchdog_inst._get_first_unused_device()